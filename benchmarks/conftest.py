@@ -0,0 +1,94 @@
+"""Fixtures of the microbenchmarks
+
+Run with `pytest benchmarks/` (pytest-benchmark). The corpora are generated from the
+schema_extra examples of the models with a fixed seed and scale from 1 paper up to
+--max-papers (default 100k).
+"""
+import random
+from functools import lru_cache
+from typing import Any, Callable, List
+
+import pytest
+
+import nlp_land_prediction_endpoint.app  # noqa: F401 (loads the default configuration)
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+
+SIZES = (1, 100, 10_000, 100_000)
+
+
+def pytest_addoption(parser: Any) -> None:
+    """Add the option limiting the corpus size.
+
+    Args:
+        parser (Any): The pytest argument parser.
+    """
+    parser.addoption(
+        "--max-papers", type=int, default=100_000, help="Largest corpus of the benchmarks."
+    )
+
+
+def pytest_generate_tests(metafunc: Any) -> None:
+    """Parametrize benchmarks taking n_papers with the corpus sizes.
+
+    Args:
+        metafunc (Any): The benchmark function being collected.
+    """
+    if "n_papers" in metafunc.fixturenames:
+        max_papers = metafunc.config.getoption("max_papers")
+        metafunc.parametrize("n_papers", [n for n in SIZES if n <= max_papers])
+
+
+@lru_cache(maxsize=None)
+def make_papers(n_papers: int) -> List[dict]:
+    """Generate papers from the PaperModel example with shuffled abstracts.
+
+    Args:
+        n_papers (int): Number of papers.
+
+    Returns:
+        List[dict]: The papers as JSON compatible dicts.
+    """
+    example = PaperModel.Config.schema_extra["example"]
+    words = example["abstractText"].split()
+    rng = random.Random(n_papers)
+    return [
+        {
+            **example,
+            "id": f"{i:024x}",
+            "title": " ".join(rng.sample(words, 6)),
+            "abstractText": " ".join(rng.sample(words, len(words) // 2)),
+        }
+        for i in range(n_papers)
+    ]
+
+
+@pytest.fixture
+def papers(n_papers: int) -> List[dict]:
+    """Get a synthetic corpus.
+
+    Args:
+        n_papers (int): Number of papers.
+
+    Returns:
+        List[dict]: The papers as JSON compatible dicts.
+    """
+    return make_papers(n_papers)
+
+
+@pytest.fixture
+def measure(benchmark: Any, n_papers: int) -> Callable[..., Any]:
+    """Get a runner with fewer rounds for larger corpora.
+
+    Args:
+        benchmark (Any): The benchmark fixture of pytest-benchmark.
+        n_papers (int): Number of papers.
+
+    Returns:
+        Callable[..., Any]: Benchmarks a function with the given arguments.
+    """
+    rounds = max(3, min(100, 100_000 // n_papers))
+
+    def run(fn: Callable[..., Any], *args: Any) -> Any:
+        return benchmark.pedantic(fn, args=args, rounds=rounds, warmup_rounds=1)
+
+    return run
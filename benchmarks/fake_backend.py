@@ -0,0 +1,58 @@
+"""Local stand-in for the NLP-Land-backend used by the load tests
+
+Serves GET /api/version and POST /api/v0/auth/login/service. Every login succeeds for the
+password "12345" after an optional simulated latency.
+
+Usage: python benchmarks/fake_backend.py [--port N] [--latency-ms N]
+"""
+import argparse
+import asyncio
+
+import uvicorn  # type: ignore
+from fastapi import FastAPI, HTTPException, status
+
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.models.model_user_login import UserLoginModel
+
+app = FastAPI(title="Fake NLP-Land-backend")
+app.state.latency = 0.0
+
+
+@app.get("/api/version")
+async def version() -> dict:
+    """Version of the fake backend.
+
+    Returns:
+        dict: The version in the format of the NLP-Land-backend.
+    """
+    return {"__v": 0}
+
+
+@app.post("/api/v0/auth/login/service", response_model=UserModel)
+async def login(user: UserLoginModel) -> UserModel:
+    """Accept every login with the password "12345".
+
+    Args:
+        user (UserLoginModel): The credentials.
+
+    Raises:
+        HTTPException: 401 for other passwords.
+
+    Returns:
+        UserModel: The logged in user.
+    """
+    await asyncio.sleep(app.state.latency)
+    if user.password != "12345":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return UserModel(email=user.email, fullname="Load Test", isAdmin=False, isActive=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the fake NLP-Land-backend.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency of each login.")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,62 @@
+"""Compares the throughput of the validated and the trusted paper ingestion
+
+Usage: python benchmarks/ingestion.py [--papers N] [--repeat N]
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from pydantic import parse_obj_as
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.utils.paper_records import parse_records
+
+
+def make_body(n_papers: int) -> bytes:
+    """Encodes n copies of the example paper with distinct ids
+
+    Arguments:
+        n_papers (int): number of papers
+
+    Returns:
+        bytes: the JSON body of a bulk request
+    """
+    example = PaperModel.Config.schema_extra["example"]
+    return json.dumps([{**example, "id": f"{i:024x}"} for i in range(n_papers)]).encode()
+
+
+def best_of(parse: Callable[[bytes], list], body: bytes, repeat: int) -> float:
+    """Measures the fastest of several runs
+
+    Arguments:
+        parse (Callable[[bytes], list]): the ingestion path
+        body (bytes): the request body
+        repeat (int): number of runs
+
+    Returns:
+        float: the fastest run in seconds
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(body)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_body(args.papers)
+    paths = {
+        "pydantic": lambda body: parse_obj_as(List[PaperModel], json.loads(body)),
+        "records": parse_records,
+    }
+    timings = {name: best_of(parse, body, args.repeat) for name, parse in paths.items()}
+    for name, seconds in timings.items():
+        print(f"{name:>10}: {args.papers / seconds:12,.0f} papers/s ({seconds * 1000:.1f} ms)")
+    print(f"   speedup: {timings['pydantic'] / timings['records']:.1f}x")
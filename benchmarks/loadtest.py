@@ -0,0 +1,330 @@
+"""Load test of the endpoint against a local fake NLP-Land-backend
+
+Starts the fake backend (benchmarks/fake_backend.py) and the app with uvicorn, drives
+/auth/login, /auth/refresh and /topics/batch with a fixed number of concurrent clients and
+reports throughput and latency percentiles per scenario. The corpora are generated from a
+fixed seed, so results of different commits are comparable; store them with --output and
+compare a later run against them with --compare.
+
+Usage: python benchmarks/loadtest.py [--workers N] [--concurrency N] [--requests N]
+       [--papers N] [--scenarios login,refresh,topics] [--output FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from nlp_land_prediction_endpoint import __version__
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREFIX = f"/api/v{__version__.split('.')[0]}"
+SCENARIOS = ("login", "refresh", "topics")
+VOCABULARY = (
+    "neural translation attention encoder decoder transformer parsing grammar syntax "
+    "treebank dependency semantic embedding corpus annotation sentiment summarization "
+    "retrieval question answering dialogue speech recognition morphology lexicon"
+).split()
+
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]
+
+
+def free_port() -> int:
+    """Finds a free local port
+
+    Returns:
+        int: the port
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_corpus(n_papers: int, rng: random.Random, offset: int = 0) -> bytes:
+    """Generates a JSON list of papers from the PaperModel example
+
+    Arguments:
+        n_papers (int): number of papers
+        rng (random.Random): the seeded generator of the abstracts
+        offset (int): first paper id, distinct ids keep requests out of the topic cache
+
+    Returns:
+        bytes: the body of a /topics/batch request
+    """
+    example = PaperModel.Config.schema_extra["example"]
+    papers = [
+        {
+            **example,
+            "id": f"{offset + i:024x}",
+            "title": " ".join(rng.choices(VOCABULARY, k=5)),
+            "abstractText": " ".join(rng.choices(VOCABULARY, k=80)),
+        }
+        for i in range(n_papers)
+    ]
+    return json.dumps(papers).encode()
+
+
+def start(command: List[str], env: Dict[str, str], cwd: str) -> subprocess.Popen:
+    """Starts a server process
+
+    Arguments:
+        command (List[str]): the command line
+        env (Dict[str, str]): the environment
+        cwd (str): the working directory
+
+    Returns:
+        subprocess.Popen: the process
+    """
+    return subprocess.Popen(command, env=env, cwd=cwd)
+
+
+def wait_until_ready(url: str, timeout: float = 60) -> None:
+    """Polls a URL until it answers
+
+    Arguments:
+        url (str): the URL
+        timeout (float): seconds to wait
+
+    Raises:
+        RuntimeError: if the server did not answer in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+async def drive(
+    base_url: str, requests: Callable[[int], Request], n_requests: int, concurrency: int
+) -> Dict[str, float]:
+    """Sends requests with a fixed number of concurrent clients
+
+    Arguments:
+        base_url (str): URL of the app
+        requests (Callable[[int], Request]): the i-th request (method, path, body, headers)
+        n_requests (int): number of requests
+        concurrency (int): number of concurrent clients
+
+    Returns:
+        Dict[str, float]: requests, errors, rps and latency percentiles in milliseconds
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(n_requests))
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+
+        async def client_loop() -> None:
+            nonlocal errors
+            for i in counter:
+                method, path, body, headers = requests(i)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, content=body, headers=headers)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "rps": n_requests / elapsed,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+    }
+
+
+def scenarios(args: argparse.Namespace, base_url: str) -> Dict[str, Callable[[int], Request]]:
+    """Builds the requests of each scenario
+
+    Arguments:
+        args (argparse.Namespace): the command line arguments
+        base_url (str): URL of the app
+
+    Returns:
+        Dict[str, Callable[[int], Request]]: the i-th request of each scenario
+    """
+    json_header = {"Content-Type": "application/json"}
+    login = json.dumps({"email": "load@nlp.de", "password": "12345"}).encode()
+    response = httpx.post(f"{base_url}{PREFIX}/auth/login", content=login, headers=json_header)
+    response.raise_for_status()
+    bearer = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    rng = random.Random(args.seed)
+    n_corpora = args.requests + args.warmup if args.unique_corpora else 1
+    corpora = [make_corpus(args.papers, rng, i * args.papers) for i in range(n_corpora)]
+    return {
+        "login": lambda i: ("POST", f"{PREFIX}/auth/login", login, json_header),
+        "refresh": lambda i: ("POST", f"{PREFIX}/auth/refresh", None, bearer),
+        "topics": lambda i: (
+            "POST",
+            f"{PREFIX}/topics/batch",
+            corpora[i % len(corpora)],
+            json_header,
+        ),
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Prints the relative change of each metric against a stored run
+
+    Arguments:
+        results (dict): the current results
+        baseline (dict): the stored results
+    """
+    print(f"\nchange against {baseline['meta'].get('commit', '?')[:10]}:")
+    for name, metrics in results["scenarios"].items():
+        stored = baseline["scenarios"].get(name)
+        if stored is None:
+            continue
+        changes = [
+            f"{key} {100 * (metrics[key] - stored[key]) / stored[key]:+.1f}%"
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+            if stored[key]
+        ]
+        print(f"{name:>8}: " + ", ".join(changes))
+
+
+def git_commit() -> str:
+    """Returns the commit of the measured tree
+
+    Returns:
+        str: the commit hash (with "+dirty" for uncommitted changes) or "unknown"
+    """
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True)
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=ROOT)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit.strip() + ("+dirty" if dirty else "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1, help="Number of uvicorn workers.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests first.")
+    parser.add_argument("--papers", type=int, default=100, help="Papers per topic request.")
+    parser.add_argument(
+        "--unique-corpora",
+        action="store_true",
+        help="Send a distinct corpus with every topic request to bypass the topic cache.",
+    )
+    parser.add_argument("--scenarios", type=str, default=",".join(SCENARIOS))
+    parser.add_argument("--backend-latency-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, help="Store the results as JSON.")
+    parser.add_argument("--compare", type=str, help="Compare with stored results.")
+    args = parser.parse_args()
+
+    backend_port, app_port = free_port(), free_port()
+    base_url = f"http://127.0.0.1:{app_port}"
+    workdir = tempfile.mkdtemp(prefix="nlp-land-loadtest-")
+    env = {
+        **os.environ,
+        "AUTH_BACKEND_URL": f"http://127.0.0.1:{backend_port}/api/{{version}}",
+        "AUTH_BACKEND_LOGIN_ROUTE": "/auth/login/service",
+        "AUTH_TOKEN_ROUTE": f"{PREFIX}/auth/login",
+        "JWT_SECRET": "load_test_secret_load_test_secret",
+        "JWT_TOKEN_EXPIRATION_MINUTES": "30",
+        "JWT_SIGN_ALG": "HS256",
+        "PYTHONPATH": ROOT,
+    }
+    env.pop("AUTH_BACKEND_VERSION", None)
+    # app.py replaces the configuration with defaults if there is no .env file
+    with open(os.path.join(workdir, ".env"), "w") as fp:
+        fp.writelines(f"{key}={env[key]}\n" for key in ("JWT_SECRET", "JWT_SIGN_ALG"))
+
+    processes = [
+        start(
+            [
+                sys.executable,
+                os.path.join(ROOT, "benchmarks", "fake_backend.py"),
+                f"--port={backend_port}",
+                f"--latency-ms={args.backend_latency_ms}",
+            ],
+            env,
+            workdir,
+        ),
+        start(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "nlp_land_prediction_endpoint.app:app",
+                f"--port={app_port}",
+                f"--workers={args.workers}",
+                "--log-level=warning",
+            ],
+            env,
+            workdir,
+        ),
+    ]
+    try:
+        wait_until_ready(f"http://127.0.0.1:{backend_port}/api/version")
+        wait_until_ready(f"{base_url}{PREFIX}/status/")
+        requests = scenarios(args, base_url)
+        results: dict = {
+            "meta": {
+                "commit": git_commit(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+            },
+            "scenarios": {},
+        }
+        print(f"{'scenario':>8} {'requests':>8} {'errors':>6}", end="")
+        print(f" {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for name in args.scenarios.split(","):
+            scenario = requests[name]
+            if args.warmup:
+                asyncio.run(drive(base_url, scenario, args.warmup, args.concurrency))
+            metrics = asyncio.run(
+                drive(
+                    base_url,
+                    lambda i, scenario=scenario: scenario(args.warmup + i),  # type: ignore
+                    args.requests,
+                    args.concurrency,
+                )
+            )
+            results["scenarios"][name] = metrics
+            print(
+                f"{name:>8} {metrics['requests']:>8} {metrics['errors']:>6}"
+                f" {metrics['rps']:>9.1f} {metrics['p50_ms']:>7.1f}ms"
+                f" {metrics['p95_ms']:>7.1f}ms {metrics['p99_ms']:>7.1f}ms"
+            )
+        if args.output:
+            with open(args.output, "w") as fp:
+                json.dump(results, fp, indent=2)
+        if args.compare:
+            with open(args.compare) as fp:
+                compare(results, json.load(fp))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
@@ -0,0 +1,111 @@
+"""Measures the recall and latency of the similar papers index against brute force
+
+The synthetic corpus mixes words of --themes themes, so that papers have meaningful
+neighbours; the default size is about that of the ACL Anthology.
+
+Usage: python benchmarks/similarity.py [--papers N] [--queries N] [--k N] [--probes N]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from nlp_land_prediction_endpoint.utils.model_registry import ModelRegistry
+from nlp_land_prediction_endpoint.utils.paper_index import PaperIndex
+from nlp_land_prediction_endpoint.utils.similarity_index import SimilarityIndex
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+
+def make_papers(n_papers: int, n_themes: int, seed: int = 0) -> List[dict]:
+    """Generates papers whose abstracts mostly use the words of one theme
+
+    Arguments:
+        n_papers (int): number of papers
+        n_themes (int): number of themes
+        seed (int): seed of the generator
+
+    Returns:
+        List[dict]: the papers with id, title and abstractText
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(n_themes * 100)])
+    themes = rng.integers(0, n_themes, n_papers)
+    papers = []
+    for i, theme in enumerate(themes.tolist()):
+        own = rng.integers(theme * 100, theme * 100 + 100, 60)
+        shared = rng.integers(0, len(vocabulary), 20)
+        words = vocabulary[np.concatenate([own, shared])]
+        papers.append({"id": f"{i:024x}", "title": "", "abstractText": " ".join(words)})
+    return papers
+
+
+def percentile_ms(timings: List[float], q: float) -> float:
+    """Returns a percentile of timings
+
+    Arguments:
+        timings (List[float]): durations in seconds
+        q (float): the percentile
+
+    Returns:
+        float: the percentile in milliseconds
+    """
+    return float(np.percentile(timings, q)) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=80000)
+    parser.add_argument("--themes", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--probes", type=int, default=None)
+    args = parser.parse_args()
+
+    papers = make_papers(args.papers, args.themes)
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(f"{root}/models")
+        engine = TopicEngine()
+        engine.fit_transform([paper["abstractText"] for paper in papers[:5000]])
+        model = registry.activate("bench", registry.register("bench", engine))
+
+        index = PaperIndex(root=f"{root}/papers")
+        similar = SimilarityIndex(index)
+        if args.probes is not None:
+            similar.probes = args.probes
+        index.listeners.append(similar)
+        index.reset(model)
+        for offset in range(0, len(papers), 1000):
+            chunk = papers[offset : offset + 1000]
+            index.apply(chunk, np.zeros((len(chunk), engine.components_.shape[0])))
+        start = time.perf_counter()
+        asyncio.run(similar.flush())
+        flushed = time.perf_counter() - start
+        start = time.perf_counter()
+        similar.save()
+        saved = time.perf_counter() - start
+
+        rng = np.random.default_rng(1)
+        recalls, approximate, exhaustive, candidates = [], [], [], []
+        for row in rng.choice(similar.n, min(args.queries, similar.n), replace=False).tolist():
+            query = similar.vectors[row]
+            start = time.perf_counter()
+            found = similar.search(query, args.k, exclude=row)
+            approximate.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            exact = similar.exact(query, args.k, exclude=row)
+            exhaustive.append(time.perf_counter() - start)
+            recalls.append(len(np.intersect1d(found.rows, exact.rows)) / len(exact.rows))
+            candidates.append(found.candidates)
+
+    print(f"papers: {similar.n:,}, lists: {len(similar.centroids)}, probes: {similar.probes}")
+    print(f"embedding and training: {flushed:.1f} s, snapshot: {saved:.1f} s")
+    print(f"recall@{args.k}: {np.mean(recalls):.3f} (min {np.min(recalls):.2f})")
+    print(f"candidates: {np.mean(candidates):,.0f} ({np.mean(candidates) / similar.n:.1%})")
+    for name, timings in (("ivf", approximate), ("brute force", exhaustive)):
+        print(
+            f"{name:>12}: p50 {percentile_ms(timings, 50):.2f} ms,"
+            f" p95 {percentile_ms(timings, 95):.2f} ms"
+        )
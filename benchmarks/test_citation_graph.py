@@ -0,0 +1,65 @@
+"""Microbenchmarks of the citation graph at the scale of millions of edges"""
+from typing import Any, Callable, List, Tuple
+
+import numpy as np
+import pytest
+from scipy import sparse  # type: ignore
+
+from nlp_land_prediction_endpoint.utils.citation_graph import (
+    CitationGraph,
+    topic_pagerank,
+)
+
+CITATIONS_PER_PAPER = 20
+N_TOPICS = 10
+
+
+@pytest.fixture
+def cited_papers(n_papers: int) -> Tuple[List[dict], np.ndarray]:
+    """Get papers citing each other at random with random topic weights.
+
+    Args:
+        n_papers (int): Number of papers; the graph has 20 times as many edges.
+
+    Returns:
+        Tuple[List[dict], np.ndarray]: The papers with id and citedBy and their weights.
+    """
+    rng = np.random.default_rng(n_papers)
+    ids = [f"{i:024x}" for i in range(n_papers)]
+    citing = rng.integers(0, n_papers, size=(n_papers, CITATIONS_PER_PAPER)).tolist()
+    papers = [{"id": ids[i], "citedBy": [ids[j] for j in row]} for i, row in enumerate(citing)]
+    return papers, rng.random((n_papers, N_TOPICS))
+
+
+def _graph(papers: List[dict], weights: np.ndarray) -> CitationGraph:
+    graph = CitationGraph()
+    graph.reset(N_TOPICS)
+    graph.add(np.arange(len(papers)), papers, weights)
+    return graph
+
+
+def test_add_papers(
+    measure: Callable[..., Any], cited_papers: Tuple[List[dict], np.ndarray]
+) -> None:
+    measure(_graph, *cited_papers)
+
+
+def test_transition(
+    measure: Callable[..., Any], cited_papers: Tuple[List[dict], np.ndarray]
+) -> None:
+    papers, weights = cited_papers
+
+    def build() -> sparse.csr_matrix:
+        graph = _graph(papers, weights)
+        graph.version += 1
+        return graph.transition(len(papers))[0]
+
+    measure(build)
+
+
+def test_topic_pagerank(
+    measure: Callable[..., Any], cited_papers: Tuple[List[dict], np.ndarray]
+) -> None:
+    papers, weights = cited_papers
+    transition, dangling = _graph(papers, weights).transition(len(papers))
+    measure(topic_pagerank, transition, dangling, weights)
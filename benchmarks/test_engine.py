@@ -0,0 +1,45 @@
+"""Microbenchmarks of the inference kernel"""
+from typing import Any, Callable, List
+
+import pytest
+
+from nlp_land_prediction_endpoint.utils.paper_records import PaperRecord
+from nlp_land_prediction_endpoint.utils.topic_engine import (
+    TopicEngine,
+    infer_topics,
+    paper_text,
+)
+
+
+@pytest.fixture
+def texts(papers: List[dict]) -> List[str]:
+    """Get the texts the engine reads from the papers.
+
+    Args:
+        papers (List[dict]): The synthetic corpus.
+
+    Returns:
+        List[str]: Title and abstract of each paper.
+    """
+    fields = ("id", "title", "abstractText", "preProcessingGitHash")
+    return [paper_text(PaperRecord(*(paper[field] for field in fields))) for paper in papers]
+
+
+def test_vectorize(measure: Callable[..., Any], texts: List[str]) -> None:
+    engine = TopicEngine()
+    engine.fit_transform(texts[:1000])
+    measure(engine.vectorize, texts)
+
+
+def test_fit_transform(measure: Callable[..., Any], texts: List[str]) -> None:
+    measure(lambda: TopicEngine().fit_transform(texts))
+
+
+def test_transform(measure: Callable[..., Any], texts: List[str]) -> None:
+    engine = TopicEngine()
+    engine.fit_transform(texts[:1000])
+    measure(engine.transform, texts)
+
+
+def test_infer_topics(measure: Callable[..., Any], papers: List[dict], texts: List[str]) -> None:
+    measure(infer_topics, [paper["id"] for paper in papers], texts)
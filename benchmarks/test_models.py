@@ -0,0 +1,53 @@
+"""Microbenchmarks of parsing and serializing the models"""
+import json
+from typing import Any, Callable, List
+
+from pydantic import parse_obj_as
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.paper_records import parse_records
+from nlp_land_prediction_endpoint.utils.topic_json import encode_topics
+
+
+def make_topics(n_papers: int) -> TopicResponseModel:
+    """Spread n papers over the ten topics of a response
+
+    Arguments:
+        n_papers (int): number of papers
+
+    Returns:
+        TopicResponseModel: the response
+    """
+    topic = TopicResponseModel.Config.schema_extra["example"]["topics"][0]
+    ids = [f"{i:024x}" for i in range(n_papers)]
+    return TopicResponseModel(
+        topics=[{**topic, "id": str(t), "paper_ids": ids[t::10]} for t in range(10)]
+    )
+
+
+def test_paper_parse(measure: Callable[..., Any], papers: List[dict]) -> None:
+    measure(parse_obj_as, List[PaperModel], papers)
+
+
+def test_paper_parse_records(measure: Callable[..., Any], papers: List[dict]) -> None:
+    body = json.dumps(papers).encode()
+    measure(parse_records, body)
+
+
+def test_paper_serialize(measure: Callable[..., Any], papers: List[dict]) -> None:
+    models = parse_obj_as(List[PaperModel], papers)
+    measure(lambda: [model.json() for model in models])
+
+
+def test_topics_parse(measure: Callable[..., Any], n_papers: int) -> None:
+    data = make_topics(n_papers).dict()
+    measure(TopicResponseModel.parse_obj, data)
+
+
+def test_topics_serialize(measure: Callable[..., Any], n_papers: int) -> None:
+    measure(make_topics(n_papers).json)
+
+
+def test_topics_encode(measure: Callable[..., Any], n_papers: int) -> None:
+    measure(encode_topics, make_topics(n_papers))
@@ -0,0 +1,25 @@
+"""Microbenchmarks of the JWT handling"""
+from typing import Any
+
+from nlp_land_prediction_endpoint.middleware.auth import (
+    create_token,
+    decode_token,
+    encode_token,
+)
+from nlp_land_prediction_endpoint.models.model_token_data import TokenData
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+
+EXAMPLE = UserModel.Config.schema_extra["example"]
+
+
+def test_encode_token(benchmark: Any) -> None:
+    benchmark(encode_token, {"email": EXAMPLE["email"], "sub": EXAMPLE["email"]})
+
+
+def test_decode_token(benchmark: Any) -> None:
+    token = create_token(TokenData(**EXAMPLE))
+    assert benchmark(decode_token, token).email == EXAMPLE["email"]
+
+
+def test_create_token(benchmark: Any) -> None:
+    benchmark(create_token, TokenData(**EXAMPLE))
@@ -20,19 +20,28 @@ from decouple import config  # type: ignore
 from fastapi import FastAPI
 
 import nlp_land_prediction_endpoint
+from nlp_land_prediction_endpoint.middleware.profiling import ProfilingMiddleware
 from nlp_land_prediction_endpoint.routes.route_auth import router as AuthRouter
+from nlp_land_prediction_endpoint.routes.route_job import router as JobRouter
+from nlp_land_prediction_endpoint.routes.route_metrics import router as MetricsRouter
+from nlp_land_prediction_endpoint.routes.route_model import router as ModelRouter
+from nlp_land_prediction_endpoint.routes.route_paper import router as PaperRouter
+from nlp_land_prediction_endpoint.routes.route_profiling import (
+    router as ProfilingRouter,
+)
 from nlp_land_prediction_endpoint.routes.route_status import router as StatusRouter
 from nlp_land_prediction_endpoint.routes.route_topic import router as TopicRouter
-from nlp_land_prediction_endpoint.utils.version_getter import get_backend_version
+from nlp_land_prediction_endpoint.utils.http_client import backend_client
+from nlp_land_prediction_endpoint.utils.version_getter import backend_version
 
 app = FastAPI(title="NLP-Land-prediction-endpoint", docs_url="/api/docs", redoc_url="/api/redoc")
 
+app.add_event_handler("startup", backend_client.open)
 if "{version}" in config("AUTH_BACKEND_URL"):
-    get_backend_version()
-
-
-# app.add_event_handler("startup", connect_to_third_party_services)
-# app.add_event_handler("shutdown", close_third_party_services)
+    app.add_event_handler("startup", backend_version.start)
+    app.add_event_handler("shutdown", backend_version.stop)
+app.add_event_handler("shutdown", backend_client.close)
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(
     StatusRouter,
@@ -46,8 +55,39 @@ app.include_router(
     prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/topics",
 )
 
+app.include_router(
+    JobRouter,
+    tags=["Jobs"],
+    prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/jobs",
+)
+
 app.include_router(
     AuthRouter,
     tags=["Auth"],
     prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/auth",
 )
+
+app.include_router(
+    ModelRouter,
+    tags=["Models"],
+    prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/models",
+)
+
+# after the models, so that the index starts from the loaded active model
+app.include_router(
+    PaperRouter,
+    tags=["Papers"],
+    prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/papers",
+)
+
+app.include_router(
+    MetricsRouter,
+    tags=["Metrics"],
+    prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/metrics",
+)
+
+app.include_router(
+    ProfilingRouter,
+    tags=["Profiling"],
+    prefix=f"/api/v{nlp_land_prediction_endpoint.__version__.split('.')[0]}/profiling",
+)
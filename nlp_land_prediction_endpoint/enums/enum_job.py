@@ -0,0 +1,16 @@
+"""This module implements the enums of topic jobs."""
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    """The state of a topic job.
+
+    Args:
+        str ([type]): The type of this enum.
+        Enum ([Any]): The parent class of this enum.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
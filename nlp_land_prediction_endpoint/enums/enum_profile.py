@@ -0,0 +1,15 @@
+"""This module implements the enums of topic profiles."""
+from enum import Enum
+
+
+class ProfileKind(str, Enum):
+    """Which ids of the papers a topic profile belongs to.
+
+    Args:
+        str ([type]): The type of this enum.
+        Enum ([Any]): The parent class of this enum.
+    """
+
+    AUTHOR = "author"
+    FIRST_AUTHOR = "firstAuthor"
+    VENUE = "venue"
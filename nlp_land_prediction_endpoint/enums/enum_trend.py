@@ -0,0 +1,14 @@
+"""This module implements the enums of topic trends."""
+from enum import Enum
+
+
+class Granularity(str, Enum):
+    """The size of the time buckets of a topic trend.
+
+    Args:
+        str ([type]): The type of this enum.
+        Enum ([Any]): The parent class of this enum.
+    """
+
+    MONTH = "month"
+    YEAR = "year"
@@ -1,10 +1,12 @@
 """Middlware that allows for protection of endoints using JWTs"""
+import hashlib
+import math
 from datetime import datetime, timedelta
 from typing import Optional
 
+import httpx
 import jwt
 import pydantic
-import requests  # type: ignore
 from decouple import config  # type: ignore
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -12,10 +14,26 @@ from fastapi.security import OAuth2PasswordBearer
 from nlp_land_prediction_endpoint.models.model_token_data import TokenData
 from nlp_land_prediction_endpoint.models.model_user import UserModel
 from nlp_land_prediction_endpoint.models.model_user_login import UserLoginModel
+from nlp_land_prediction_endpoint.utils.http_client import backend_client
+from nlp_land_prediction_endpoint.utils.login_cache import LoginCache
+from nlp_land_prediction_endpoint.utils.metrics import stage
+from nlp_land_prediction_endpoint.utils.ttl_cache import TTLCache
+from nlp_land_prediction_endpoint.utils.version_getter import VERSION_RETRY_SECONDS
 
 token_url = config("AUTH_TOKEN_ROUTE")
 jwt_scheme = OAuth2PasswordBearer(tokenUrl=token_url)
 
+JWT_SECRET = config("JWT_SECRET")
+JWT_SIGN_ALG = config("JWT_SIGN_ALG")
+
+# Users of already verified tokens by token digest; entries expire with the token
+token_cache: TTLCache[bytes, UserModel] = TTLCache(
+    config("TOKEN_CACHE_SIZE", default=4096, cast=int)
+)
+
+# Successful backend logins (LOGIN_CACHE_TTL_SECONDS, disabled by default)
+login_cache = LoginCache()
+
 
 def encode_token(data: dict) -> str:
     """Encodes supplied data into an JWT
@@ -25,9 +43,7 @@ def encode_token(data: dict) -> str:
     Returns:
         str: a valid JWT token
     """
-    SECRET = config("JWT_SECRET")
-    ALG = config("JWT_SIGN_ALG")
-    return jwt.encode(data, SECRET, ALG)
+    return jwt.encode(data, JWT_SECRET, JWT_SIGN_ALG)
 
 
 def decode_token(token: str) -> TokenData:
@@ -40,9 +56,7 @@ def decode_token(token: str) -> TokenData:
     Returns:
         TokenData: a TokenData model representing the decoded JWT token
     """
-    SECRET = config("JWT_SECRET")
-    ALG = config("JWT_SIGN_ALG")
-    return TokenData(**jwt.decode(token, SECRET, [ALG]))
+    return TokenData(**jwt.decode(token, JWT_SECRET, [JWT_SIGN_ALG]))
 
 
 def create_token(user: UserModel, expires_delta: timedelta = None) -> str:
@@ -67,13 +81,14 @@ def create_token(user: UserModel, expires_delta: timedelta = None) -> str:
     return token
 
 
-def authenticate_user(user: UserLoginModel) -> Optional[UserModel]:
-    """Checks whether the supplied UserModel contains valid
-    credentials. This is done by going through the authorization
-    endpoint specified in AUTH_LOGIN_ROUTE at the host AUTH_LOGIN_PROVIDER.
+async def _authenticate_backend(user: UserLoginModel) -> Optional[UserModel]:
+    """Authenticates a user at AUTH_BACKEND_LOGIN_ROUTE of the AUTH_BACKEND_URL
 
     Arguments:
-        user (UserModel): a user model to authenticate
+        user (UserLoginModel): the credentials to check
+
+    Raises:
+        HTTPException: 503 if the version of the backend is not discovered yet
 
     Returns:
         Optional[UserModel]: If the authentication was successful a UserModel object;
@@ -81,22 +96,46 @@ def authenticate_user(user: UserLoginModel) -> Optional[UserModel]:
     """
     login_provider = config("AUTH_BACKEND_URL")
     login_route = config("AUTH_BACKEND_LOGIN_ROUTE")
-    try:
-        r = requests.post(
-            f"{login_provider}{login_route}",
-            data=user.dict(),
-            headers={"content-type": "application/json"},
+    if "{version}" in login_provider:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The version of the authentication backend is not resolved yet",
+            headers={"Retry-After": str(math.ceil(VERSION_RETRY_SECONDS))},
         )
+    try:
+        with stage("backend_auth"):
+            r = await backend_client.request(
+                "POST", f"{login_provider}{login_route}", json=user.dict()
+            )
         if r.status_code == status.HTTP_200_OK:
             return UserModel(**r.json())
         else:
             return None
-    except requests.RequestException:
+    except httpx.HTTPError:
         return None
 
 
+async def authenticate_user(user: UserLoginModel) -> Optional[UserModel]:
+    """Checks whether the supplied UserModel contains valid
+    credentials. This is done by going through the authorization
+    endpoint specified in AUTH_LOGIN_ROUTE at the host AUTH_LOGIN_PROVIDER.
+    Successful logins may be served from the login cache, and identical
+    concurrent logins share one backend call.
+
+    Arguments:
+        user (UserModel): a user model to authenticate
+
+    Returns:
+        Optional[UserModel]: If the authentication was successful a UserModel object;
+        None otherwise
+    """
+    return await login_cache.authenticate(user, _authenticate_backend)
+
+
 async def get_current_user(token: str = Depends(jwt_scheme)) -> UserModel:
     """Returns the current user given a valid JWT
+    Verified tokens are cached until they expire, so repeated requests with the
+    same token skip the signature check and validation.
 
     Arguments:
         token (str): a bearer token taken from the "Authorization" header
@@ -105,14 +144,38 @@ async def get_current_user(token: str = Depends(jwt_scheme)) -> UserModel:
         UserModel: If the token is valid a UserModel with at least an email;
         None otherwise
     """
+    key = hashlib.sha256(token.encode()).digest()
+    user = token_cache.get(key)
+    if user is not None:
+        return user
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        decoded_token = decode_token(token)
-        user = UserModel(**decoded_token.dict())
+        with stage("jwt_decode"):
+            decoded_token = decode_token(token)
+            user = UserModel(**decoded_token.dict())
     except (jwt.exceptions.InvalidTokenError, pydantic.ValidationError):
         raise credentials_exception
+    if decoded_token.exp is not None:
+        token_cache.set(key, user, float(decoded_token.exp))
+    return user
+
+
+async def get_current_admin(user: UserModel = Depends(get_current_user)) -> UserModel:
+    """Returns the current user given a valid JWT of an admin
+
+    Arguments:
+        user (UserModel): the user of the supplied token
+
+    Returns:
+        UserModel: the user if it is an admin; raises a 403 otherwise
+    """
+    if not user.isAdmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
     return user
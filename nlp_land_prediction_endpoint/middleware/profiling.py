@@ -0,0 +1,217 @@
+"""Opt-in profiling of single requests for admins
+
+An admin adds the header "X-Profile: 1" (or the query flag "?profile=1") to a request to
+run it under cProfile. The profile is stored as <PROFILE_DIR>/<id>.pstats and its id is
+returned in the "X-Profile-Id" header of the response (see routes/route_profiling.py for the
+download). Requests without the flag pass through the middleware untouched.
+
+The event loop is profiled while the request is handled, so the profile also contains
+other requests served by the same worker at the same time. Python allows one profiler per
+thread, so a worker profiles one request at a time and answers further profiled requests
+with 409 until it is done. Topic inference of a profiled request runs in-process (see
+profiled_call) instead of in the inference pool so that the engine shows up in the profile.
+"""
+import asyncio
+import cProfile
+import os
+import pstats
+import threading
+import uuid
+from contextvars import ContextVar
+from typing import Callable, List, Optional, TypeVar
+
+from decouple import config  # type: ignore
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from nlp_land_prediction_endpoint.middleware.auth import get_current_user
+
+T = TypeVar("T")
+
+PROFILE_DIR = config("PROFILE_DIR", default="profiles")
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = b"profile="
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+class RequestProfile:
+    """The profiles collected for one request"""
+
+    def __init__(self) -> None:
+        """Creates an empty profile with a new id"""
+        self.id = uuid.uuid4().hex
+        self.profiles: List[cProfile.Profile] = []
+
+    def run(self, fn: Callable[..., T], *args: object) -> T:
+        """Runs a function under a new profiler in the current thread
+
+        Arguments:
+            fn (Callable[..., T]): the function
+            *args (object): its arguments
+
+        Returns:
+            T: the result of the function
+        """
+        profile = cProfile.Profile()
+        self.profiles.append(profile)
+        return profile.runcall(fn, *args)
+
+    def save(self, directory: str = PROFILE_DIR) -> str:
+        """Merges the collected profiles into a pstats file
+
+        Arguments:
+            directory (str): the directory of the stored profiles
+
+        Returns:
+            str: the path of the stored profile
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = profile_path(self.id, directory)
+        stats = pstats.Stats(*self.profiles)
+        stats.dump_stats(path)
+        return path
+
+
+_active: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+# held while the event loop runs under the profiler of a request
+_loop_profiled = threading.Lock()
+
+
+def profile_path(profile_id: str, directory: str = PROFILE_DIR) -> str:
+    """Returns the file of a stored profile
+
+    Arguments:
+        profile_id (str): the id of the profile
+        directory (str): the directory of the stored profiles
+
+    Returns:
+        str: the path of the pstats file
+    """
+    return os.path.join(directory, f"{profile_id}.pstats")
+
+
+def is_profiling() -> bool:
+    """Whether the current request is profiled
+
+    Returns:
+        bool: True inside a profiled request
+    """
+    return _active.get() is not None
+
+
+async def profiled_call(fn: Callable[..., T], *args: object) -> T:
+    """Runs a CPU-bound function of a profiled request in a thread under the profiler
+
+    Arguments:
+        fn (Callable[..., T]): the function
+        *args (object): its arguments
+
+    Returns:
+        T: the result of the function
+    """
+    profile = _active.get()
+    assert profile is not None
+    return await asyncio.get_event_loop().run_in_executor(None, profile.run, fn, *args)
+
+
+def _requested(scope: Scope) -> bool:
+    """Checks the header and the query flag
+
+    Arguments:
+        scope (Scope): the ASGI scope of the request
+
+    Returns:
+        bool: True if the request asks to be profiled
+    """
+    query = scope.get("query_string", b"")
+    if PROFILE_QUERY in query:
+        for part in query.split(b"&"):
+            if part.startswith(PROFILE_QUERY) and part[len(PROFILE_QUERY) :] not in (b"", b"0"):
+                return True
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            return value not in (b"", b"0")
+    return False
+
+
+async def _is_admin(scope: Scope) -> bool:
+    """Checks whether the bearer token of a request belongs to an admin
+
+    Arguments:
+        scope (Scope): the ASGI scope of the request
+
+    Returns:
+        bool: True for a valid token of an admin
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            try:
+                user = await get_current_user(token)
+            except HTTPException:
+                return False
+            return bool(user.isAdmin)
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests of admins that ask for it"""
+
+    def __init__(self, app: ASGIApp, directory: str = PROFILE_DIR) -> None:
+        """Wraps an ASGI app
+
+        Arguments:
+            app (ASGIApp): the wrapped app
+            directory (str): the directory of the stored profiles
+        """
+        self.app = app
+        self.directory = directory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handles a request, under the profiler if an admin asks for it
+
+        The profiler of the event loop records everything the loop runs while the request
+        is handled, including other requests. It is not reentrant, so a profiled request
+        is answered with 409 while another one is profiled.
+
+        Arguments:
+            scope (Scope): the ASGI scope
+            receive (Receive): the ASGI receive channel
+            send (Send): the ASGI send channel
+        """
+        if scope["type"] != "http" or not _requested(scope) or not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _loop_profiled.acquire(blocking=False):
+            response = JSONResponse(
+                {"detail": "Another request is being profiled"},
+                status_code=status.HTTP_409_CONFLICT,
+            )
+            await response(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        loop_profile = cProfile.Profile()
+        profile.profiles.append(loop_profile)
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile.id.encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                loop_profile.disable()
+                await asyncio.get_event_loop().run_in_executor(None, profile.save, self.directory)
+            await send(message)
+
+        token = _active.set(profile)
+        loop_profile.enable()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            loop_profile.disable()
+            _active.reset(token)
+            _loop_profiled.release()
@@ -0,0 +1,59 @@
+"""This module implements the schemas for citation influence."""
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class InfluentialPaperModel(BaseModel):
+    """A paper and its influence on a topic.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    score: float = Field(..., description="Topic-personalized PageRank of the paper.")
+
+
+class TopicInfluenceModel(BaseModel):
+    """The most influential papers of a topic.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    name: str = Field(...)
+    keywords: List[str] = Field(...)
+    papers: List[InfluentialPaperModel] = Field(..., description="Ordered by descending score.")
+
+
+class InfluenceResponseModel(BaseModel):
+    """The most influential papers of each topic in the citation graph.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    edges: int = Field(..., description="Number of citations between indexed papers.")
+    topics: List[TopicInfluenceModel] = Field(...)
+
+    class Config:
+        """Configuration for the InfluenceResponseModel."""
+
+        schema_extra = {
+            "example": {
+                "edges": 2,
+                "topics": [
+                    {
+                        "id": "c29c5708c4cbab4ffe13bfa1",
+                        "name": "parsing, syntax, treebank",
+                        "keywords": ["parsing", "syntax", "treebank"],
+                        "papers": [
+                            {"id": "5136bc054aed4daf9e2a1231", "score": 0.41},
+                            {"id": "5136bc054aed4daf9e2a1239", "score": 0.22},
+                        ],
+                    },
+                ],
+            }
+        }
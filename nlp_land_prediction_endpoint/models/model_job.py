@@ -0,0 +1,41 @@
+"""This module implements the schemas for topic jobs."""
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from nlp_land_prediction_endpoint.enums.enum_job import JobStatus
+
+
+class JobModel(BaseModel):
+    """The state and progress of a topic job.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    status: JobStatus = Field(...)
+    total: int = Field(..., description="Number of papers of the job.")
+    processed: int = Field(..., description="Number of papers scored so far.")
+    progress: float = Field(..., description="Fraction of the papers scored so far.")
+    model: Optional[str] = Field(None, description="The stored model the papers are scored with.")
+    error: Optional[str] = Field(None)
+    created_at: float = Field(..., description="Submission time (seconds since the epoch).")
+    updated_at: float = Field(..., description="Time of the last progress.")
+
+    class Config:
+        """Configuration for the JobModel."""
+
+        schema_extra = {
+            "example": {
+                "id": "0b7f4c3e9a2d4f6b8c1e5a7d9f3b2c4e",
+                "status": "running",
+                "total": 80000,
+                "processed": 23000,
+                "progress": 0.2875,
+                "model": "models/acl/a71d09c2e5f3",
+                "error": None,
+                "created_at": 1660000000.0,
+                "updated_at": 1660000042.5,
+            }
+        }
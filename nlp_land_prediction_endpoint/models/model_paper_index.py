@@ -0,0 +1,36 @@
+"""This module implements the schemas for the paper index."""
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PaperIndexModel(BaseModel):
+    """The state of the paper index.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    model: Optional[str] = Field(None, description="Name and version of the scoring model.")
+    papers: int = Field(..., description="Number of indexed papers.")
+    facets: Dict[str, Dict[str, int]] = Field(
+        ..., description="Number of papers per value of each facet."
+    )
+
+    class Config:
+        """Configuration for the PaperIndexModel."""
+
+        schema_extra = {
+            "example": {
+                "model": "acl/a71d09c2e5f3",
+                "papers": 2,
+                "facets": {
+                    "typeOfPaper": {"conference": 1, "workshop": 1},
+                    "shortOrLong": {"long": 2},
+                    "abstractExtractor": {"grobid": 2},
+                    "atMainConference": {"false": 1, "true": 1},
+                    "isSharedTask": {"false": 2},
+                    "isStudentPaper": {"false": 2},
+                },
+            }
+        }
@@ -0,0 +1,59 @@
+"""This module implements the schemas for topic profiles."""
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from nlp_land_prediction_endpoint.enums.enum_profile import ProfileKind
+
+
+class ProfileTopicModel(BaseModel):
+    """The share of a topic in a profile.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    name: str = Field(...)
+    keywords: List[str] = Field(...)
+    score: float = Field(..., description="Share of the topic of the total topic weight.")
+
+
+class ProfileModel(BaseModel):
+    """The topic distribution of the papers of an author or a venue.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    kind: ProfileKind = Field(...)
+    papers: int = Field(..., description="Number of indexed papers with the id.")
+    topics: List[ProfileTopicModel] = Field(..., description="Ordered by descending score.")
+    paper_ids: List[str] = Field(..., description="The papers with the id, in index order.")
+
+    class Config:
+        """Configuration for the ProfileModel."""
+
+        schema_extra = {
+            "example": {
+                "id": "5126bc054aed4daf9e2a1232",
+                "kind": "author",
+                "papers": 2,
+                "topics": [
+                    {
+                        "id": "c29c5708c4cbab4ffe13bfa1",
+                        "name": "parsing, syntax, treebank",
+                        "keywords": ["parsing", "syntax", "treebank"],
+                        "score": 0.75,
+                    },
+                    {
+                        "id": "5f0e0c3b3c1d4e9b8a7f6e5d",
+                        "name": "translation, decoder, attention",
+                        "keywords": ["translation", "decoder", "attention"],
+                        "score": 0.25,
+                    },
+                ],
+                "paper_ids": ["5136bc054aed4daf9e2a43203", "5136bc054aed4daf9e2a43204"],
+            }
+        }
@@ -0,0 +1,43 @@
+"""Models used for the topic model registry"""
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class RegisteredModel(BaseModel):
+    """A version of a registered topic model
+
+    Attributes:
+        name (str): name of the topic model
+        version (str): version of the topic model
+        parent (Optional[str]): version the topic model was updated from
+    """
+
+    name: str = Field(...)
+    version: str = Field(...)
+    parent: Optional[str] = Field(default=None)
+
+
+class RegistryResponseModel(BaseModel):
+    """All registered topic models and the active one
+
+    Attributes:
+        models (List[RegisteredModel]): all registered versions
+        active (Optional[RegisteredModel]): the model used for inference
+    """
+
+    models: List[RegisteredModel] = Field(...)
+    active: Optional[RegisteredModel] = Field(default=None)
+
+    class Config:
+        """Configuration for RegistryResponseModel"""
+
+        schema_extra = {
+            "example": {
+                "models": [
+                    {"name": "acl", "version": "3f1c2b9a0d4e", "parent": None},
+                    {"name": "acl", "version": "a71d09c2e5f3", "parent": "3f1c2b9a0d4e"},
+                ],
+                "active": {"name": "acl", "version": "a71d09c2e5f3", "parent": "3f1c2b9a0d4e"},
+            }
+        }
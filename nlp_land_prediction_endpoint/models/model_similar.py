@@ -0,0 +1,56 @@
+"""This module implements the schemas for similar papers."""
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SimilarQueryModel(BaseModel):
+    """A text to find similar papers for.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    title: str = Field("")
+    abstractText: str = Field(...)
+
+
+class SimilarPaperModel(BaseModel):
+    """A similar paper.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    score: float = Field(..., description="Cosine similarity of the embeddings.")
+
+
+class SimilarResponseModel(BaseModel):
+    """The most similar indexed papers.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    papers: List[SimilarPaperModel] = Field(..., description="Ordered by descending score.")
+    candidates: int = Field(..., description="Number of papers that were scored exactly.")
+    latency_ms: float = Field(..., description="Time of the search in milliseconds.")
+    recall: Optional[float] = Field(
+        None, description="Share of the exact top papers that were found, if requested."
+    )
+
+    class Config:
+        """Configuration for the SimilarResponseModel."""
+
+        schema_extra = {
+            "example": {
+                "papers": [
+                    {"id": "5136bc054aed4daf9e2a43204", "score": 0.83},
+                    {"id": "5136bc054aed4daf9e2a43207", "score": 0.61},
+                ],
+                "candidates": 2480,
+                "latency_ms": 1.9,
+                "recall": None,
+            }
+        }
@@ -1,5 +1,5 @@
 """This module implements the schemas for topics."""
-from typing import List
+from typing import List, Optional
 
 from bson.objectid import ObjectId  # type: ignore
 from pydantic import BaseModel, Field
@@ -17,6 +17,9 @@ class TopicModel(BaseModel):
     keywords: List[str] = Field(...)
     score: float = Field(...)
     paper_ids: List[str] = Field(...)
+    paper_count: Optional[int] = Field(
+        None, description="Total number of papers if paper_ids is only a page of them."
+    )
 
 
 class TopicResponseModel(BaseModel):
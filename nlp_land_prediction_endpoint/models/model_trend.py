@@ -0,0 +1,72 @@
+"""This module implements the schemas for topic trends."""
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from nlp_land_prediction_endpoint.enums.enum_trend import Granularity
+
+
+class TrendTopicModel(BaseModel):
+    """A topic of a trend.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    id: str = Field(...)
+    name: str = Field(...)
+    keywords: List[str] = Field(...)
+
+
+class TrendBucketModel(BaseModel):
+    """The prevalence of the topics in a period.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    period: str = Field(..., description="The month (YYYY-MM) or year (YYYY).")
+    papers: int = Field(..., description="Number of papers published in the period.")
+    scores: List[float] = Field(
+        ..., description="Share of each topic of the total topic weight in the period."
+    )
+
+
+class TopicTrendModel(BaseModel):
+    """The prevalence of the topics over time.
+
+    Args:
+        BaseModel (Any): Base class of FastAPI models.
+    """
+
+    granularity: Granularity = Field(...)
+    topics: List[TrendTopicModel] = Field(
+        ..., description="The topics in the order of the scores of each bucket."
+    )
+    buckets: List[TrendBucketModel] = Field(...)
+
+    class Config:
+        """Configuration for the TopicTrendModel."""
+
+        schema_extra = {
+            "example": {
+                "granularity": "year",
+                "topics": [
+                    {
+                        "id": "c29c5708c4cbab4ffe13bfa1",
+                        "name": "parsing, syntax, treebank",
+                        "keywords": ["parsing", "syntax", "treebank"],
+                    },
+                    {
+                        "id": "5f0e0c3b3c1d4e9b8a7f6e5d",
+                        "name": "translation, decoder, attention",
+                        "keywords": ["translation", "decoder", "attention"],
+                    },
+                ],
+                "buckets": [
+                    {"period": "2016", "papers": 120, "scores": [0.7, 0.3]},
+                    {"period": "2017", "papers": 0, "scores": [0.0, 0.0]},
+                    {"period": "2018", "papers": 180, "scores": [0.4, 0.6]},
+                ],
+            }
+        }
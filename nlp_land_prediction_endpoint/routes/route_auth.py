@@ -13,8 +13,9 @@ from nlp_land_prediction_endpoint.models.model_token import TokenModel
 from nlp_land_prediction_endpoint.models.model_token_data import TokenData
 from nlp_land_prediction_endpoint.models.model_user import UserModel
 from nlp_land_prediction_endpoint.models.model_user_login import UserLoginModel
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 TIME_DELTA = config("JWT_TOKEN_EXPIRATION_MINUTES", cast=int)
 
@@ -29,7 +30,7 @@ async def login(user: UserLoginModel) -> TokenModel:
     Returns:
         TokenModel: a JWT given a valid user from the NLP-Land-Backend
     """
-    auth_user = authenticate_user(user)
+    auth_user = await authenticate_user(user)
     if not auth_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
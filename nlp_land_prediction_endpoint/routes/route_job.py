@@ -0,0 +1,201 @@
+"""This module implements the endpoints of background topic jobs."""
+import asyncio
+from functools import partial
+
+from decouple import config  # type: ignore
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from nlp_land_prediction_endpoint.enums.enum_job import JobStatus
+from nlp_land_prediction_endpoint.middleware.auth import get_current_user
+from nlp_land_prediction_endpoint.models.model_job import JobModel
+from nlp_land_prediction_endpoint.models.model_topic import (
+    TopicModel,
+    TopicResponseModel,
+)
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.utils.inference_pool import InferencePool
+from nlp_land_prediction_endpoint.utils.job_store import open_store
+from nlp_land_prediction_endpoint.utils.jobs import JobRunner, make_job
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute, stage
+from nlp_land_prediction_endpoint.utils.model_registry import registry, warm
+from nlp_land_prediction_endpoint.utils.paper_records import RecordError, parse_records
+from nlp_land_prediction_endpoint.utils.topic_json import (
+    PaperIdsPage,
+    TopicJSONResponse,
+    encode_topics,
+    paper_ids_page,
+)
+
+router = APIRouter(route_class=MetricsRoute)
+
+# Jobs get their own workers so that they never compete with interactive topic requests
+JOB_POOL_WORKERS = config("JOB_POOL_WORKERS", default=1, cast=int)
+
+pool = InferencePool(workers=JOB_POOL_WORKERS, max_pending=max(JOB_POOL_WORKERS, 1))
+registry.warmers.append(partial(pool.broadcast, warm))
+runner = JobRunner(open_store(), pool)
+
+
+@router.on_event("startup")
+async def start_jobs() -> None:
+    """Start the job workers and look for queued jobs."""
+    await pool.start()
+    await runner.start()
+
+
+@router.on_event("shutdown")
+async def stop_jobs() -> None:
+    """Stop processing jobs; interrupted jobs are continued after a restart."""
+    await runner.stop()
+    await pool.stop()
+
+
+def _job_model(job: dict) -> JobModel:
+    """Craft the response describing a job.
+
+    Args:
+        job (dict): The stored job.
+
+    Returns:
+        JobModel: The state and progress of the job.
+    """
+    return JobModel(
+        id=job["id"],
+        status=job["status"],
+        total=job["total"],
+        processed=job["processed"],
+        progress=job["processed"] / job["total"] if job["total"] else 1.0,
+        model=job["model"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+    )
+
+
+async def _get_job(job_id: str, user: UserModel) -> dict:
+    """Look up a job of the user.
+
+    Args:
+        job_id (str): Id of the job.
+        user (UserModel): The authenticated user; admins may see all jobs.
+
+    Raises:
+        HTTPException: 404 if there is no such job of the user.
+
+    Returns:
+        dict: The stored job.
+    """
+    job = await runner.store.get(job_id)
+    if job is None or (job["owner"] != user.email and not user.isAdmin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post(
+    "/",
+    response_description="The submitted topic job.",
+    response_model=JobModel,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_job(request: Request, user: UserModel = Depends(get_current_user)) -> JobModel:
+    """Submit a corpus whose topics are computed in the background.
+
+    The body is a JSON list of PaperModel objects like for /topics/bulk; only the fields the
+    topics depend on are decoded and checked. The papers are scored with the active model,
+    or else with topics learned from a sample of the corpus. Poll the job with GET /{job_id}
+    and fetch the topics with GET /{job_id}/topics when it is done.
+
+    Args:
+        request (Request): The request with a JSON list of papers as body.
+        user (UserModel): The authenticated caller.
+
+    Raises:
+        HTTPException: 422 if a paper misses one of the fields the topics depend on.
+
+    Returns:
+        JobModel: The queued job.
+    """
+    try:
+        body = await request.body()
+        with stage("validation"):
+            records = parse_records(body)
+    except RecordError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors)
+    active = registry.active
+    job, chunks = await asyncio.get_event_loop().run_in_executor(
+        None, make_job, records, user.email, active.path if active else None
+    )
+    await runner.store.create(job, chunks)
+    return _job_model(job)
+
+
+@router.get(
+    "/{job_id}",
+    response_description="State and progress of a topic job.",
+    response_model=JobModel,
+    status_code=status.HTTP_200_OK,
+)
+async def get_job(job_id: str, user: UserModel = Depends(get_current_user)) -> JobModel:
+    """Poll the state and progress of a job.
+
+    Args:
+        job_id (str): Id of the job.
+        user (UserModel): The authenticated caller.
+
+    Returns:
+        JobModel: The state and progress of the job.
+    """
+    return _job_model(await _get_job(job_id, user))
+
+
+@router.get(
+    "/{job_id}/topics",
+    response_description="Topics of a finished topic job.",
+    response_model=TopicResponseModel,
+    response_class=TopicJSONResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_job_topics(
+    job_id: str,
+    page: PaperIdsPage = Depends(paper_ids_page),
+    user: UserModel = Depends(get_current_user),
+) -> TopicJSONResponse:
+    """Fetch the topics of a finished job.
+
+    The paper ids of each topic are ordered by their weight and read page by page from the
+    store's index, so large results are best fetched with paper_ids_limit.
+
+    Args:
+        job_id (str): Id of the job.
+        page (PaperIdsPage): The paper ids of each topic to return.
+        user (UserModel): The authenticated caller.
+
+    Raises:
+        HTTPException: 409 if the job is not done yet.
+
+    Returns:
+        TopicJSONResponse: The topics of the whole corpus of the job.
+    """
+    job = await _get_job(job_id, user)
+    if job["status"] != JobStatus.DONE.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Job {job_id} is {job['status']}"
+        )
+    total = sum(job["weights"])
+    topics = []
+    for index in sorted(range(len(job["topics"])), key=lambda index: -job["weights"][index]):
+        if job["weights"][index] <= 0:
+            continue
+        topic = job["topics"][index]
+        paper_ids = await runner.store.paper_ids(job_id, index, page.offset, page.limit)
+        topics.append(
+            TopicModel.construct(
+                id=topic["id"],
+                name=topic["name"],
+                keywords=topic["keywords"],
+                score=job["weights"][index] / total,
+                paper_ids=paper_ids,
+                paper_count=None if page.is_complete else await runner.store.count(job_id, index),
+            )
+        )
+    return TopicJSONResponse(encode_topics(TopicResponseModel.construct(topics=topics)))
@@ -0,0 +1,64 @@
+"""This module implements the Prometheus metrics endpoint."""
+import asyncio
+from typing import List
+
+from decouple import config  # type: ignore
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from nlp_land_prediction_endpoint.routes.route_topic import pool, scheduler
+from nlp_land_prediction_endpoint.utils.metrics import (
+    CONTENT_TYPE_LATEST,
+    QUEUE_DEPTH,
+    latest,
+    mark_process_dead,
+)
+
+router = APIRouter()
+
+SAMPLE_SECONDS = config("METRICS_SAMPLE_SECONDS", default=1, cast=float)
+
+_sample_tasks: List[asyncio.Task] = []
+
+
+def sample_queue_depth() -> None:
+    """Export the current queue depths of the topic inference of this worker."""
+    QUEUE_DEPTH.labels("scheduler").set(scheduler.queue_depth)
+    QUEUE_DEPTH.labels("pool").set(pool.pending)
+
+
+async def _sample_forever() -> None:
+    """Keep the queue depth gauges of this worker up to date."""
+    while True:
+        sample_queue_depth()
+        await asyncio.sleep(SAMPLE_SECONDS)
+
+
+@router.on_event("startup")
+async def start_sampling() -> None:
+    """Start sampling the queue depths."""
+    _sample_tasks.append(asyncio.ensure_future(_sample_forever()))
+
+
+@router.on_event("shutdown")
+async def stop_sampling() -> None:
+    """Stop sampling and remove the live gauges of this worker."""
+    while _sample_tasks:
+        _sample_tasks.pop().cancel()
+    mark_process_dead()
+
+
+@router.get(
+    "/",
+    response_description="Metrics of all workers in the Prometheus text format.",
+    response_class=Response,
+    responses={200: {"content": {CONTENT_TYPE_LATEST: {}}}},
+)
+async def metrics() -> Response:
+    """Request counts and latencies per router and stage, in-flight requests and queue depths.
+
+    Returns:
+        Response: The metrics in the Prometheus text format.
+    """
+    sample_queue_depth()
+    return latest()
@@ -0,0 +1,151 @@
+"""This module implements the endpoints of the topic model registry."""
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from nlp_land_prediction_endpoint.middleware.auth import (
+    get_current_admin,
+    get_current_user,
+)
+from nlp_land_prediction_endpoint.models.model_registry import (
+    RegisteredModel,
+    RegistryResponseModel,
+)
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute
+from nlp_land_prediction_endpoint.utils.model_registry import (
+    MODEL_REFRESH_SECONDS,
+    ModelNotFoundError,
+    registry,
+)
+
+router = APIRouter(route_class=MetricsRoute)
+
+_refresh_tasks: List[asyncio.Task] = []
+
+
+async def _refresh_forever() -> None:
+    """Follow model switches of sibling workers."""
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(MODEL_REFRESH_SECONDS)
+        await loop.run_in_executor(None, registry.refresh)
+
+
+@router.on_event("startup")
+async def start_refresh() -> None:
+    """Load and pre-warm the active model before serving and follow later switches."""
+    await asyncio.get_event_loop().run_in_executor(None, registry.refresh)
+    _refresh_tasks.append(asyncio.ensure_future(_refresh_forever()))
+
+
+@router.on_event("shutdown")
+async def stop_refresh() -> None:
+    """Stop following model switches."""
+    while _refresh_tasks:
+        _refresh_tasks.pop().cancel()
+
+
+def _registry_response() -> RegistryResponseModel:
+    """Craft the response describing the registry.
+
+    Returns:
+        RegistryResponseModel: All registered models and the active one.
+    """
+    active = registry.active
+    models = [
+        RegisteredModel(name=name, version=version, parent=registry.parent(name, version))
+        for name, versions in registry.list_models().items()
+        for version in versions
+    ]
+    return RegistryResponseModel(
+        models=models,
+        active=next(
+            (
+                model
+                for model in models
+                if active and (model.name, model.version) == (active.name, active.version)
+            ),
+            None,
+        ),
+    )
+
+
+@router.get(
+    "/",
+    response_description="Registered topic models.",
+    response_model=RegistryResponseModel,
+    status_code=status.HTTP_200_OK,
+)
+async def list_models(user: UserModel = Depends(get_current_user)) -> RegistryResponseModel:
+    """List all registered topic models and the active one.
+
+    Args:
+        user (UserModel): The authenticated user.
+
+    Returns:
+        RegistryResponseModel: All registered models and the active one.
+    """
+    return _registry_response()
+
+
+@router.post(
+    "/{name}/{version}/activate",
+    response_description="Switch the active topic model.",
+    response_model=RegistryResponseModel,
+    status_code=status.HTTP_200_OK,
+)
+async def activate_model(
+    name: str, version: str, admin: UserModel = Depends(get_current_admin)
+) -> RegistryResponseModel:
+    """Pre-warm a model version and make it the active one in all workers.
+
+    Requests that are already running finish with the previous model.
+
+    Args:
+        name (str): Name of the model.
+        version (str): Version of the model.
+        admin (UserModel): The authenticated admin.
+
+    Raises:
+        HTTPException: 404 if the model version is not registered.
+
+    Returns:
+        RegistryResponseModel: All registered models and the now active one.
+    """
+    try:
+        await asyncio.get_event_loop().run_in_executor(None, registry.activate, name, version)
+    except ModelNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Model {name}/{version} not found"
+        )
+    return _registry_response()
+
+
+@router.post(
+    "/{name}/rollback",
+    response_description="Switch back to the version the active model was updated from.",
+    response_model=RegistryResponseModel,
+    status_code=status.HTTP_200_OK,
+)
+async def rollback_model(
+    name: str, admin: UserModel = Depends(get_current_admin)
+) -> RegistryResponseModel:
+    """Roll back the last update of the active model by activating its parent version.
+
+    Args:
+        name (str): Name of the active model.
+        admin (UserModel): The authenticated admin.
+
+    Raises:
+        HTTPException: 404 if the model is not active or was not updated from another version.
+
+    Returns:
+        RegistryResponseModel: All registered models and the now active one.
+    """
+    try:
+        await asyncio.get_event_loop().run_in_executor(None, registry.rollback, name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cannot roll back: {e}")
+    return _registry_response()
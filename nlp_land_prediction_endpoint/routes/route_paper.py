@@ -0,0 +1,483 @@
+"""This module implements the endpoints of the paper index."""
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from nlp_land_prediction_endpoint.enums.enum_paper import (
+    ExtractionMethod,
+    ShortLong,
+    TypeOfPaper,
+)
+from nlp_land_prediction_endpoint.enums.enum_profile import ProfileKind
+from nlp_land_prediction_endpoint.enums.enum_trend import Granularity
+from nlp_land_prediction_endpoint.middleware.auth import get_current_user
+from nlp_land_prediction_endpoint.models.model_influence import (
+    InfluenceResponseModel,
+    InfluentialPaperModel,
+    TopicInfluenceModel,
+)
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_paper_index import PaperIndexModel
+from nlp_land_prediction_endpoint.models.model_profile import (
+    ProfileModel,
+    ProfileTopicModel,
+)
+from nlp_land_prediction_endpoint.models.model_similar import (
+    SimilarPaperModel,
+    SimilarQueryModel,
+    SimilarResponseModel,
+)
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.models.model_trend import (
+    TopicTrendModel,
+    TrendBucketModel,
+    TrendTopicModel,
+)
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.routes.route_topic import (
+    pool,
+    pool_saturated_exception,
+)
+from nlp_land_prediction_endpoint.utils.citation_graph import CitationGraph
+from nlp_land_prediction_endpoint.utils.facet_index import FacetIndex, Filters
+from nlp_land_prediction_endpoint.utils.inference_pool import PoolSaturatedError
+from nlp_land_prediction_endpoint.utils.jobs import describe_topics, score_chunk
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute, stage
+from nlp_land_prediction_endpoint.utils.model_registry import registry
+from nlp_land_prediction_endpoint.utils.paper_index import (
+    PAPER_INDEX_REFRESH_SECONDS,
+    PaperIndex,
+)
+from nlp_land_prediction_endpoint.utils.profile_index import ProfileIndex
+from nlp_land_prediction_endpoint.utils.similarity_index import (
+    Neighbours,
+    SimilarityIndex,
+    embed,
+)
+from nlp_land_prediction_endpoint.utils.topic_engine import paper_text
+from nlp_land_prediction_endpoint.utils.topic_json import (
+    PaperIdsPage,
+    TopicJSONResponse,
+    encode_topics,
+    paper_ids_page,
+)
+from nlp_land_prediction_endpoint.utils.trend_index import TrendIndex, parse_period
+
+router = APIRouter(route_class=MetricsRoute)
+
+facets = FacetIndex()
+trends = TrendIndex()
+citations = CitationGraph()
+profiles = ProfileIndex()
+papers = PaperIndex([facets, trends, citations, profiles])
+similar = SimilarityIndex(papers)
+papers.listeners.append(similar)
+
+_refresh_tasks: List[asyncio.Task] = []
+
+
+async def _refresh_forever() -> None:
+    """Apply the papers indexed by sibling workers."""
+    while True:
+        await asyncio.sleep(PAPER_INDEX_REFRESH_SECONDS)
+        await papers.refresh(registry.active)
+
+
+@router.on_event("startup")
+async def start_refresh() -> None:
+    """Rebuild the index from the log of the active model and follow later additions."""
+    await papers.refresh(registry.active)
+    if similar.n > similar.saved_n:
+        await asyncio.get_event_loop().run_in_executor(None, similar.save)
+    _refresh_tasks.append(asyncio.ensure_future(_refresh_forever()))
+
+
+@router.on_event("shutdown")
+async def stop_refresh() -> None:
+    """Stop following the log and store the embeddings for the next start."""
+    while _refresh_tasks:
+        _refresh_tasks.pop().cancel()
+    if similar.n > similar.saved_n:
+        similar.save()
+
+
+def facet_filters(
+    typeOfPaper: Optional[List[TypeOfPaper]] = Query(None),  # noqa: N803
+    shortOrLong: Optional[List[ShortLong]] = Query(None),  # noqa: N803
+    abstractExtractor: Optional[List[ExtractionMethod]] = Query(None),  # noqa: N803
+    atMainConference: Optional[bool] = Query(None),  # noqa: N803
+    isSharedTask: Optional[bool] = Query(None),  # noqa: N803
+    isStudentPaper: Optional[bool] = Query(None),  # noqa: N803
+) -> Filters:
+    """Read the facet filters from the query.
+
+    Repeating a parameter accepts any of its values; different parameters must all match.
+
+    Args:
+        typeOfPaper (Optional[List[TypeOfPaper]]): The accepted types of paper.
+        shortOrLong (Optional[List[ShortLong]]): The accepted lengths.
+        abstractExtractor (Optional[List[ExtractionMethod]]): The accepted extraction methods.
+        atMainConference (Optional[bool]): Whether the papers are at the main conference.
+        isSharedTask (Optional[bool]): Whether the papers are shared task papers.
+        isStudentPaper (Optional[bool]): Whether the papers are student papers.
+
+    Returns:
+        Filters: The accepted values of each filtered facet.
+    """
+    flags = {
+        "atMainConference": atMainConference,
+        "isSharedTask": isSharedTask,
+        "isStudentPaper": isStudentPaper,
+    }
+    return {
+        "typeOfPaper": typeOfPaper,
+        "shortOrLong": shortOrLong,
+        "abstractExtractor": abstractExtractor,
+        **{facet: None if flag is None else [flag] for facet, flag in flags.items()},
+    }
+
+
+def _index_model() -> PaperIndexModel:
+    """Craft the response describing the index.
+
+    Returns:
+        PaperIndexModel: The model, size and facet counts of the index.
+    """
+    model = papers.model
+    return PaperIndexModel(
+        model=f"{model.name}/{model.version}" if model else None,
+        papers=len(papers.ids),
+        facets=facets.counts(),
+    )
+
+
+@router.post(
+    "/",
+    response_description="The state of the paper index after adding the papers.",
+    response_model=PaperIndexModel,
+    status_code=status.HTTP_200_OK,
+)
+async def add_papers(
+    new_papers: List[PaperModel], user: UserModel = Depends(get_current_user)
+) -> PaperIndexModel:
+    """Score papers with the active model and add them to the paper index.
+
+    Papers that are already indexed are replaced. All workers serve the added papers after
+    at most PAPER_INDEX_REFRESH_SECONDS.
+
+    Args:
+        new_papers (List[PaperModel]): The papers to index.
+        user (UserModel): The authenticated caller.
+
+    Raises:
+        HTTPException: 409 without an active model, 503 if the inference pool is saturated.
+
+    Returns:
+        PaperIndexModel: The state of the index.
+    """
+    model = registry.active
+    if model is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Papers are indexed with an active model"
+        )
+    try:
+        with stage("inference"):
+            weights = await pool.run(
+                score_chunk, [paper_text(paper) for paper in new_papers], model.path, None
+            )
+    except PoolSaturatedError:
+        raise pool_saturated_exception
+    records = [paper.dict() for paper in new_papers]
+    await asyncio.get_event_loop().run_in_executor(None, papers.append, model, records, weights)
+    await papers.refresh(registry.active)
+    return _index_model()
+
+
+@router.get(
+    "/",
+    response_description="The state of the paper index.",
+    response_model=PaperIndexModel,
+    status_code=status.HTTP_200_OK,
+)
+async def get_index() -> PaperIndexModel:
+    """Get the scoring model, size and facet counts of the paper index.
+
+    Returns:
+        PaperIndexModel: The state of the index.
+    """
+    return _index_model()
+
+
+@router.get(
+    "/topics",
+    response_description="Topics of the indexed papers that match the facet filters.",
+    response_model=TopicResponseModel,
+    response_class=TopicJSONResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_topics(
+    filters: Filters = Depends(facet_filters),
+    page: PaperIdsPage = Depends(paper_ids_page),
+) -> TopicJSONResponse:
+    """Aggregate the topics of the indexed papers that match the facet filters.
+
+    The filters are resolved on bitmaps of the facet values and the topics are aggregated
+    from the stored topic weights of the matching papers, without scoring them again.
+
+    Args:
+        filters (Filters): The accepted values of each filtered facet.
+        page (PaperIdsPage): The paper ids of each topic to return.
+
+    Returns:
+        TopicJSONResponse: The topics of the matching papers.
+    """
+    return TopicJSONResponse(encode_topics(papers.topics(facets.rows(filters)), page))
+
+
+@router.get(
+    "/trends",
+    response_description="Prevalence of the topics of the indexed papers over time.",
+    response_model=TopicTrendModel,
+    status_code=status.HTTP_200_OK,
+)
+async def get_trends(
+    granularity: Granularity = Granularity.YEAR,
+    start: Optional[str] = Query(None, description="The first month (YYYY-MM) or year (YYYY)."),
+    end: Optional[str] = Query(None, description="The last month (YYYY-MM) or year (YYYY)."),
+) -> TopicTrendModel:
+    """Get the prevalence of the topics per month or year of publication.
+
+    The topic weights of the papers are summed per month when the papers are indexed, so the
+    cost of a trend only depends on the number of periods in the range.
+
+    Args:
+        granularity (Granularity): Whether to aggregate per month or per year.
+        start (Optional[str]): The first period; defaults to the earliest indexed paper.
+        end (Optional[str]): The last period; defaults to the latest indexed paper.
+
+    Raises:
+        HTTPException: 422 if start or end is neither a month nor a year.
+
+    Returns:
+        TopicTrendModel: The topics and their share of the topic weight in each period.
+    """
+    try:
+        first = None if start is None else parse_period(start)
+        last = None if end is None else parse_period(end, end=True)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    trend = trends.trend(first, last, granularity)
+    totals = trend.weights.sum(axis=1, keepdims=True)
+    scores = np.divide(trend.weights, totals, out=np.zeros_like(trend.weights), where=totals > 0)
+    return TopicTrendModel(
+        granularity=granularity,
+        topics=[
+            TrendTopicModel(**topic)
+            for topic in (describe_topics(papers.model.engine) if papers.model else [])
+        ],
+        buckets=[
+            TrendBucketModel(period=period, papers=count, scores=bucket_scores)
+            for period, count, bucket_scores in zip(
+                trend.periods, trend.papers.tolist(), scores.tolist()
+            )
+        ],
+    )
+
+
+@router.get(
+    "/influence",
+    response_description="The most influential papers of each topic in the citation graph.",
+    response_model=InfluenceResponseModel,
+    status_code=status.HTTP_200_OK,
+)
+async def get_influence(
+    limit: int = Query(10, ge=1, le=1000, description="Number of papers per topic.")
+) -> InfluenceResponseModel:
+    """Rank the indexed papers by their citation influence on each topic.
+
+    The scores are a PageRank over the citations (citedBy) between the indexed papers that
+    teleports to the papers of the topic. They are cached until papers are added.
+
+    Args:
+        limit (int): Number of papers per topic.
+
+    Returns:
+        InfluenceResponseModel: The papers with the highest score of each topic.
+    """
+    if papers.model is None or not papers.ids:
+        return InfluenceResponseModel(edges=0, topics=[])
+    model, ids = papers.model, papers.ids
+    ranks = await citations.ranks(papers.weights)
+    topics = []
+    for topic, description in enumerate(describe_topics(model.engine)):
+        column = ranks[:, topic]
+        top = np.argpartition(-column, min(limit, len(column)) - 1)[:limit]
+        top = top[np.argsort(-column[top], kind="stable")]
+        topics.append(
+            TopicInfluenceModel(
+                **description,
+                papers=[
+                    InfluentialPaperModel(id=ids[row], score=score)
+                    for row, score in zip(top.tolist(), column[top].tolist())
+                ],
+            )
+        )
+    return InfluenceResponseModel(edges=citations.n_citations, topics=topics)
+
+
+@router.get(
+    "/profiles/{kind}/{profile_id}",
+    response_description="The topic profile of an author, first author or venue.",
+    response_model=ProfileModel,
+    status_code=status.HTTP_200_OK,
+)
+async def get_profile(
+    kind: ProfileKind,
+    profile_id: str,
+    page: PaperIdsPage = Depends(paper_ids_page),
+) -> ProfileModel:
+    """Get the topic distribution of the indexed papers of an author or a venue.
+
+    The topic weights and papers of each id are rolled up when the papers are indexed, so
+    the lookup does not depend on the number of papers.
+
+    Args:
+        kind (ProfileKind): Whether the id is in authors, firstAuthor or venues.
+        profile_id (str): The id of the author or venue.
+        page (PaperIdsPage): The paper ids to return.
+
+    Raises:
+        HTTPException: 404 if no indexed paper has the id.
+
+    Returns:
+        ProfileModel: The topic distribution and the papers of the id.
+    """
+    profile = profiles.profile(kind, profile_id)
+    if profile is None or papers.model is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"No papers of {kind.value} {profile_id}"
+        )
+    total = profile.weights.sum()
+    scores = profile.weights / total if total > 0 else profile.weights
+    topics = [
+        ProfileTopicModel(**description, score=score)
+        for description, score in zip(describe_topics(papers.model.engine), scores.tolist())
+    ]
+    stop = None if page.limit is None else page.offset + page.limit
+    return ProfileModel(
+        id=profile_id,
+        kind=kind,
+        papers=len(profile.rows),
+        topics=sorted(topics, key=lambda topic: -topic.score),
+        paper_ids=[papers.ids[row] for row in profile.rows[page.offset : stop]],
+    )
+
+
+async def _similar_response(
+    query: np.ndarray, k: int, recall: bool, exclude: Optional[int] = None
+) -> SimilarResponseModel:
+    """Search the papers most similar to an embedding in an executor.
+
+    Args:
+        query (np.ndarray): The normalized embedding.
+        k (int): Number of papers to return.
+        recall (bool): Whether to compare the result with an exhaustive search.
+        exclude (Optional[int]): The row of the queried paper.
+
+    Returns:
+        SimilarResponseModel: The most similar papers.
+    """
+    if not query.any():
+        # a text without any term of the model is not similar to anything
+        return SimilarResponseModel(papers=[], candidates=0, latency_ms=0.0, recall=None)
+    searcher = similar.capture()
+
+    def search() -> Tuple[Neighbours, float, Optional[float]]:
+        start = time.perf_counter()
+        found = searcher.search(query, k, exclude)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if not recall:
+            return found, latency_ms, None
+        expected = searcher.exact(query, k, exclude).rows
+        exact = len(np.intersect1d(found.rows, expected)) / len(expected) if len(expected) else 1.0
+        return found, latency_ms, exact
+
+    found, latency_ms, exact = await asyncio.get_event_loop().run_in_executor(None, search)
+    return SimilarResponseModel(
+        papers=[
+            SimilarPaperModel(id=papers.ids[row], score=score)
+            for row, score in zip(found.rows.tolist(), found.scores.tolist())
+        ],
+        candidates=found.candidates,
+        latency_ms=latency_ms,
+        recall=exact,
+    )
+
+
+@router.get(
+    "/similar",
+    response_description="The indexed papers most similar to an indexed paper.",
+    response_model=SimilarResponseModel,
+    status_code=status.HTTP_200_OK,
+)
+async def get_similar(
+    paper_id: str,
+    k: int = Query(10, ge=1, le=1000, description="Number of papers to return."),
+    recall: bool = Query(False, description="Also measure the recall of the search."),
+) -> SimilarResponseModel:
+    """Find the indexed papers most similar to an indexed paper.
+
+    The papers are compared by their TF-IDF vectors under the active model. An approximate
+    index selects the candidates, which are then ranked exactly; with recall=true the result
+    is compared with an exhaustive search.
+
+    Args:
+        paper_id (str): The id of the indexed paper.
+        k (int): Number of papers to return.
+        recall (bool): Whether to compare the result with an exhaustive search.
+
+    Raises:
+        HTTPException: 404 if the paper is not indexed.
+
+    Returns:
+        SimilarResponseModel: The most similar papers without the paper itself.
+    """
+    row = papers.rows.get(paper_id)
+    query = None if row is None else similar.vector(row)
+    if row is None or query is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Paper {paper_id} is not indexed"
+        )
+    return await _similar_response(query, k, recall, exclude=row)
+
+
+@router.post(
+    "/similar",
+    response_description="The indexed papers most similar to a text.",
+    response_model=SimilarResponseModel,
+    status_code=status.HTTP_200_OK,
+)
+async def post_similar(
+    text: SimilarQueryModel,
+    k: int = Query(10, ge=1, le=1000, description="Number of papers to return."),
+    recall: bool = Query(False, description="Also measure the recall of the search."),
+) -> SimilarResponseModel:
+    """Find the indexed papers most similar to a title and abstract.
+
+    Args:
+        text (SimilarQueryModel): The title and abstract to compare with.
+        k (int): Number of papers to return.
+        recall (bool): Whether to compare the result with an exhaustive search.
+
+    Returns:
+        SimilarResponseModel: The most similar papers.
+    """
+    if papers.model is None:
+        return SimilarResponseModel(papers=[], candidates=0, latency_ms=0.0, recall=None)
+    query = await asyncio.get_event_loop().run_in_executor(
+        None, embed, papers.model.engine, [f"{text.title}\n{text.abstractText}"], similar.dim
+    )
+    return await _similar_response(query[0], k, recall)
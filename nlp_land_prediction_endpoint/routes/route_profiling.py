@@ -0,0 +1,56 @@
+"""This module implements the download of request profiles."""
+import io
+import os
+import pstats
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+from starlette.responses import Response
+
+from nlp_land_prediction_endpoint.middleware.auth import get_current_admin
+from nlp_land_prediction_endpoint.middleware.profiling import profile_path
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute
+
+router = APIRouter(route_class=MetricsRoute)
+
+PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+
+
+@router.get(
+    "/{profile_id}",
+    response_description="A stored profile as pstats file or as text summary.",
+    response_class=Response,
+)
+async def download_profile(
+    profile_id: str,
+    format: str = Query("pstats", regex="^(pstats|text)$"),
+    limit: int = Query(50, ge=1, description="Number of functions in the text summary."),
+    user: UserModel = Depends(get_current_admin),
+) -> Response:
+    """Download the profile of a request that was sent with "X-Profile: 1".
+
+    Args:
+        profile_id (str): The id from the "X-Profile-Id" header of the profiled response.
+        format (str): "pstats" for the file (load it with pstats or snakeviz) or "text" for
+            the functions with the highest cumulative time.
+        limit (int): Number of functions in the text summary.
+        user (UserModel): The authenticated admin.
+
+    Raises:
+        HTTPException: 404 if there is no profile with this id.
+
+    Returns:
+        Response: The pstats file or the text summary.
+    """
+    path = profile_path(profile_id)
+    if not PROFILE_ID.fullmatch(profile_id) or not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "pstats":
+        return FileResponse(
+            path, media_type="application/octet-stream", filename=f"{profile_id}.pstats"
+        )
+    summary = io.StringIO()
+    pstats.Stats(path, stream=summary).sort_stats("cumulative").print_stats(limit)
+    return PlainTextResponse(summary.getvalue())
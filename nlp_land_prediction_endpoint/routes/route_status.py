@@ -4,8 +4,9 @@ from typing import Dict
 from fastapi import APIRouter
 
 import nlp_land_prediction_endpoint
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 
 @router.get("/", response_description="Status of the backend.")
@@ -1,41 +1,305 @@
 """This module implements the endpoint logic for topics."""
-from fastapi import APIRouter, status
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Sequence
 
+from decouple import config  # type: ignore
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from nlp_land_prediction_endpoint.middleware.auth import get_current_user
+from nlp_land_prediction_endpoint.middleware.profiling import (
+    is_profiling,
+    profiled_call,
+)
 from nlp_land_prediction_endpoint.models.model_paper import PaperModel
 from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.utils.batch_scheduler import MicroBatchScheduler
+from nlp_land_prediction_endpoint.utils.inference_pool import (
+    POOL_RETRY_AFTER,
+    InferencePool,
+    PoolSaturatedError,
+)
+from nlp_land_prediction_endpoint.utils.metrics import MetricsRoute, stage
+from nlp_land_prediction_endpoint.utils.model_registry import registry, warm
+from nlp_land_prediction_endpoint.utils.ndjson import (
+    NDJSONStreamingResponse,
+    dump_line,
+    iter_chunks,
+    iter_lines,
+    iter_papers,
+)
+from nlp_land_prediction_endpoint.utils.paper_records import (
+    PaperLike,
+    RecordError,
+    parse_records,
+)
+from nlp_land_prediction_endpoint.utils.topic_cache import TopicCache, corpus_key
+from nlp_land_prediction_endpoint.utils.topic_engine import (
+    MODEL_VERSION,
+    Corpus,
+    infer_many,
+    infer_topics,
+    paper_text,
+)
+from nlp_land_prediction_endpoint.utils.topic_json import (
+    PaperIdsPage,
+    TopicJSONResponse,
+    encode_topics,
+    paper_ids_page,
+)
+
+router = APIRouter(route_class=MetricsRoute)
+
+STREAM_CHUNK_SIZE = config("TOPIC_STREAM_CHUNK_SIZE", default=1000, cast=int)
+
+
+def _model_path() -> Optional[str]:
+    """Get the stored model that produces the topics.
+
+    Returns:
+        Optional[str]: The path of the active model or None to learn the topics per corpus.
+    """
+    active = registry.active
+    return active.path if active else None
+
+
+def _model_version() -> str:
+    """Get the version of the model that produces the topics.
+
+    Returns:
+        str: The name and version of the active model or the version of the engine.
+    """
+    active = registry.active
+    return f"{active.name}/{active.version}" if active else MODEL_VERSION
+
+
+async def _run_batch(corpora: Sequence[Corpus]) -> List[TopicResponseModel]:
+    """Runs the inference for a batch of the scheduler.
+
+    Args:
+        corpora (Sequence[Corpus]): The coalesced corpora.
+
+    Returns:
+        List[TopicResponseModel]: The topics of each corpus.
+    """
+    with stage("inference"):
+        return await pool.run(infer_many, corpora, _model_path())
+
+
+pool = InferencePool()
+registry.warmers.append(partial(pool.broadcast, warm))
+scheduler = MicroBatchScheduler(_run_batch)
+cache = TopicCache()
+
+pool_saturated_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Topic inference is saturated",
+    headers={"Retry-After": str(POOL_RETRY_AFTER)},
+)
+
+
+@router.on_event("startup")
+async def start_inference() -> None:
+    """Start the inference pool and coalescing topic requests."""
+    await pool.start()
+    await scheduler.start()
+
 
-router = APIRouter()
+@router.on_event("shutdown")
+async def stop_inference() -> None:
+    """Stop coalescing topic requests and the inference pool."""
+    await scheduler.stop()
+    await pool.stop()
+
+
+async def _topics_for(papers: Sequence[PaperLike]) -> TopicResponseModel:
+    """Look up the topics of a corpus in the cache or submit it to the scheduler.
+
+    Profiled requests bypass the cache and the scheduler and run the inference in-process.
+
+    Args:
+        papers (Sequence[PaperLike]): The papers of the corpus.
+
+    Raises:
+        HTTPException: 503 with Retry-After if the inference pool is saturated.
+
+    Returns:
+        TopicResponseModel: The topics of the corpus.
+    """
+    if is_profiling():
+        with stage("inference"):
+            return await profiled_call(
+                infer_topics,
+                [paper.id for paper in papers],
+                [paper_text(paper) for paper in papers],
+                _model_path(),
+            )
+    key = corpus_key(papers, _model_version())
+    topics = cache.get(key)
+    if topics is None:
+        try:
+            topics = await scheduler.submit(
+                [paper.id for paper in papers], [paper_text(paper) for paper in papers]
+            )
+        except PoolSaturatedError:
+            raise pool_saturated_exception
+        cache.set(key, topics)
+    return topics
 
 
 @router.post(
     "/",
     response_description="Topics for a single paper.",
     response_model=TopicResponseModel,
+    response_class=TopicJSONResponse,
     status_code=status.HTTP_200_OK,
 )
 async def topic_for_papers(
     paper: PaperModel,
-) -> TopicResponseModel:
+    page: PaperIdsPage = Depends(paper_ids_page),
+) -> TopicJSONResponse:
     """Generate topics for a set of papers.
 
     Args:
         paper (PaperModel): The paper objects to analyse.
+        page (PaperIdsPage): The paper ids of each topic to return.
+
+    Returns:
+        TopicJSONResponse: The response object for the computed topics.
+    """
+    return TopicJSONResponse(encode_topics(await _topics_for([paper]), page))
+
+
+@router.post(
+    "/batch",
+    response_description="Topics for a set of papers.",
+    response_model=TopicResponseModel,
+    response_class=TopicJSONResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def topic_for_paper_batch(
+    papers: List[PaperModel],
+    page: PaperIdsPage = Depends(paper_ids_page),
+) -> TopicJSONResponse:
+    """Generate topics for a set of papers in a single pass of the engine.
+
+    Args:
+        papers (List[PaperModel]): The papers that form the corpus to analyse.
+        page (PaperIdsPage): The paper ids of each topic to return.
+
+    Returns:
+        TopicJSONResponse: The response object for the computed topics of the corpus.
+    """
+    return TopicJSONResponse(encode_topics(await _topics_for(papers), page))
+
+
+@router.post(
+    "/bulk",
+    response_description="Topics for a set of papers of a trusted service.",
+    response_model=TopicResponseModel,
+    response_class=TopicJSONResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def topic_for_paper_bulk(
+    request: Request,
+    page: PaperIdsPage = Depends(paper_ids_page),
+    user: UserModel = Depends(get_current_user),
+) -> TopicJSONResponse:
+    """Generate topics for a set of papers sent by an authenticated service.
+
+    The body is a JSON list of PaperModel objects like for /batch, but only the fields the
+    topics depend on (id, title, abstractText, preProcessingGitHash) are decoded and checked;
+    all other fields are ignored. This skips the full validation of each paper for large
+    service-to-service calls.
+
+    Args:
+        request (Request): The request with a JSON list of papers as body.
+        page (PaperIdsPage): The paper ids of each topic to return.
+        user (UserModel): The authenticated caller.
+
+    Raises:
+        HTTPException: 422 if a paper misses one of the fields the topics depend on.
 
     Returns:
-        TopicResponseModel: The response object for the computed topics.
+        TopicJSONResponse: The response object for the computed topics of the corpus.
     """
-    # Do some stuff with the data
-    # paper_ids = [paper["id"] for paper in papers]
+    try:
+        body = await request.body()
+        with stage("validation"):
+            records = parse_records(body)
+    except RecordError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors)
+    return TopicJSONResponse(encode_topics(await _topics_for(records), page))
 
-    # Craft the response
-    return TopicResponseModel(
-        topics=[
-            {
-                "id": "5136bc054aed4daf9e2a1237",
-                "name": "Topic 1",
-                "score": 0.5,
-                "keywords": ["keyword 1", "keyword 2"],
-                "paper_ids": ["5136bc054aed4daf9e2a1239", "5136bc054aed4daf9e2a1238"],
-            },
-        ],
-    )
+
+async def _stream_topics(request: Request) -> AsyncIterator[bytes]:
+    """Runs the NDJSON pipeline for a streamed request body.
+
+    Args:
+        request (Request): The request with an NDJSON body of papers.
+
+    Yields:
+        bytes: One NDJSON line per invalid paper and per processed chunk.
+    """
+    async for chunk in iter_chunks(iter_papers(iter_lines(request.stream())), STREAM_CHUNK_SIZE):
+        papers = [paper for paper in chunk if isinstance(paper, PaperModel)]
+        for error in chunk:
+            if not isinstance(error, PaperModel):
+                yield dump_line({"error": error})
+        if papers:
+            ids = [paper.id for paper in papers]
+            texts = [paper_text(paper) for paper in papers]
+            if is_profiling():
+                with stage("inference"):
+                    profiled = await profiled_call(infer_topics, ids, texts, _model_path())
+                yield encode_topics(profiled) + b"\n"
+                continue
+            key = corpus_key(papers, _model_version())
+            topics = cache.get(key)
+            if topics is None:
+                with stage("inference"):
+                    topics = await pool.run(infer_topics, ids, texts, _model_path(), block=True)
+                cache.set(key, topics)
+            yield encode_topics(topics) + b"\n"
+
+
+@router.post(
+    "/stream",
+    response_description="Topics for each chunk of a newline-delimited JSON stream of papers.",
+    response_class=NDJSONStreamingResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def topic_for_paper_stream(request: Request) -> NDJSONStreamingResponse:
+    """Generate topics for a stream of papers sent as newline-delimited JSON.
+
+    The papers are processed in chunks of TOPIC_STREAM_CHUNK_SIZE papers. For each chunk one
+    TopicResponseModel is written back as a line of the response. Lines that are not a valid
+    PaperModel are answered with an error record ({"error": {"line": ..., "detail": ...}}).
+
+    Args:
+        request (Request): The request with one PaperModel per line as body.
+
+    Raises:
+        HTTPException: 503 with Retry-After if the inference pool is saturated.
+
+    Returns:
+        NDJSONStreamingResponse: The NDJSON stream of topic responses.
+    """
+    if pool.saturated:
+        raise pool_saturated_exception
+    return NDJSONStreamingResponse(_stream_topics(request))
+
+
+@router.get("/stats", response_description="Statistics of the topic inference.")
+async def topic_stats() -> Dict[str, dict]:
+    """Statistics of the topic inference, e.g., to tune the micro-batching window.
+
+    Returns:
+        Dict[str, dict]: Batch sizes and queue waits of the scheduler, the state of the
+        inference pool and the hits and misses of the result cache.
+    """
+    return {
+        "cache": cache.stats(),
+        "scheduler": {**scheduler.stats.as_dict(), "queue_depth": scheduler.queue_depth},
+        "pool": pool.stats(),
+    }
@@ -0,0 +1,198 @@
+"""Micro-batching scheduler for topic inference
+
+Concurrent requests are collected for at most TOPIC_BATCH_WINDOW_MS milliseconds or until
+TOPIC_BATCH_MAX_SIZE papers are queued. They are then run as a single inference call and
+the results are handed back to the waiting coroutines.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from decouple import config  # type: ignore
+
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.topic_engine import Corpus
+
+BATCH_WINDOW_MS = config("TOPIC_BATCH_WINDOW_MS", default=5, cast=float)
+BATCH_MAX_SIZE = config("TOPIC_BATCH_MAX_SIZE", default=512, cast=int)
+
+Runner = Callable[[Sequence[Corpus]], Awaitable[List[TopicResponseModel]]]
+
+logger = logging.getLogger(__name__)
+
+
+class BatchStats:
+    """Running statistics of the scheduled batches
+
+    Attributes:
+        batches (int): number of executed batches
+        requests (int): number of requests over all batches
+        papers (int): number of papers over all batches
+        max_requests (int): largest number of requests in a batch
+        max_papers (int): largest number of papers in a batch
+        wait_seconds (float): summed queue wait of all requests
+        max_wait_seconds (float): longest queue wait of a request
+    """
+
+    def __init__(self) -> None:
+        """Creates empty statistics"""
+        self.batches = 0
+        self.requests = 0
+        self.papers = 0
+        self.max_requests = 0
+        self.max_papers = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, n_papers: int, waits: List[float]) -> None:
+        """Adds a batch to the statistics
+
+        Arguments:
+            n_papers (int): number of papers in the batch
+            waits (List[float]): queue wait in seconds of each request of the batch
+        """
+        self.batches += 1
+        self.requests += len(waits)
+        self.papers += n_papers
+        self.max_requests = max(self.max_requests, len(waits))
+        self.max_papers = max(self.max_papers, n_papers)
+        self.wait_seconds += sum(waits)
+        self.max_wait_seconds = max([self.max_wait_seconds] + waits)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns the statistics including averages
+
+        Returns:
+            Dict[str, float]: the statistics
+        """
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "papers": self.papers,
+            "mean_batch_requests": self.requests / self.batches if self.batches else 0.0,
+            "mean_batch_papers": self.papers / self.batches if self.batches else 0.0,
+            "max_batch_requests": self.max_requests,
+            "max_batch_papers": self.max_papers,
+            "mean_queue_wait_ms": 1000 * self.wait_seconds / self.requests
+            if self.requests
+            else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_wait_seconds,
+        }
+
+
+class MicroBatchScheduler:
+    """Coalesces concurrent inference requests into batches"""
+
+    def __init__(
+        self,
+        runner: Runner,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_size: int = BATCH_MAX_SIZE,
+    ) -> None:
+        """Creates a stopped scheduler
+
+        Arguments:
+            runner (Runner): runs the inference for a list of corpora
+            window_ms (float): how long to wait for more requests after the first one
+            max_size (int): number of papers after which a batch is dispatched immediately
+        """
+        self.runner = runner
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.stats = BatchStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Starts collecting requests in the running event loop"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._collect())
+
+    async def stop(self) -> None:
+        """Stops the scheduler; queued requests are cancelled"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._running, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+        self._queue = None
+        self._task = None
+
+    async def submit(self, ids: Sequence[str], texts: Sequence[str]) -> TopicResponseModel:
+        """Queues a corpus and waits for its topics
+
+        If the scheduler is not running the corpus is run on its own.
+
+        Arguments:
+            ids (Sequence[str]): ids of the papers
+            texts (Sequence[str]): texts of the papers
+
+        Returns:
+            TopicResponseModel: the topics of the corpus
+        """
+        if self._queue is None:
+            return (await self.runner([(ids, texts)]))[0]
+        loop = asyncio.get_event_loop()
+        future: "asyncio.Future[TopicResponseModel]" = loop.create_future()
+        self._queue.put_nowait(((ids, texts), future, loop.time()))
+        return await future
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting to be batched
+
+        Returns:
+            int: the current queue size
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _collect(self) -> None:
+        """Collects batches forever and dispatches them"""
+        assert self._queue is not None
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0][0])
+            task = asyncio.ensure_future(self._dispatch(batch, size, loop.time()))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(
+        self,
+        batch: List[Tuple[Corpus, "asyncio.Future[TopicResponseModel]", float]],
+        size: int,
+        now: float,
+    ) -> None:
+        """Runs a batch and resolves the futures of its requests
+
+        Arguments:
+            batch (List[Tuple[Corpus, asyncio.Future, float]]): the queued requests
+            size (int): number of papers in the batch
+            now (float): loop time at which the batch was closed
+        """
+        waits = [now - enqueued for _, _, enqueued in batch]
+        self.stats.record(size, waits)
+        logger.debug("topic batch: %d requests, %d papers", len(batch), size)
+        try:
+            results = await self.runner([corpus for corpus, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,300 @@
+"""Citation graph of the indexed papers and topic-personalized PageRank over it
+
+The citedBy lists of the indexed papers are kept as edge buffers (citing paper, cited row)
+that grow with every added paper. Citing papers are identified by their id, so a citation
+counts as soon as the citing paper is indexed as well, no matter which one came first. A
+replaced paper bumps the version of its row, which invalidates its previous edges without
+touching the buffers.
+
+The sparse transition matrix is built from the buffers when the graph changed since the
+last query. PageRank is then computed for all topics at once: the teleport distribution of
+a topic is proportional to the weights of the papers in that topic, and every iteration is
+a single sparse matrix product with the (n_papers, n_topics) rank matrix. Both run in an
+executor, off the event loop. The ranks are cached until the graph changes and the next
+computation starts from them.
+"""
+import asyncio
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from decouple import config  # type: ignore
+from scipy import sparse  # type: ignore
+
+from nlp_land_prediction_endpoint.utils.paper_index import PaperListener
+
+CITATION_DAMPING = config("CITATION_DAMPING", default=0.85, cast=float)
+CITATION_TOLERANCE = config("CITATION_TOLERANCE", default=1e-6, cast=float)
+CITATION_MAX_ITERATIONS = config("CITATION_MAX_ITERATIONS", default=100, cast=int)
+
+
+def _grown(array: np.ndarray, size: int, fill: int) -> np.ndarray:
+    """Returns an array with room for at least size entries, doubling its capacity
+
+    Arguments:
+        array (np.ndarray): the array
+        size (int): the required number of entries
+        fill (int): the value of new entries
+
+    Returns:
+        np.ndarray: the array or a larger copy of it
+    """
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array)), fill, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class Transition(NamedTuple):
+    """A transition matrix and the buffered edges it was built from"""
+
+    version: int
+    matrix: sparse.csr_matrix
+    dangling: np.ndarray
+    buffers: Tuple[List[np.ndarray], List[np.ndarray], List[np.ndarray]]
+    consumed: int
+    live: Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def topic_pagerank(
+    transition: sparse.csr_matrix,
+    dangling: np.ndarray,
+    weights: np.ndarray,
+    damping: float = CITATION_DAMPING,
+    tolerance: float = CITATION_TOLERANCE,
+    max_iterations: int = CITATION_MAX_ITERATIONS,
+    initial: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Computes a PageRank personalized to each topic
+
+    Arguments:
+        transition (sparse.csr_matrix): column-stochastic matrix of shape (n, n) with the
+            share of the citations of paper j that go to paper i at (i, j)
+        dangling (np.ndarray): mask of the papers that cite no indexed paper
+        weights (np.ndarray): topic weights of the papers of shape (n, n_topics)
+        damping (float): probability of following a citation instead of teleporting
+        tolerance (float): stop when no topic changes by more than this (L1)
+        max_iterations (int): stop after this many iterations
+        initial (Optional[np.ndarray]): ranks to start from, e.g., of a previous graph
+
+    Returns:
+        np.ndarray: ranks of shape (n, n_topics); each column sums to one
+    """
+    totals = weights.sum(axis=0)
+    teleport = np.divide(
+        weights, totals, out=np.full(weights.shape, 1 / max(len(weights), 1)), where=totals > 0
+    )
+    ranks = teleport if initial is None else initial
+    for _ in range(max_iterations):
+        # the rank of papers without citations is spread like a teleport
+        leaked = ranks[dangling].sum(axis=0)
+        updated = damping * (transition @ ranks + teleport * leaked) + (1 - damping) * teleport
+        converged = np.abs(updated - ranks).sum(axis=0).max(initial=0) < tolerance
+        ranks = updated
+        if converged:
+            break
+    return ranks
+
+
+class CitationGraph(PaperListener):
+    """Citation edges between the indexed papers with cached topic PageRanks"""
+
+    def __init__(self) -> None:
+        """Creates an empty graph"""
+        self.reset(0)
+
+    def reset(self, n_topics: int) -> None:
+        """Drops all papers and edges
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+        self.nodes: Dict[str, int] = {}
+        self.node_rows = np.zeros(0, dtype=np.int64)
+        self.row_versions = np.zeros(0, dtype=np.int64)
+        self._sources: List[np.ndarray] = []
+        self._targets: List[np.ndarray] = []
+        self._versions: List[np.ndarray] = []
+        self.version = 0
+        self._transition: Optional[Transition] = None
+        self._ranks: Optional[Tuple[int, np.ndarray]] = None
+
+    def _node(self, paper_id: str) -> int:
+        """Returns the node of a paper id, adding it if it is new
+
+        Arguments:
+            paper_id (str): the id of a paper
+
+        Returns:
+            int: the node number
+        """
+        node = self.nodes.get(paper_id)
+        if node is None:
+            node = self.nodes[paper_id] = len(self.nodes)
+        return node
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Invalidates the edges to rows
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+        self.row_versions[rows] += 1
+        self.version += 1
+
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds the papers of rows and the edges from their citing papers
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        if not len(rows):
+            return
+        self.row_versions = _grown(self.row_versions, int(rows.max()) + 1, 0)
+        paper_nodes = [self._node(paper["id"]) for paper in papers]
+        sources = np.fromiter(
+            (self._node(citing) for paper in papers for citing in paper["citedBy"]), np.int64
+        )
+        self.node_rows = _grown(self.node_rows, len(self.nodes), -1)
+        self.node_rows[paper_nodes] = rows
+        targets = np.repeat(rows, [len(paper["citedBy"]) for paper in papers])
+        self._sources.append(sources)
+        self._targets.append(targets)
+        self._versions.append(self.row_versions[targets])
+        self.version += 1
+
+    @property
+    def n_edges(self) -> int:
+        """The number of buffered edges, including invalidated ones
+
+        Returns:
+            int: the number of edges
+        """
+        return sum(len(sources) for sources in self._sources)
+
+    @property
+    def n_citations(self) -> int:
+        """The number of citations between indexed papers in the last built transition matrix
+
+        Returns:
+            int: the number of non-zero entries of the matrix
+        """
+        return self._transition.matrix.nnz if self._transition is not None else 0
+
+    def _capture(self, n_rows: int) -> Callable[[], Transition]:
+        """Captures the current edges so that their transition matrix can be built elsewhere
+
+        The buffered arrays are never modified and are captured by reference; the row arrays
+        are copied because add and remove change them in place.
+
+        Arguments:
+            n_rows (int): the number of rows of the paper index
+
+        Returns:
+            Callable[[], Transition]: builds the transition matrix, e.g., in an executor
+        """
+        version = self.version
+        buffers = (self._sources, self._targets, self._versions)
+        captured = [list(buffer) for buffer in buffers]
+        row_versions, node_rows = self.row_versions.copy(), self.node_rows.copy()
+
+        def build() -> Transition:
+            sources, targets, versions = (
+                np.concatenate(buffer or [np.zeros(0, dtype=np.int64)]) for buffer in captured
+            )
+            live = versions == row_versions[targets]
+            if not live.all():
+                sources, targets, versions = sources[live], targets[live], versions[live]
+            citing = node_rows[sources]
+            keep = (citing >= 0) & (citing != targets)
+            matrix = sparse.csr_matrix(
+                (np.ones(int(keep.sum())), (targets[keep], citing[keep])), shape=(n_rows, n_rows)
+            )
+            matrix.sum_duplicates()
+            matrix.data[:] = 1
+            out_degree = np.bincount(matrix.indices, minlength=n_rows)
+            matrix.data /= out_degree[matrix.indices]
+            return Transition(
+                version,
+                matrix,
+                out_degree == 0,
+                buffers,
+                len(captured[0]),
+                (sources, targets, versions),
+            )
+
+        return build
+
+    def _keep(self, transition: Transition) -> None:
+        """Caches a newly built transition matrix and compacts the buffers it consumed
+
+        Arguments:
+            transition (Transition): the result of a function returned by _capture
+        """
+        if transition.buffers[0] is self._sources:
+            # edges added meanwhile stay behind the compacted ones
+            for buffer, live in zip(transition.buffers, transition.live):
+                buffer[: transition.consumed] = [live]
+        if transition.version == self.version:
+            self._transition = transition
+
+    def transition(self, n_rows: int) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Builds the transition matrix of the current edges
+
+        Invalidated edges are dropped from the buffers on the way.
+
+        Arguments:
+            n_rows (int): the number of rows of the paper index
+
+        Returns:
+            Tuple[sparse.csr_matrix, np.ndarray]: the column-stochastic transition matrix
+            and the mask of the papers that cite no indexed paper
+        """
+        transition = self._transition
+        if transition is None or transition.version != self.version:
+            transition = self._capture(n_rows)()
+            self._keep(transition)
+        return transition.matrix, transition.dangling
+
+    async def ranks(self, weights: np.ndarray) -> np.ndarray:
+        """Returns the topic PageRanks of the indexed papers
+
+        The ranks are cached until the graph changes. Building the transition matrix and
+        the power iteration run in an executor; the iteration starts from the previous ranks.
+
+        Arguments:
+            weights (np.ndarray): topic weights of all rows of the paper index
+
+        Returns:
+            np.ndarray: ranks of shape (n_rows, n_topics)
+        """
+        version = self.version
+        if self._ranks is not None and self._ranks[0] == version:
+            return self._ranks[1]
+        cached = self._transition
+        build: Optional[Callable[[], Transition]] = None
+        if cached is None or cached.version != version:
+            build = self._capture(len(weights))
+        initial = None
+        if self._ranks is not None and self._ranks[1].shape[1] == weights.shape[1]:
+            previous = self._ranks[1][: len(weights)]
+            initial = np.zeros(weights.shape)
+            initial[: len(previous)] = previous
+        weights = weights.copy()
+
+        def compute() -> Tuple[Transition, np.ndarray]:
+            transition = build() if build is not None else cached
+            assert transition is not None
+            return transition, topic_pagerank(
+                transition.matrix, transition.dangling, weights, initial=initial
+            )
+
+        transition, ranks = await asyncio.get_event_loop().run_in_executor(None, compute)
+        if build is not None:
+            self._keep(transition)
+        if self.version == version:
+            self._ranks = (version, ranks)
+        return ranks
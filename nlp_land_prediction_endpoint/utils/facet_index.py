@@ -0,0 +1,138 @@
+"""Compressed bitmap index over the low-cardinality facets of the papers
+
+For every value of every facet (e.g., typeOfPaper=conference or atMainConference=true) a
+roaring bitmap holds the rows of the paper index with that value. A filter is resolved with
+a few bitwise operations: the values of one facet are OR-ed, the facets are AND-ed. The
+resulting rows index the topic weights of the paper index directly, so aggregating the
+topics of a subset never rescans the corpus.
+"""
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+from pyroaring import BitMap  # type: ignore
+
+from nlp_land_prediction_endpoint.utils.paper_index import PaperListener
+
+FACETS = (
+    "typeOfPaper",
+    "shortOrLong",
+    "abstractExtractor",
+    "atMainConference",
+    "isSharedTask",
+    "isStudentPaper",
+)
+
+# The requested values of each filtered facet; facets without values are not filtered
+Filters = Mapping[str, Optional[Sequence[object]]]
+
+
+def facet_value(value: object) -> str:
+    """Turns a facet value of a paper or a query into the key of its bitmap
+
+    Arguments:
+        value (object): an enum value (str) or a flag (bool)
+
+    Returns:
+        str: the value, with flags as "true" or "false"
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(getattr(value, "value", value))
+
+
+class FacetIndex(PaperListener):
+    """Roaring bitmaps of the rows for each value of each facet"""
+
+    def __init__(self, facets: Sequence[str] = FACETS) -> None:
+        """Creates an empty index
+
+        Arguments:
+            facets (Sequence[str]): the indexed fields of the papers
+        """
+        self.facets = tuple(facets)
+        self.all = BitMap()
+        self.bitmaps: Dict[str, Dict[str, BitMap]] = {facet: {} for facet in self.facets}
+
+    def reset(self, n_topics: int) -> None:
+        """Drops all rows
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+        self.all = BitMap()
+        self.bitmaps = {facet: {} for facet in self.facets}
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Removes rows from all bitmaps
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+        removed = BitMap(rows.astype(np.uint32))
+        self.all -= removed
+        for values in self.bitmaps.values():
+            for bitmap in values.values():
+                bitmap -= removed
+
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds rows to the bitmaps of their values
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        self.all.update(rows.astype(np.uint32))
+        row_list = rows.tolist()
+        for facet, values in self.bitmaps.items():
+            grouped: Dict[str, list] = {}
+            for row, paper in zip(row_list, papers):
+                grouped.setdefault(facet_value(paper[facet]), []).append(row)
+            for value, value_rows in grouped.items():
+                values.setdefault(value, BitMap()).update(value_rows)
+
+    def select(self, filters: Filters) -> BitMap:
+        """Resolves filters to the rows that match all of them
+
+        Arguments:
+            filters (Filters): the accepted values of each filtered facet
+
+        Raises:
+            KeyError: for a facet that is not indexed
+
+        Returns:
+            BitMap: the matching rows
+        """
+        selected = self.all
+        for facet, accepted in filters.items():
+            if accepted is None:
+                continue
+            values = self.bitmaps[facet]
+            matching = BitMap.union(
+                BitMap(), *(values.get(facet_value(value), BitMap()) for value in accepted)
+            )
+            selected = selected & matching
+        return selected
+
+    def rows(self, filters: Filters) -> np.ndarray:
+        """Resolves filters to sorted row numbers
+
+        Arguments:
+            filters (Filters): the accepted values of each filtered facet
+
+        Returns:
+            np.ndarray: the matching rows
+        """
+        return np.frombuffer(self.select(filters).to_array(), dtype=np.uint32).astype(np.int64)
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Counts the rows of each value of each facet
+
+        Returns:
+            Dict[str, Dict[str, int]]: the number of papers per facet and value
+        """
+        return {
+            facet: {value: len(bitmap) for value, bitmap in sorted(values.items()) if bitmap}
+            for facet, values in self.bitmaps.items()
+        }
@@ -0,0 +1,88 @@
+"""Shared non-blocking HTTP client for the NLP-Land-backend
+
+All calls to the backend go through one httpx.AsyncClient per event loop, which keeps
+connections alive in a bounded pool, applies explicit connect/read timeouts and limits
+the number of concurrent requests. The pool of another event loop (e.g., of a previous
+test client) is closed before a new one is opened.
+"""
+import asyncio
+from typing import Optional
+
+import httpx
+from decouple import config  # type: ignore
+
+BACKEND_CONNECT_TIMEOUT = config("AUTH_BACKEND_CONNECT_TIMEOUT", default=2.0, cast=float)
+BACKEND_READ_TIMEOUT = config("AUTH_BACKEND_READ_TIMEOUT", default=5.0, cast=float)
+BACKEND_MAX_CONNECTIONS = config("AUTH_BACKEND_MAX_CONNECTIONS", default=20, cast=int)
+BACKEND_MAX_CONCURRENCY = config("AUTH_BACKEND_MAX_CONCURRENCY", default=20, cast=int)
+
+
+class BackendClient:
+    """Pooled async HTTP client with bounded concurrency"""
+
+    def __init__(
+        self,
+        connect_timeout: float = BACKEND_CONNECT_TIMEOUT,
+        read_timeout: float = BACKEND_READ_TIMEOUT,
+        max_connections: int = BACKEND_MAX_CONNECTIONS,
+        max_concurrency: int = BACKEND_MAX_CONCURRENCY,
+    ) -> None:
+        """Creates a closed client; it is opened on startup or on first use
+
+        Arguments:
+            connect_timeout (float): seconds to wait for a connection
+            read_timeout (float): seconds to wait for a response
+            max_connections (int): size of the keep-alive connection pool
+            max_concurrency (int): maximum number of requests in flight
+        """
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        )
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def open(self) -> None:
+        """Creates the connection pool in the running event loop"""
+        self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._loop = asyncio.get_event_loop()
+
+    async def close(self) -> None:
+        """Closes all pooled connections"""
+        if self._client is not None:
+            try:
+                await self._client.aclose()
+            except RuntimeError:
+                # the sockets of a closed event loop are closed, but their transports
+                # cannot be notified anymore
+                pass
+        self._client = None
+        self._slots = None
+        self._loop = None
+
+    async def request(self, method: str, url: str, json: Optional[dict] = None) -> httpx.Response:
+        """Sends a request through the pool
+
+        Arguments:
+            method (str): the HTTP method
+            url (str): the absolute URL
+            json (Optional[dict]): a JSON body
+
+        Raises:
+            httpx.HTTPError: on connection errors and timeouts
+
+        Returns:
+            httpx.Response: the response
+        """
+        if self._client is None or self._loop is not asyncio.get_event_loop():
+            await self.close()
+            await self.open()
+        assert self._client is not None and self._slots is not None
+        async with self._slots:
+            return await self._client.request(method, url, json=json)
+
+
+backend_client = BackendClient()
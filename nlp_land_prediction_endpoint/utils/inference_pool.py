@@ -0,0 +1,174 @@
+"""Bounded process pool for CPU-bound inference
+
+Inference runs in worker processes so the event loop stays responsive for all other
+routes. The number of calls that are running or waiting for a worker is bounded by
+TOPIC_POOL_MAX_PENDING; calls beyond that are rejected instead of queued.
+
+A function can also be broadcast to every worker process, e.g., to pre-warm a new model
+in all of them before it is used.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import suppress
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Sequence, TypeVar
+
+from decouple import config  # type: ignore
+
+T = TypeVar("T")
+
+POOL_WORKERS = config("TOPIC_POOL_WORKERS", default=2, cast=int)
+POOL_MAX_PENDING = config("TOPIC_POOL_MAX_PENDING", default=16, cast=int)
+POOL_RETRY_AFTER = config("TOPIC_POOL_RETRY_AFTER", default=1, cast=int)
+# How long a worker that finished a broadcast waits for the others, which may be busy
+POOL_BROADCAST_TIMEOUT = config("TOPIC_POOL_BROADCAST_SECONDS", default=60, cast=float)
+
+# The barrier of the pool in a worker process (see _init_worker)
+_barrier: Optional[threading.Barrier] = None
+
+
+def _init_worker(barrier: threading.Barrier) -> None:
+    """Keeps the barrier of the pool in a new worker process
+
+    Arguments:
+        barrier (threading.Barrier): the barrier shared by all workers of the pool
+    """
+    global _barrier
+    _barrier = barrier
+
+
+def _run_and_wait(fn: Callable[..., Any], args: Sequence[object], timeout: float) -> None:
+    """Runs fn(*args) and holds the worker until all workers ran it (runs in a worker)
+
+    Holding the worker makes sure that every worker takes exactly one call of a broadcast.
+
+    Arguments:
+        fn (Callable[..., Any]): the function to run
+        args (Sequence[object]): its arguments
+        timeout (float): how long to wait for the other workers
+    """
+    fn(*args)
+    assert _barrier is not None
+    with suppress(threading.BrokenBarrierError):
+        _barrier.wait(timeout)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the pool already has the maximum number of pending calls"""
+
+
+class InferencePool:
+    """Runs functions in a bounded pool of worker processes"""
+
+    def __init__(self, workers: int = POOL_WORKERS, max_pending: int = POOL_MAX_PENDING) -> None:
+        """Creates a stopped pool
+
+        Arguments:
+            workers (int): number of worker processes; 0 runs the calls in threads instead
+            max_pending (int): maximum number of calls that are running or waiting
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._barrier: Optional[threading.Barrier] = None
+        self._broadcast_lock = threading.Lock()
+
+    async def start(self) -> None:
+        """Creates the worker pool and the slots in the running event loop"""
+        if self.workers > 0:
+            context = multiprocessing.get_context("spawn")
+            self._barrier = context.Barrier(self.workers)
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._barrier,),
+            )
+        self._slots = asyncio.Semaphore(self.max_pending)
+
+    async def stop(self) -> None:
+        """Shuts down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        self._slots = None
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a non-blocking call would be rejected
+
+        Returns:
+            bool: True if all slots are taken
+        """
+        return self.pending >= self.max_pending
+
+    async def run(self, fn: Callable[..., T], *args: object, block: bool = False) -> T:
+        """Runs fn(*args) in a worker without blocking the event loop
+
+        Arguments:
+            fn (Callable[..., T]): a picklable (module level) function
+            *args (object): picklable arguments of fn
+            block (bool): wait for a free slot instead of failing if the pool is saturated
+
+        Raises:
+            PoolSaturatedError: if block is False and all slots are taken
+
+        Returns:
+            T: the result of fn
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if not block and self.saturated:
+            self.rejected += 1
+            raise PoolSaturatedError()
+        async with self._slots:
+            self.pending += 1
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(self._executor, partial(fn, *args))
+            finally:
+                self.pending -= 1
+
+    def broadcast(
+        self, fn: Callable[..., Any], *args: object, timeout: float = POOL_BROADCAST_TIMEOUT
+    ) -> None:
+        """Runs fn(*args) once in every worker process and waits for all of them
+
+        This blocks the calling thread and does not take slots. Workers that are busy run
+        fn when they are done; if they take longer than timeout, the others are released
+        and go on. Without worker processes (not started or workers=0) nothing is run,
+        since the calls run in this process.
+
+        Arguments:
+            fn (Callable[..., Any]): a picklable (module level) function
+            *args (object): picklable arguments of fn
+            timeout (float): how long finished workers wait for busy ones
+        """
+        executor, barrier = self._executor, self._barrier
+        if executor is None or barrier is None:
+            return
+        with self._broadcast_lock:
+            futures = [
+                executor.submit(_run_and_wait, fn, args, timeout) for _ in range(self.workers)
+            ]
+            for future in futures:
+                future.result()
+            barrier.reset()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the current state of the pool
+
+        Returns:
+            Dict[str, int]: workers, pending and rejected calls
+        """
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
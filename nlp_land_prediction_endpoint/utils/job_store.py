@@ -0,0 +1,581 @@
+"""Persistent storage of topic jobs, their input chunks and their results
+
+A job is a JSON compatible dict (see JobRunner for its fields). Submitting a job writes the
+job and all of its input chunks in one bulk write; the runners of all workers claim queued
+jobs from the store, so any worker can process a job and a job whose worker died is picked
+up again. Results are stored per paper and indexed by (job, topic, weight), so a page of the
+paper ids of a topic is a single indexed range scan.
+
+JOB_STORE_URL selects the backend: a mongodb:// URL uses the Mongo service of
+docker-compose.yml, sqlite://<path> (or sqlite://:memory:) a local SQLite database.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, TypeVar
+
+from decouple import config  # type: ignore
+from motor.motor_asyncio import (  # type: ignore
+    AsyncIOMotorClient,
+    AsyncIOMotorDatabase,
+)
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne  # type: ignore
+
+from nlp_land_prediction_endpoint.enums.enum_job import JobStatus
+
+T = TypeVar("T")
+
+JOB_STORE_URL = config("JOB_STORE_URL", default="sqlite://jobs.sqlite3")
+JOB_STORE_DB = config("MONGO_DB", default="nlp_land")
+
+# Index of the first chunk holding the sample of texts a job learns its topics from; the
+# following pieces of the sample are stored at SAMPLE_CHUNK - 1, SAMPLE_CHUNK - 2, ...
+SAMPLE_CHUNK = -1
+
+
+class JobStore(ABC):
+    """Interface of the job backends; all methods are coroutines"""
+
+    @abstractmethod
+    async def open(self) -> None:
+        """Connects to the backend and creates the indexes"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Closes the connection"""
+
+    @abstractmethod
+    async def create(self, job: dict, chunks: List[dict]) -> None:
+        """Stores a new job together with its input chunks
+
+        Arguments:
+            job (dict): the job
+            chunks (List[dict]): the chunks with their "index", "ids" and "texts"
+        """
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Looks up a job
+
+        Arguments:
+            job_id (str): id of the job
+
+        Returns:
+            Optional[dict]: the job or None if it does not exist
+        """
+
+    @abstractmethod
+    async def claim(self, stale_before: float) -> Optional[dict]:
+        """Atomically marks the oldest queued job (or a stale running one) as running
+
+        Arguments:
+            stale_before (float): running jobs last updated before this time are claimed
+                again, e.g., because their worker died
+
+        Returns:
+            Optional[dict]: the claimed job or None if there is nothing to do
+        """
+
+    @abstractmethod
+    async def update(self, job_id: str, fields: dict) -> None:
+        """Sets fields of a job and its updated_at time
+
+        Arguments:
+            job_id (str): id of the job
+            fields (dict): the new values
+        """
+
+    @abstractmethod
+    async def chunk(self, job_id: str, index: int) -> Optional[dict]:
+        """Looks up an input chunk of a job
+
+        Arguments:
+            job_id (str): id of the job
+            index (int): index of the chunk, or SAMPLE_CHUNK - i for piece i of the sample
+
+        Returns:
+            Optional[dict]: the chunk or None if it does not exist
+        """
+
+    @abstractmethod
+    async def drop_chunks(self, job_id: str) -> None:
+        """Deletes the input chunks of a finished job
+
+        Arguments:
+            job_id (str): id of the job
+        """
+
+    @abstractmethod
+    async def add_results(self, job_id: str, results: List[dict]) -> None:
+        """Stores the dominant topic of papers in one bulk write
+
+        Writing the result of a paper again replaces it, so a chunk can be reprocessed.
+
+        Arguments:
+            job_id (str): id of the job
+            results (List[dict]): the "paper_id", "topic" and "weight" of each paper
+        """
+
+    @abstractmethod
+    async def paper_ids(
+        self, job_id: str, topic: int, offset: int = 0, limit: Optional[int] = None
+    ) -> List[str]:
+        """Returns a page of the papers of a topic by descending weight
+
+        Arguments:
+            job_id (str): id of the job
+            topic (int): index of the topic
+            offset (int): number of papers to skip
+            limit (Optional[int]): maximum number of papers (None for all)
+
+        Returns:
+            List[str]: the paper ids
+        """
+
+    @abstractmethod
+    async def count(self, job_id: str, topic: int) -> int:
+        """Counts the papers of a topic
+
+        Arguments:
+            job_id (str): id of the job
+            topic (int): index of the topic
+
+        Returns:
+            int: the number of papers whose dominant topic it is
+        """
+
+
+class MongoJobStore(JobStore):
+    """Jobs in the collections jobs, job_chunks and job_results of a Mongo database"""
+
+    def __init__(self, url: str, database: str = JOB_STORE_DB) -> None:
+        """Creates an unconnected store
+
+        Arguments:
+            url (str): the mongodb:// connection URL
+            database (str): name of the database
+        """
+        self.url = url
+        self.database = database
+        self._client: Optional[AsyncIOMotorClient] = None
+
+    @property
+    def _db(self) -> AsyncIOMotorDatabase:
+        """The database of an open store
+
+        Returns:
+            AsyncIOMotorDatabase: the database
+        """
+        assert self._client is not None, "the job store is not open"
+        return self._client[self.database]
+
+    async def open(self) -> None:
+        """Connects to the backend and creates the indexes"""
+        self._client = AsyncIOMotorClient(self.url)
+        db = self._db
+        # claim scans both of its branches in the order of its sort; few jobs are running
+        await db.jobs.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        await db.job_chunks.create_index([("job_id", ASCENDING), ("index", ASCENDING)], unique=True)
+        await db.job_results.create_index(
+            [("job_id", ASCENDING), ("topic", ASCENDING), ("weight", DESCENDING)]
+        )
+
+    async def close(self) -> None:
+        """Closes the connection"""
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+
+    async def create(self, job: dict, chunks: List[dict]) -> None:
+        """Stores a new job together with its input chunks
+
+        Arguments:
+            job (dict): the job
+            chunks (List[dict]): the chunks with their "index", "ids" and "texts"
+        """
+        db = self._db
+        if chunks:
+            await db.job_chunks.insert_many([{**chunk, "job_id": job["id"]} for chunk in chunks])
+        await db.jobs.insert_one({"_id": job["id"], **job})
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Looks up a job
+
+        Arguments:
+            job_id (str): id of the job
+
+        Returns:
+            Optional[dict]: the job or None if it does not exist
+        """
+        return await self._db.jobs.find_one({"_id": job_id}, {"_id": False})
+
+    async def claim(self, stale_before: float) -> Optional[dict]:
+        """Atomically marks the oldest queued job (or a stale running one) as running
+
+        Arguments:
+            stale_before (float): running jobs last updated before this time are claimed
+                again, e.g., because their worker died
+
+        Returns:
+            Optional[dict]: the claimed job or None if there is nothing to do
+        """
+        job: Optional[dict] = await self._db.jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JobStatus.QUEUED.value},
+                    {"status": JobStatus.RUNNING.value, "updated_at": {"$lt": stale_before}},
+                ]
+            },
+            {"$set": {"status": JobStatus.RUNNING.value, "updated_at": time.time()}},
+            projection={"_id": False},
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return job
+
+    async def update(self, job_id: str, fields: dict) -> None:
+        """Sets fields of a job and its updated_at time
+
+        Arguments:
+            job_id (str): id of the job
+            fields (dict): the new values
+        """
+        await self._db.jobs.update_one(
+            {"_id": job_id}, {"$set": {**fields, "updated_at": time.time()}}
+        )
+
+    async def chunk(self, job_id: str, index: int) -> Optional[dict]:
+        """Looks up an input chunk of a job
+
+        Arguments:
+            job_id (str): id of the job
+            index (int): index of the chunk, or SAMPLE_CHUNK - i for piece i of the sample
+
+        Returns:
+            Optional[dict]: the chunk or None if it does not exist
+        """
+        return await self._db.job_chunks.find_one(
+            {"job_id": job_id, "index": index}, {"_id": False}
+        )
+
+    async def drop_chunks(self, job_id: str) -> None:
+        """Deletes the input chunks of a finished job
+
+        Arguments:
+            job_id (str): id of the job
+        """
+        await self._db.job_chunks.delete_many({"job_id": job_id})
+
+    async def add_results(self, job_id: str, results: List[dict]) -> None:
+        """Stores the dominant topic of papers in one bulk write
+
+        Writing the result of a paper again replaces it, so a chunk can be reprocessed.
+
+        Arguments:
+            job_id (str): id of the job
+            results (List[dict]): the "paper_id", "topic" and "weight" of each paper
+        """
+        if not results:
+            return
+        await self._db.job_results.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": f"{job_id}:{result['paper_id']}"},
+                    {"$set": {**result, "job_id": job_id}},
+                    upsert=True,
+                )
+                for result in results
+            ],
+            ordered=False,
+        )
+
+    async def paper_ids(
+        self, job_id: str, topic: int, offset: int = 0, limit: Optional[int] = None
+    ) -> List[str]:
+        """Returns a page of the papers of a topic by descending weight
+
+        Arguments:
+            job_id (str): id of the job
+            topic (int): index of the topic
+            offset (int): number of papers to skip
+            limit (Optional[int]): maximum number of papers (None for all)
+
+        Returns:
+            List[str]: the paper ids
+        """
+        if limit == 0:
+            return []
+        cursor = (
+            self._db.job_results.find(
+                {"job_id": job_id, "topic": topic}, {"_id": False, "paper_id": True}
+            )
+            .sort([("weight", DESCENDING)])
+            .skip(offset)
+            .limit(limit or 0)
+        )
+        return [result["paper_id"] async for result in cursor]
+
+    async def count(self, job_id: str, topic: int) -> int:
+        """Counts the papers of a topic
+
+        Arguments:
+            job_id (str): id of the job
+            topic (int): index of the topic
+
+        Returns:
+            int: the number of papers whose dominant topic it is
+        """
+        return await self._db.job_results.count_documents({"job_id": job_id, "topic": topic})
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in a local SQLite database, for development and tests
+
+    The queries run in a thread so that a large bulk write does not block the event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Creates an unconnected store
+
+        Arguments:
+            path (str): the database file or ":memory:"
+        """
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Runs queries in a thread, one at a time and each in a transaction
+
+        Arguments:
+            fn (Callable[[sqlite3.Connection], T]): runs the queries on the connection
+
+        Returns:
+            T: the result of fn
+        """
+        connection = self._connection
+        assert connection is not None, "the job store is not open"
+
+        def transaction() -> T:
+            with self._lock, connection:
+                return fn(connection)
+
+        return await asyncio.get_event_loop().run_in_executor(None, transaction)
+
+    async def open(self) -> None:
+        """Connects to the backend and creates the indexes"""
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        await self._run(
+            lambda db: db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY, status TEXT, created_at REAL, updated_at REAL, doc TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at);
+                CREATE TABLE IF NOT EXISTS job_chunks (
+                    job_id TEXT, idx INTEGER, doc TEXT, PRIMARY KEY (job_id, idx)
+                );
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT, paper_id TEXT, topic INTEGER, weight REAL,
+                    PRIMARY KEY (job_id, paper_id)
+                );
+                CREATE INDEX IF NOT EXISTS job_results_topic
+                    ON job_results (job_id, topic, weight DESC);
+                """
+            )
+        )
+
+    async def close(self) -> None:
+        """Closes the connection"""
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+
+    async def create(self, job: dict, chunks: List[dict]) -> None:
+        """Stores a new job together with its input chunks
+
+        Arguments:
+            job (dict): the job
+            chunks (List[dict]): the chunks with their "index", "ids" and "texts"
+        """
+
+        def insert(db: sqlite3.Connection) -> None:
+            db.executemany(
+                "INSERT INTO job_chunks VALUES (?, ?, ?)",
+                [(job["id"], chunk["index"], json.dumps(chunk)) for chunk in chunks],
+            )
+            db.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?)",
+                (job["id"], job["status"], job["created_at"], job["updated_at"], json.dumps(job)),
+            )
+
+        await self._run(insert)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Looks up a job
+
+        Arguments:
+            job_id (str): id of the job
+
+        Returns:
+            Optional[dict]: the job or None if it does not exist
+        """
+        row = await self._run(
+            lambda db: db.execute("SELECT doc FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _set(db: sqlite3.Connection, job_id: str, fields: dict) -> Optional[dict]:
+        """Sets fields of a job inside a transaction
+
+        Arguments:
+            db (sqlite3.Connection): the connection
+            job_id (str): id of the job
+            fields (dict): the new values
+
+        Returns:
+            Optional[dict]: the updated job or None if it does not exist
+        """
+        row = db.execute("SELECT doc FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {**json.loads(row[0]), **fields, "updated_at": time.time()}
+        db.execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, doc = ? WHERE id = ?",
+            (job["status"], job["updated_at"], json.dumps(job), job_id),
+        )
+        return job
+
+    async def claim(self, stale_before: float) -> Optional[dict]:
+        """Atomically marks the oldest queued job (or a stale running one) as running
+
+        Arguments:
+            stale_before (float): running jobs last updated before this time are claimed
+                again, e.g., because their worker died
+
+        Returns:
+            Optional[dict]: the claimed job or None if there is nothing to do
+        """
+
+        def claim(db: sqlite3.Connection) -> Optional[dict]:
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND updated_at < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (JobStatus.QUEUED.value, JobStatus.RUNNING.value, stale_before),
+            ).fetchone()
+            return self._set(db, row[0], {"status": JobStatus.RUNNING.value}) if row else None
+
+        return await self._run(claim)
+
+    async def update(self, job_id: str, fields: dict) -> None:
+        """Sets fields of a job and its updated_at time
+
+        Arguments:
+            job_id (str): id of the job
+            fields (dict): the new values
+        """
+        await self._run(lambda db: self._set(db, job_id, fields))
+
+    async def chunk(self, job_id: str, index: int) -> Optional[dict]:
+        """Looks up an input chunk of a job
+
+        Arguments:
+            job_id (str): id of the job
+            index (int): index of the chunk, or SAMPLE_CHUNK - i for piece i of the sample
+
+        Returns:
+            Optional[dict]: the chunk or None if it does not exist
+        """
+        row = await self._run(
+            lambda db: db.execute(
+                "SELECT doc FROM job_chunks WHERE job_id = ? AND idx = ?", (job_id, index)
+            ).fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    async def drop_chunks(self, job_id: str) -> None:
+        """Deletes the input chunks of a finished job
+
+        Arguments:
+            job_id (str): id of the job
+        """
+        await self._run(lambda db: db.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,)))
+
+    async def add_results(self, job_id: str, results: List[dict]) -> None:
+        """Stores the dominant topic of papers in one bulk write
+
+        Writing the result of a paper again replaces it, so a chunk can be reprocessed.
+
+        Arguments:
+            job_id (str): id of the job
+            results (List[dict]): the "paper_id", "topic" and "weight" of each paper
+        """
+        await self._run(
+            lambda db: db.executemany(
+                "INSERT OR REPLACE INTO job_results VALUES (?, ?, ?, ?)",
+                [(job_id, r["paper_id"], r["topic"], r["weight"]) for r in results],
+            )
+        )
+
+    async def paper_ids(
+        self, job_id: str, topic: int, offset: int = 0, limit: Optional[int] = None
+    ) -> List[str]:
+        """Returns a page of the papers of a topic by descending weight
+
+        Arguments:
+            job_id (str): id of the job
+            topic (int): index of the topic
+            offset (int): number of papers to skip
+            limit (Optional[int]): maximum number of papers (None for all)
+
+        Returns:
+            List[str]: the paper ids
+        """
+        rows = await self._run(
+            lambda db: db.execute(
+                "SELECT paper_id FROM job_results WHERE job_id = ? AND topic = ?"
+                " ORDER BY weight DESC LIMIT ? OFFSET ?",
+                (job_id, topic, -1 if limit is None else limit, offset),
+            ).fetchall()
+        )
+        return [row[0] for row in rows]
+
+    async def count(self, job_id: str, topic: int) -> int:
+        """Counts the papers of a topic
+
+        Arguments:
+            job_id (str): id of the job
+            topic (int): index of the topic
+
+        Returns:
+            int: the number of papers whose dominant topic it is
+        """
+        row = await self._run(
+            lambda db: db.execute(
+                "SELECT COUNT(*) FROM job_results WHERE job_id = ? AND topic = ?", (job_id, topic)
+            ).fetchone()
+        )
+        return int(row[0])
+
+
+def open_store(url: str = JOB_STORE_URL) -> JobStore:
+    """Creates the store for a JOB_STORE_URL; connect it with open
+
+    Arguments:
+        url (str): a mongodb://, mongodb+srv:// or sqlite:// URL
+
+    Raises:
+        ValueError: for other URLs
+
+    Returns:
+        JobStore: the unconnected store
+    """
+    if url.startswith(("mongodb://", "mongodb+srv://")):
+        return MongoJobStore(url)
+    if url.startswith("sqlite://"):
+        return SQLiteJobStore(url[len("sqlite://") :])
+    raise ValueError(f"unsupported JOB_STORE_URL {url!r}")
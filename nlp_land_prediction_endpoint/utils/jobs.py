@@ -0,0 +1,310 @@
+"""Background topic jobs over large corpora
+
+Submitting a corpus stores it as a job in chunks of JOB_CHUNK_SIZE papers (see job_store)
+and returns at once. Every worker runs a JobRunner that claims queued jobs from the store
+and scores them chunk by chunk in the inference pool; progress and results are written
+back after each chunk, so clients can poll a job and a job interrupted by a restart is
+continued from its last finished chunk. While a job is processed, its updated_at time is
+refreshed every JOB_HEARTBEAT_SECONDS, so that a long fit or chunk is not mistaken for a
+dead worker and claimed again by another one.
+
+All chunks of a job are scored against the same topics: the model that was active when
+the job was submitted, or else topics learned once from a sample of JOB_FIT_SAMPLE papers
+spread over the whole corpus. The sample is stored in chunks of JOB_CHUNK_SIZE texts as
+well, so that no stored document grows with JOB_FIT_SAMPLE. Learning is deterministic, so
+a continued job learns the same topics again.
+
+A job is a dict with the fields id, owner, status, total, processed, chunks, next_chunk,
+sample_chunks, model (path of the stored model or None), topics (id, name and keywords of
+each topic), weights (summed weight of each topic), error, created_at and updated_at.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from decouple import config  # type: ignore
+
+from nlp_land_prediction_endpoint.enums.enum_job import JobStatus
+from nlp_land_prediction_endpoint.utils.inference_pool import InferencePool
+from nlp_land_prediction_endpoint.utils.job_store import SAMPLE_CHUNK, JobStore
+from nlp_land_prediction_endpoint.utils.paper_records import PaperLike
+from nlp_land_prediction_endpoint.utils.topic_engine import (
+    TopicEngine,
+    get_engine,
+    paper_text,
+)
+
+JOB_CHUNK_SIZE = config("JOB_CHUNK_SIZE", default=1000, cast=int)
+JOB_FIT_SAMPLE = config("JOB_FIT_SAMPLE", default=5000, cast=int)
+JOB_POLL_SECONDS = config("JOB_POLL_SECONDS", default=1, cast=float)
+JOB_STALE_SECONDS = config("JOB_STALE_SECONDS", default=300, cast=float)
+JOB_HEARTBEAT_SECONDS = config("JOB_HEARTBEAT_SECONDS", default=JOB_STALE_SECONDS / 4, cast=float)
+
+logger = logging.getLogger(__name__)
+
+
+def make_job(
+    papers: Sequence[PaperLike],
+    owner: str,
+    model_path: Optional[str],
+    chunk_size: int = JOB_CHUNK_SIZE,
+    sample_size: int = JOB_FIT_SAMPLE,
+) -> Tuple[dict, List[dict]]:
+    """Splits a corpus into a new queued job and its input chunks
+
+    Arguments:
+        papers (Sequence[PaperLike]): the papers of the corpus
+        owner (str): email of the submitting user
+        model_path (Optional[str]): the stored model to score against; if None, the job
+            learns its topics from an evenly spaced sample of the papers
+        chunk_size (int): number of papers per chunk
+        sample_size (int): number of papers to learn the topics from
+
+    Returns:
+        Tuple[dict, List[dict]]: the job and its input chunks
+    """
+    ids = [paper.id for paper in papers]
+    texts = [paper_text(paper) for paper in papers]
+    chunks = [
+        {
+            "index": index,
+            "ids": ids[start : start + chunk_size],
+            "texts": texts[start : start + chunk_size],
+        }
+        for index, start in enumerate(range(0, len(papers), chunk_size))
+    ]
+    n_chunks = len(chunks)
+    if model_path is None and papers:
+        rows = np.unique(np.linspace(0, len(papers) - 1, min(sample_size, len(papers))).astype(int))
+        sample = [texts[row] for row in rows.tolist()]
+        chunks.extend(
+            {"index": SAMPLE_CHUNK - piece, "ids": [], "texts": sample[start : start + chunk_size]}
+            for piece, start in enumerate(range(0, len(sample), chunk_size))
+        )
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "owner": owner,
+        "status": JobStatus.QUEUED.value,
+        "total": len(papers),
+        "processed": 0,
+        "chunks": n_chunks,
+        "next_chunk": 0,
+        "sample_chunks": len(chunks) - n_chunks,
+        "model": model_path,
+        "topics": None,
+        "weights": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    return job, chunks
+
+
+def fit_engine(texts: Sequence[str]) -> TopicEngine:
+    """Learns the topics of a job from its sample (runs in the inference pool)
+
+    Arguments:
+        texts (Sequence[str]): the sampled texts
+
+    Returns:
+        TopicEngine: the fitted engine
+    """
+    engine = TopicEngine()
+    engine.fit_transform(texts)
+    return engine
+
+
+def score_chunk(
+    texts: Sequence[str], model_path: Optional[str], engine: Optional[TopicEngine]
+) -> np.ndarray:
+    """Computes the topic weights of a chunk (runs in the inference pool)
+
+    Arguments:
+        texts (Sequence[str]): the texts of the chunk
+        model_path (Optional[str]): the stored model of the job
+        engine (Optional[TopicEngine]): the engine learned by the job if it has no model
+
+    Returns:
+        np.ndarray: document-topic weights of shape (n_texts, n_topics)
+    """
+    if model_path is not None:
+        engine = get_engine(model_path)
+    assert engine is not None
+    return engine.transform(texts)
+
+
+def describe_topics(engine: TopicEngine) -> List[dict]:
+    """Returns the id, name and keywords of each topic of an engine
+
+    Arguments:
+        engine (TopicEngine): the fitted engine
+
+    Returns:
+        List[dict]: one entry per topic in index order
+    """
+    topics = []
+    for topic in range(np.asarray(engine.components_).shape[0]):
+        keywords = engine.keywords(topic)
+        topics.append(
+            {
+                "id": hashlib.sha1("|".join(keywords).encode()).hexdigest()[:24],
+                "name": ", ".join(keywords[:3]),
+                "keywords": keywords,
+            }
+        )
+    return topics
+
+
+def dominant_topics(ids: Sequence[str], weights: np.ndarray) -> List[dict]:
+    """Assigns each paper with a non-zero weight to its dominant topic
+
+    Arguments:
+        ids (Sequence[str]): ids of the papers
+        weights (np.ndarray): document-topic weights of the papers
+
+    Returns:
+        List[dict]: the "paper_id", "topic" and "weight" of each assigned paper
+    """
+    if weights.size == 0:
+        return []
+    rows = np.flatnonzero(weights.sum(axis=1) > 0)
+    dominant = weights[rows].argmax(axis=1)
+    return [
+        {"paper_id": ids[row], "topic": topic, "weight": weight}
+        for row, topic, weight in zip(
+            rows.tolist(), dominant.tolist(), weights[rows, dominant].tolist()
+        )
+    ]
+
+
+class JobRunner:
+    """Claims queued jobs from the store and processes them chunk by chunk"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        pool: InferencePool,
+        poll_seconds: float = JOB_POLL_SECONDS,
+        stale_seconds: float = JOB_STALE_SECONDS,
+        heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+    ) -> None:
+        """Creates a stopped runner
+
+        Arguments:
+            store (JobStore): the job store, opened by start
+            pool (InferencePool): the pool that scores the chunks
+            poll_seconds (float): pause between looking for new jobs
+            stale_seconds (float): running jobs without progress for this long are taken
+                over, e.g., after their worker died
+            heartbeat_seconds (float): interval at which a running job is marked as alive;
+                must be well below stale_seconds
+        """
+        self.store = store
+        self.pool = pool
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Opens the store and starts looking for jobs in the background"""
+        await self.store.open()
+        self._task = asyncio.ensure_future(self._run_forever())
+
+    async def stop(self) -> None:
+        """Stops the runner and closes the store; an interrupted job is continued later"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait([self._task])
+        self._task = None
+        await self.store.close()
+
+    async def _run_forever(self) -> None:
+        """Processes jobs until cancelled"""
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("failed to claim a topic job")
+                processed = False
+            if not processed:
+                await asyncio.sleep(self.poll_seconds)
+
+    async def run_once(self) -> bool:
+        """Claims and processes a single job
+
+        Returns:
+            bool: True if there was a job to process
+        """
+        job = await self.store.claim(time.time() - self.stale_seconds)
+        if job is None:
+            return False
+        heartbeat = asyncio.ensure_future(self._heartbeat(job["id"]))
+        try:
+            await self.process(job)
+        except Exception as e:
+            logger.exception("topic job %s failed", job["id"])
+            await self.store.update(job["id"], {"status": JobStatus.FAILED.value, "error": str(e)})
+        finally:
+            heartbeat.cancel()
+        return True
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Refreshes the updated_at time of a job until cancelled
+
+        Arguments:
+            job_id (str): id of the job being processed
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self.store.update(job_id, {})
+            except Exception:
+                logger.exception("failed to refresh topic job %s", job_id)
+
+    async def process(self, job: dict) -> None:
+        """Scores the remaining chunks of a claimed job and marks it as done
+
+        Arguments:
+            job (dict): the claimed job
+        """
+        store = self.store
+        job_id, model_path = job["id"], job["model"]
+        engine: Optional[TopicEngine] = None
+        if model_path is None and job["total"]:
+            sample: List[str] = []
+            for piece in range(job["sample_chunks"]):
+                chunk = await store.chunk(job_id, SAMPLE_CHUNK - piece)
+                assert chunk is not None, f"piece {piece} of the sample of the job is missing"
+                sample.extend(chunk["texts"])
+            engine = await self.pool.run(fit_engine, sample, block=True)
+            await store.update(job_id, {})
+        if job["topics"] is None:
+            described = engine if model_path is None else get_engine(model_path)
+            topics = describe_topics(described) if described is not None else []
+            job["topics"], job["weights"] = topics, [0.0] * len(topics)
+            await store.update(job_id, {"topics": job["topics"], "weights": job["weights"]})
+
+        totals = np.asarray(job["weights"], dtype=float)
+        processed = job["processed"]
+        for index in range(job["next_chunk"], job["chunks"]):
+            chunk = await store.chunk(job_id, index)
+            assert chunk is not None, f"chunk {index} of the job is missing"
+            weights = await self.pool.run(
+                score_chunk, chunk["texts"], model_path, engine, block=True
+            )
+            await store.add_results(job_id, dominant_topics(chunk["ids"], weights))
+            if weights.size:
+                totals += weights.sum(axis=0)
+            processed += len(chunk["ids"])
+            await store.update(
+                job_id,
+                {"processed": processed, "next_chunk": index + 1, "weights": totals.tolist()},
+            )
+        await store.update(job_id, {"status": JobStatus.DONE.value})
+        await store.drop_chunks(job_id)
@@ -0,0 +1,101 @@
+"""Short-lived cache of successful logins against the NLP-Land-backend
+
+Entries are keyed by the email and an HMAC of the password under a random per-process
+salt, so plaintext passwords are never stored. Identical logins that arrive while a
+backend call is in flight wait for that call instead of starting their own.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from decouple import config  # type: ignore
+
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.models.model_user_login import UserLoginModel
+from nlp_land_prediction_endpoint.utils.ttl_cache import TTLCache
+
+LOGIN_CACHE_SIZE = config("LOGIN_CACHE_SIZE", default=1024, cast=int)
+LOGIN_CACHE_TTL = config("LOGIN_CACHE_TTL_SECONDS", default=0, cast=float)
+
+LoginKey = Tuple[str, bytes]
+Authenticator = Callable[[UserLoginModel], Awaitable[Optional[UserModel]]]
+
+
+class LoginCache:
+    """Caches successful logins and coalesces identical concurrent ones"""
+
+    def __init__(self, max_size: int = LOGIN_CACHE_SIZE, ttl: float = LOGIN_CACHE_TTL) -> None:
+        """Creates the cache; a ttl of 0 disables caching but keeps coalescing
+
+        Arguments:
+            max_size (int): maximum number of cached logins
+            ttl (float): lifetime of a successful login in seconds
+        """
+        self.results: TTLCache[LoginKey, UserModel] = TTLCache(max_size if ttl > 0 else 0, ttl)
+        self.backend_calls = 0
+        self._salt = os.urandom(16)
+        self._in_flight: Dict[LoginKey, "asyncio.Future[Optional[UserModel]]"] = {}
+
+    def key(self, login: UserLoginModel) -> LoginKey:
+        """Computes the cache key of a login
+
+        Arguments:
+            login (UserLoginModel): the submitted credentials
+
+        Returns:
+            LoginKey: the email and the salted password digest
+        """
+        digest = hmac.new(self._salt, login.password.encode(), hashlib.sha256).digest()
+        return login.email, digest
+
+    async def _authenticate(
+        self, key: LoginKey, login: UserLoginModel, authenticate: Authenticator
+    ) -> Optional[UserModel]:
+        """Calls the backend once and stores a successful result
+
+        Arguments:
+            key (LoginKey): the cache key of the login
+            login (UserLoginModel): the submitted credentials
+            authenticate (Authenticator): the backend call
+
+        Returns:
+            Optional[UserModel]: the authenticated user or None
+        """
+        self.backend_calls += 1
+        user = await authenticate(login)
+        if user is not None:
+            self.results.set(key, user)
+        return user
+
+    async def authenticate(
+        self, login: UserLoginModel, authenticate: Authenticator
+    ) -> Optional[UserModel]:
+        """Returns a cached login or authenticates against the backend
+
+        Arguments:
+            login (UserLoginModel): the submitted credentials
+            authenticate (Authenticator): the backend call used on a miss
+
+        Returns:
+            Optional[UserModel]: the authenticated user or None
+        """
+        key = self.key(login)
+        user = self.results.get(key)
+        if user is not None:
+            return user
+        pending = self._in_flight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._authenticate(key, login, authenticate))
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns size, hits and misses of the cache and the number of backend calls
+
+        Returns:
+            Dict[str, int]: the statistics
+        """
+        return {**self.results.stats(), "backend_calls": self.backend_calls}
@@ -0,0 +1,175 @@
+"""Prometheus metrics of the requests and their stages
+
+Routers created with route_class=MetricsRoute count their requests and observe their
+latency labelled with the router tag (Status, Topics, Auth, ...). The same route class
+times the validation of a request (reading the body, running the dependencies and
+validating the parameters) and FastAPI's serialization of the returned value. Other stages
+(jwt_decode, backend_auth, inference, serialization of pre-encoded responses) are timed
+where they happen with stage().
+
+With several uvicorn workers, PROMETHEUS_MULTIPROC_DIR must point to an empty directory
+that is shared by all workers (prod.py takes care of this); the metrics of all workers are
+then aggregated on every scrape.
+"""
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, ContextManager, Coroutine, List, Optional
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from prometheus_client import (  # type: ignore
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+STAGES = ("jwt_decode", "backend_auth", "validation", "inference", "serialization")
+
+REQUESTS = Counter("nlp_land_requests_total", "Handled requests", ["router", "method", "status"])
+REQUEST_LATENCY = Histogram(
+    "nlp_land_request_duration_seconds", "Latency of the requests", ["router"]
+)
+IN_FLIGHT = Gauge(
+    "nlp_land_requests_in_flight",
+    "Requests being handled",
+    ["router"],
+    multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "nlp_land_stage_duration_seconds", "Latency of the stages of a request", ["stage"]
+)
+QUEUE_DEPTH = Gauge(
+    "nlp_land_queue_depth",
+    "Work waiting for the topic inference",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+
+# Timestamps of the request handled in the current context: handler start, endpoint exit
+_marks: ContextVar[Optional[List[float]]] = ContextVar("metrics_marks", default=None)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Times a block as a stage of the request
+
+    Arguments:
+        name (str): one of STAGES
+
+    Returns:
+        ContextManager[None]: a context manager observing the duration of the block
+    """
+    return STAGE_LATENCY.labels(name).time()
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    """Wraps an endpoint to observe the validation stage before it runs
+
+    Arguments:
+        call (Callable): the endpoint function
+
+    Returns:
+        Callable: the wrapped endpoint
+    """
+
+    def enter() -> None:
+        marks = _marks.get()
+        if marks is not None:
+            STAGE_LATENCY.labels("validation").observe(time.perf_counter() - marks[0])
+
+    def leave(result: object) -> None:
+        marks = _marks.get()
+        if marks is not None and not isinstance(result, Response):
+            marks.append(time.perf_counter())
+
+    if asyncio.iscoroutinefunction(call):
+
+        @wraps(call)
+        async def timed_async(**values: object) -> object:
+            enter()
+            result = await call(**values)
+            leave(result)
+            return result
+
+        return timed_async
+
+    @wraps(call)
+    def timed(**values: object) -> object:
+        enter()
+        result = call(**values)
+        leave(result)
+        return result
+
+    return timed
+
+
+class MetricsRoute(APIRoute):
+    """Route that records counts, latency and stages of its requests"""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        """Wraps the request handler of FastAPI with the metrics
+
+        Returns:
+            Callable[[Request], Coroutine[Any, Any, Response]]: the timed handler
+        """
+        assert self.dependant.call is not None
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+        router = str(self.tags[0]) if self.tags else "other"
+
+        async def timed_handler(request: Request) -> Response:
+            marks = [time.perf_counter()]
+            token = _marks.set(marks)
+            status_code = 500
+            IN_FLIGHT.labels(router).inc()
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except HTTPException as e:
+                status_code = e.status_code
+                raise
+            except RequestValidationError:
+                status_code = 422
+                raise
+            finally:
+                end = time.perf_counter()
+                IN_FLIGHT.labels(router).dec()
+                _marks.reset(token)
+                if len(marks) > 1:
+                    STAGE_LATENCY.labels("serialization").observe(end - marks[1])
+                REQUESTS.labels(router, request.method, str(status_code)).inc()
+                REQUEST_LATENCY.labels(router).observe(end - marks[0])
+
+        return timed_handler
+
+
+def latest() -> Response:
+    """Renders the metrics of all workers in the Prometheus text format
+
+    Returns:
+        Response: the current metrics
+    """
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Removes the live gauges of this worker on shutdown"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,267 @@
+"""Registry of named and versioned topic models
+
+Models are stored as <TOPIC_MODEL_DIR>/<name>/<version>/ (see TopicEngine.save). The
+active model is recorded in <TOPIC_MODEL_DIR>/ACTIVE.json so that every worker process
+picks up a switch: each worker loads and pre-warms the new model first, also in the
+processes of its inference pools (see warmers), and then swaps a single reference, so
+requests never wait for a cold model. Previous versions are released afterwards.
+
+A version that was updated from another one (see TopicEngine.partial_fit) records it as
+its parent, so an update can be rolled back by activating the parent again.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from decouple import config  # type: ignore
+
+from nlp_land_prediction_endpoint.utils.topic_engine import (
+    TopicEngine,
+    get_engine,
+    release_engines,
+)
+
+MODEL_DIR = config("TOPIC_MODEL_DIR", default="models")
+MODEL_REFRESH_SECONDS = config("TOPIC_MODEL_REFRESH_SECONDS", default=5, cast=float)
+
+POINTER_FILE = "ACTIVE.json"
+WARMUP_TEXTS = ["warm up the topic model"]
+
+logger = logging.getLogger(__name__)
+
+
+class ActiveModel(NamedTuple):
+    """The model that is currently used for inference
+
+    Attributes:
+        name (str): name of the model
+        version (str): version of the model
+        path (str): directory of the stored model
+        engine (TopicEngine): the loaded engine
+    """
+
+    name: str
+    version: str
+    path: str
+    engine: TopicEngine
+
+
+class ModelNotFoundError(Exception):
+    """Raised when a model name or version is not registered"""
+
+
+def prewarm(engine: TopicEngine) -> None:
+    """Faults the pages of a memory-mapped model into memory and runs one inference
+
+    Arguments:
+        engine (TopicEngine): the engine to warm up
+    """
+    for array in (engine.terms_, engine.idf_, engine.components_):
+        np.asarray(array).view(np.uint8).sum()
+    engine.transform(WARMUP_TEXTS)
+
+
+def warm(path: str) -> None:
+    """Maps and pre-warms a stored model and releases all others (runs in pool workers)
+
+    Arguments:
+        path (str): the directory of the stored model
+    """
+    prewarm(get_engine(path))
+    release_engines([path])
+
+
+class ModelRegistry:
+    """Loads, lists and atomically switches stored topic models"""
+
+    def __init__(self, root: str = MODEL_DIR) -> None:
+        """Creates a registry without an active model
+
+        Arguments:
+            root (str): the directory containing the models
+        """
+        self.root = root
+        self._active: Optional[ActiveModel] = None
+        self._lock = threading.Lock()
+        # called with the path of a model before it becomes active, e.g., to pre-warm it
+        # in the processes of an inference pool
+        self.warmers: List[Callable[[str], None]] = []
+
+    @property
+    def active(self) -> Optional[ActiveModel]:
+        """The active model; take a local reference once per request
+
+        Returns:
+            Optional[ActiveModel]: the active model or None if no model is active
+        """
+        return self._active
+
+    def path(self, name: str, version: str) -> str:
+        """Returns the directory of a model version
+
+        Arguments:
+            name (str): name of the model
+            version (str): version of the model
+
+        Returns:
+            str: the directory of the stored model
+        """
+        return os.path.join(self.root, name, version)
+
+    def list_models(self) -> Dict[str, List[str]]:
+        """Lists all registered models
+
+        Returns:
+            Dict[str, List[str]]: the versions of each model name, oldest first
+        """
+        models: Dict[str, List[str]] = {}
+        if not os.path.isdir(self.root):
+            return models
+        for name in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, name)
+            if not os.path.isdir(directory) or name.startswith("."):
+                continue
+            versions = [
+                version
+                for version in os.listdir(directory)
+                if os.path.isfile(os.path.join(directory, version, "meta.json"))
+            ]
+            models[name] = sorted(
+                versions, key=lambda version: os.path.getmtime(os.path.join(directory, version))
+            )
+        return models
+
+    def register(self, name: str, engine: TopicEngine) -> str:
+        """Stores a fitted engine as a new version of a model
+
+        Arguments:
+            name (str): name of the model
+            engine (TopicEngine): the fitted engine
+
+        Returns:
+            str: the version of the stored model
+        """
+        version = engine.fingerprint()
+        path = self.path(name, version)
+        if not os.path.exists(path):
+            engine.save(path)
+        return version
+
+    def parent(self, name: str, version: str) -> Optional[str]:
+        """Returns the version a model version was updated from
+
+        Arguments:
+            name (str): name of the model
+            version (str): version of the model
+
+        Raises:
+            ModelNotFoundError: if the version is not registered
+
+        Returns:
+            Optional[str]: the parent version or None for a model fitted from scratch
+        """
+        try:
+            with open(os.path.join(self.path(name, version), "meta.json")) as fp:
+                parent: Optional[str] = json.load(fp).get("parent")
+        except OSError:
+            raise ModelNotFoundError(f"{name}/{version}")
+        return parent
+
+    def rollback(self, name: str) -> ActiveModel:
+        """Activates the parent of the active version of a model
+
+        Arguments:
+            name (str): name of the model
+
+        Raises:
+            ModelNotFoundError: if the model is not active or its version has no parent
+
+        Returns:
+            ActiveModel: the now active model
+        """
+        active = self._active
+        if active is None or active.name != name:
+            raise ModelNotFoundError(f"{name} is not active")
+        parent = self.parent(name, active.version)
+        if parent is None:
+            raise ModelNotFoundError(f"{name}/{active.version} has no parent")
+        return self.activate(name, parent)
+
+    def _load(self, name: str, version: str) -> ActiveModel:
+        """Loads and pre-warms a model version
+
+        Arguments:
+            name (str): name of the model
+            version (str): version of the model
+
+        Raises:
+            ModelNotFoundError: if the version is not registered
+
+        Returns:
+            ActiveModel: the loaded model
+        """
+        path = self.path(name, version)
+        if not os.path.isfile(os.path.join(path, "meta.json")):
+            raise ModelNotFoundError(f"{name}/{version}")
+        engine = get_engine(path)
+        prewarm(engine)
+        for warmer in self.warmers:
+            try:
+                warmer(path)
+            except Exception:
+                logger.exception("failed to pre-warm topic model %s/%s", name, version)
+        return ActiveModel(name, version, path, engine)
+
+    def activate(self, name: str, version: str) -> ActiveModel:
+        """Makes a model version the active one in this and all sibling workers
+
+        Arguments:
+            name (str): name of the model
+            version (str): version of the model
+
+        Returns:
+            ActiveModel: the now active model
+        """
+        with self._lock:
+            model = self._load(name, version)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            with os.fdopen(fd, "w") as fp:
+                json.dump({"name": name, "version": version}, fp)
+            os.replace(tmp_path, os.path.join(self.root, POINTER_FILE))
+            self._active = model
+            release_engines([model.path])
+        logger.info("activated topic model %s/%s", name, version)
+        return model
+
+    def refresh(self) -> Optional[ActiveModel]:
+        """Follows the pointer file, e.g., after another worker switched the model
+
+        Returns:
+            Optional[ActiveModel]: the active model
+        """
+        try:
+            with open(os.path.join(self.root, POINTER_FILE)) as fp:
+                pointer = json.load(fp)
+        except (OSError, ValueError):
+            return self._active
+        active = self._active
+        if active is not None and (active.name, active.version) == (
+            pointer["name"],
+            pointer["version"],
+        ):
+            return active
+        with self._lock:
+            try:
+                self._active = self._load(pointer["name"], pointer["version"])
+            except ModelNotFoundError:
+                logger.warning("active topic model %s is not registered", pointer)
+            else:
+                release_engines([self._active.path])
+        return self._active
+
+
+registry = ModelRegistry()
@@ -0,0 +1,111 @@
+"""Generator pipeline for newline-delimited JSON (NDJSON) streams
+
+Each stage consumes its input lazily, so only a single chunk of papers is held in
+memory at any time independent of the size of the stream.
+"""
+import json
+from typing import AsyncIterable, AsyncIterator, List, TypeVar, Union
+
+import pydantic
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+
+T = TypeVar("T")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Splits a stream of byte chunks into non-empty lines
+
+    Arguments:
+        chunks (AsyncIterable[bytes]): the raw byte stream (e.g., a request body)
+
+    Yields:
+        bytes: a single line without the line break
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def iter_papers(lines: AsyncIterable[bytes]) -> AsyncIterator[Union[PaperModel, dict]]:
+    """Validates each line as a PaperModel
+
+    Arguments:
+        lines (AsyncIterable[bytes]): JSON encoded papers, one per line
+
+    Yields:
+        Union[PaperModel, dict]: the validated paper, or an error record with the line
+        number if the line is not a valid paper
+    """
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        try:
+            yield PaperModel.parse_raw(line)
+        except pydantic.ValidationError as e:
+            yield {"line": line_number, "detail": e.errors()}
+
+
+async def iter_chunks(items: AsyncIterable[T], chunk_size: int) -> AsyncIterator[List[T]]:
+    """Groups a stream into lists of at most chunk_size items
+
+    Arguments:
+        items (AsyncIterable[T]): the stream to group
+        chunk_size (int): the maximum number of items per chunk
+
+    Yields:
+        List[T]: the next chunk
+    """
+    chunk: List[T] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def dump_line(data: dict) -> bytes:
+    """Encodes a single NDJSON line
+
+    Arguments:
+        data (dict): a JSON serializable object
+
+    Returns:
+        bytes: the encoded object followed by a line break
+    """
+    return json.dumps(data).encode() + b"\n"
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """StreamingResponse for content generated while the request body is still read
+
+    The default StreamingResponse listens for a client disconnect concurrently, which
+    consumes the messages of a request body that has not been read yet. Here the content
+    generator reads the body itself (a disconnect raises ClientDisconnect while reading).
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Streams the content without listening for disconnects
+
+        Arguments:
+            scope (Scope): the ASGI scope
+            receive (Receive): the ASGI receive channel
+            send (Send): the ASGI send channel
+        """
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
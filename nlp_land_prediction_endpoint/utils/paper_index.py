@@ -0,0 +1,272 @@
+"""Index of papers scored with the active topic model
+
+Papers sent to POST /papers are scored with the active model and appended as a segment to
+the log <PAPER_INDEX_DIR>/<model name>/<version>/<seq>.json. Every worker replays new
+segments in order (see refresh), so all workers serve the same papers and a worker that
+starts later rebuilds its indexes from the log. The papers are scored against one model
+only: switching the active model starts over with the log of the new model.
+
+Each paper gets a row; the topic weights of all rows are kept in one array. Indexes over
+other fields of the papers (e.g., FacetIndex) are PaperListeners that are updated with
+every applied segment; refresh then awaits their flush for work that is too slow for the
+event loop. A paper that is sent again keeps its row: the listeners first remove the row
+and then add it with the new version of the paper.
+"""
+import asyncio
+import errno
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+from decouple import config  # type: ignore
+
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.model_registry import ActiveModel
+
+PAPER_INDEX_DIR = config("PAPER_INDEX_DIR", default="papers")
+PAPER_INDEX_REFRESH_SECONDS = config("PAPER_INDEX_REFRESH_SECONDS", default=5, cast=float)
+
+SEGMENT_SUFFIX = ".json"
+
+Segment = Tuple[List[dict], np.ndarray]
+
+
+class PaperListener(ABC):
+    """Interface of the indexes that follow the paper index"""
+
+    @abstractmethod
+    def reset(self, n_topics: int) -> None:
+        """Drops all rows, e.g., after the active model changed
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+
+    @abstractmethod
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Removes rows before they are added again with a new version of their papers
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+
+    @abstractmethod
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds rows
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights of shape (n_rows, n_topics)
+        """
+
+    async def flush(self) -> None:
+        """Finishes work that add deferred, e.g., in an executor; awaited after every refresh"""
+
+
+def _read_segments(directory: str, start: int) -> List[Segment]:
+    """Reads the consecutive segments of a log from a sequence number on
+
+    Arguments:
+        directory (str): the directory of the log
+        start (int): sequence number of the first segment to read
+
+    Returns:
+        List[Segment]: the papers and topic weights of each segment
+    """
+    segments: List[Segment] = []
+    while True:
+        try:
+            with open(os.path.join(directory, f"{start:08d}{SEGMENT_SUFFIX}"), "rb") as fp:
+                segment = orjson.loads(fp.read())
+        except FileNotFoundError:
+            return segments
+        segments.append((segment["papers"], np.asarray(segment["weights"], dtype=float)))
+        start += 1
+
+
+def _key(model: Optional[ActiveModel]) -> Optional[Tuple[str, str]]:
+    """Identifies a model independently of the loaded instance
+
+    Arguments:
+        model (Optional[ActiveModel]): the model
+
+    Returns:
+        Optional[Tuple[str, str]]: its name and version
+    """
+    return (model.name, model.version) if model else None
+
+
+class PaperIndex:
+    """Rows, ids and topic weights of the scored papers of the active model"""
+
+    def __init__(
+        self, listeners: Sequence[PaperListener] = (), root: str = PAPER_INDEX_DIR
+    ) -> None:
+        """Creates an index without a model
+
+        Arguments:
+            listeners (Sequence[PaperListener]): the indexes to keep in sync
+            root (str): the directory of the logs
+        """
+        self.listeners = list(listeners)
+        self.root = root
+        self.model: Optional[ActiveModel] = None
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self._weights = np.empty((0, 0))
+        self._applied = 0
+
+    @property
+    def weights(self) -> np.ndarray:
+        """The topic weights of all rows
+
+        Returns:
+            np.ndarray: weights of shape (n_rows, n_topics)
+        """
+        return self._weights[: len(self.ids)]
+
+    def directory(self, model: ActiveModel) -> str:
+        """Returns the log of a model
+
+        Arguments:
+            model (ActiveModel): the model
+
+        Returns:
+            str: the directory of its segments
+        """
+        return os.path.join(self.root, model.name, model.version)
+
+    def append(self, model: ActiveModel, papers: Sequence[dict], weights: np.ndarray) -> int:
+        """Writes scored papers as the next segment of the log of a model
+
+        The segment is written under a temporary name and linked to its sequence number,
+        which fails if another worker took the number first; then the next one is tried.
+
+        Arguments:
+            model (ActiveModel): the model that scored the papers
+            papers (Sequence[dict]): the papers as PaperModel dicts
+            weights (np.ndarray): their topic weights
+
+        Returns:
+            int: the sequence number of the segment
+        """
+        directory = self.directory(model)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(orjson.dumps({"papers": papers, "weights": weights.tolist()}))
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)]
+            seq = max((int(name[: -len(SEGMENT_SUFFIX)]) for name in names), default=-1) + 1
+            while True:
+                try:
+                    os.link(tmp_path, os.path.join(directory, f"{seq:08d}{SEGMENT_SUFFIX}"))
+                    return seq
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+                    seq += 1
+        finally:
+            os.remove(tmp_path)
+
+    def reset(self, model: Optional[ActiveModel]) -> None:
+        """Drops all rows and follows the log of another model
+
+        Arguments:
+            model (Optional[ActiveModel]): the model whose papers are indexed from now on
+        """
+        self.model = model
+        self.ids, self.rows, self._applied = [], {}, 0
+        n_topics = np.asarray(model.engine.components_).shape[0] if model else 0
+        self._weights = np.empty((0, n_topics))
+        for listener in self.listeners:
+            listener.reset(n_topics)
+
+    async def refresh(self, model: Optional[ActiveModel]) -> int:
+        """Applies the segments that were appended since the last refresh
+
+        Arguments:
+            model (Optional[ActiveModel]): the active model; the index starts over if it
+                differs from the indexed one
+
+        Returns:
+            int: number of applied papers
+        """
+        if _key(model) != _key(self.model):
+            self.reset(model)
+        if self.model is None:
+            return 0
+        start, key = self._applied, _key(self.model)
+        segments = await asyncio.get_event_loop().run_in_executor(
+            None, _read_segments, self.directory(self.model), start
+        )
+        applied = 0
+        # a concurrent refresh may have applied the segments or the model changed meanwhile
+        if (self._applied, _key(self.model)) == (start, key):
+            for papers, weights in segments:
+                self.apply(papers, weights)
+            self._applied = start + len(segments)
+            applied = sum(len(papers) for papers, _ in segments)
+        for listener in self.listeners:
+            await listener.flush()
+        return applied
+
+    def apply(self, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds or replaces the rows of papers and updates the listeners
+
+        Arguments:
+            papers (Sequence[dict]): the papers as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        if not len(papers):
+            return
+        # the last version of a paper within the segment wins
+        latest = {paper["id"]: i for i, paper in enumerate(papers)}
+        if len(latest) < len(papers):
+            keep = sorted(latest.values())
+            papers, weights = [papers[i] for i in keep], weights[keep]
+        n_rows = len(self.ids)
+        rows = np.empty(len(papers), dtype=np.int64)
+        for i, paper in enumerate(papers):
+            row = self.rows.get(paper["id"])
+            if row is None:
+                row = self.rows[paper["id"]] = len(self.ids)
+                self.ids.append(paper["id"])
+            rows[i] = row
+        replaced = rows[rows < n_rows]
+        if len(replaced):
+            for listener in self.listeners:
+                listener.remove(replaced, self._weights[replaced])
+        self._grow(len(self.ids))
+        self._weights[rows] = weights
+        for listener in self.listeners:
+            listener.add(rows, papers, weights)
+
+    def _grow(self, n_rows: int) -> None:
+        """Makes room for rows, doubling the capacity of the weights array
+
+        Arguments:
+            n_rows (int): the required number of rows
+        """
+        if n_rows > len(self._weights):
+            weights = np.zeros((max(n_rows, 2 * len(self._weights)), self._weights.shape[1]))
+            weights[: len(self._weights)] = self._weights
+            self._weights = weights
+
+    def topics(self, rows: np.ndarray) -> TopicResponseModel:
+        """Aggregates the topics of a subset of the rows
+
+        Arguments:
+            rows (np.ndarray): the rows
+
+        Returns:
+            TopicResponseModel: the topics of the papers ordered by score
+        """
+        if self.model is None or not len(rows):
+            return TopicResponseModel.construct(topics=[])
+        return self.model.engine.topics(self._weights[rows], [self.ids[row] for row in rows])
@@ -0,0 +1,106 @@
+"""Compact paper records for trusted bulk ingestion
+
+Validating a full PaperModel (23 fields, URLs, ObjectId lists) costs far more than the
+topic inference needs. For trusted service-to-service calls, papers are decoded into
+PaperRecord objects that hold and check only the fields the topic engine and the result
+cache read.
+"""
+import json
+from typing import List, Union
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+
+RECORD_FIELDS = ("id", "title", "abstractText", "preProcessingGitHash")
+
+
+class PaperRecord:
+    """The fields of a paper that determine its topics
+
+    Attributes:
+        id (str): id of the paper
+        title (str): title of the paper
+        abstractText (str): abstract of the paper
+        preProcessingGitHash (str): version of the preprocessing of the abstract
+    """
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, id: str, title: str, abstractText: str, preProcessingGitHash: str) -> None:
+        """Creates a record without further validation
+
+        Arguments:
+            id (str): id of the paper
+            title (str): title of the paper
+            abstractText (str): abstract of the paper
+            preProcessingGitHash (str): version of the preprocessing of the abstract
+        """
+        self.id = id
+        self.title = title
+        self.abstractText = abstractText
+        self.preProcessingGitHash = preProcessingGitHash
+
+
+PaperLike = Union[PaperModel, PaperRecord]
+
+
+class RecordError(ValueError):
+    """Raised if a bulk body is not a list of papers with the required fields
+
+    Attributes:
+        errors (List[dict]): one error per invalid field in the format of FastAPI
+    """
+
+    def __init__(self, errors: List[dict]) -> None:
+        """Creates the error
+
+        Arguments:
+            errors (List[dict]): the errors of the body
+        """
+        super().__init__(errors)
+        self.errors = errors
+
+
+def parse_records(body: bytes) -> List[PaperRecord]:
+    """Decodes a JSON list of papers into records; other fields are ignored unchecked
+
+    Arguments:
+        body (bytes): the JSON encoded list of papers
+
+    Raises:
+        RecordError: if the body is not a list or a paper misses a required string field
+
+    Returns:
+        List[PaperRecord]: the records in request order
+    """
+    try:
+        papers = json.loads(body)
+    except ValueError as e:
+        raise RecordError([{"loc": ["body"], "msg": str(e), "type": "value_error.jsondecode"}])
+    if not isinstance(papers, list):
+        raise RecordError(
+            [{"loc": ["body"], "msg": "value is not a valid list", "type": "type_error.list"}]
+        )
+    records = []
+    errors = []
+    for index, paper in enumerate(papers):
+        try:
+            values = [paper[field] for field in RECORD_FIELDS]
+        except (KeyError, TypeError):
+            values = [
+                paper.get(field) if isinstance(paper, dict) else None for field in RECORD_FIELDS
+            ]
+        if all(type(value) is str for value in values):
+            records.append(PaperRecord(*values))
+            continue
+        for field, value in zip(RECORD_FIELDS, values):
+            if type(value) is not str:
+                errors.append(
+                    {
+                        "loc": ["body", index, field],
+                        "msg": "str type expected",
+                        "type": "type_error.str",
+                    }
+                )
+    if errors:
+        raise RecordError(errors)
+    return records
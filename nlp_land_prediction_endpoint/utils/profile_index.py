@@ -0,0 +1,176 @@
+"""Topic profiles of the authors and venues of the indexed papers
+
+For each author, first author and venue id a ProfileIndex keeps the summed topic weights of
+its papers and a roaring bitmap of their rows (the inverted index). Both are updated with
+every added or replaced paper, so looking up a profile is a dictionary access and its
+topic distribution is a single row of the sums, independent of the number of papers.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+from pyroaring import BitMap  # type: ignore
+
+from nlp_land_prediction_endpoint.enums.enum_profile import ProfileKind
+from nlp_land_prediction_endpoint.utils.paper_index import PaperListener
+
+PROFILE_FIELDS = {
+    ProfileKind.AUTHOR: "authors",
+    ProfileKind.FIRST_AUTHOR: "firstAuthor",
+    ProfileKind.VENUE: "venues",
+}
+
+
+class Profile(NamedTuple):
+    """The papers of an id and their summed topic weights"""
+
+    rows: BitMap
+    weights: np.ndarray
+
+
+def _field_ids(value: Union[str, Sequence[str]]) -> List[str]:
+    """Returns the distinct ids of a field of a paper
+
+    Arguments:
+        value (Union[str, Sequence[str]]): a single id or a list of ids
+
+    Returns:
+        List[str]: the ids in their original order
+    """
+    return [value] if isinstance(value, str) else list(dict.fromkeys(value))
+
+
+class Rollup:
+    """Summed topic weights and rows of the papers of each id of one field"""
+
+    def __init__(self, field: str, n_topics: int) -> None:
+        """Creates an empty rollup
+
+        Arguments:
+            field (str): the field of the papers holding the ids
+            n_topics (int): number of topics of the model
+        """
+        self.field = field
+        self.slots: Dict[str, int] = {}
+        self.sums = np.zeros((0, n_topics))
+        self.rows: List[BitMap] = []
+        self.row_slots: Dict[int, List[int]] = {}
+
+    def _slot(self, profile_id: str) -> int:
+        """Returns the slot of an id, adding it if it is new
+
+        Arguments:
+            profile_id (str): the id
+
+        Returns:
+            int: the index of its sums and rows
+        """
+        slot = self.slots.get(profile_id)
+        if slot is None:
+            slot = self.slots[profile_id] = len(self.rows)
+            self.rows.append(BitMap())
+        return slot
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Removes rows from the profiles of their ids
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+        slots: List[int] = []
+        positions: List[int] = []
+        for position, row in enumerate(rows.tolist()):
+            for slot in self.row_slots.pop(row, []):
+                self.rows[slot].discard(row)
+                slots.append(slot)
+                positions.append(position)
+        np.subtract.at(self.sums, np.asarray(slots, dtype=np.int64), weights[positions])
+
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds rows to the profiles of their ids
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        slots: List[int] = []
+        positions: List[int] = []
+        for position, (row, paper) in enumerate(zip(rows.tolist(), papers)):
+            row_slots = self.row_slots[row] = [
+                self._slot(profile_id) for profile_id in _field_ids(paper[self.field])
+            ]
+            for slot in row_slots:
+                self.rows[slot].add(row)
+            slots.extend(row_slots)
+            positions.extend([position] * len(row_slots))
+        if len(self.rows) > len(self.sums):
+            sums = np.zeros((max(len(self.rows), 2 * len(self.sums)), self.sums.shape[1]))
+            sums[: len(self.sums)] = self.sums
+            self.sums = sums
+        np.add.at(self.sums, np.asarray(slots, dtype=np.int64), weights[positions])
+
+    def profile(self, profile_id: str) -> Optional[Profile]:
+        """Looks up the profile of an id
+
+        Arguments:
+            profile_id (str): the id
+
+        Returns:
+            Optional[Profile]: its papers and summed topic weights, or None if no indexed
+            paper has the id
+        """
+        slot = self.slots.get(profile_id)
+        if slot is None or not self.rows[slot]:
+            return None
+        return Profile(self.rows[slot], np.maximum(self.sums[slot], 0))
+
+
+class ProfileIndex(PaperListener):
+    """Rollups of the authors, first authors and venues of the indexed papers"""
+
+    def __init__(self) -> None:
+        """Creates an empty index"""
+        self.reset(0)
+
+    def reset(self, n_topics: int) -> None:
+        """Drops all profiles
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+        self.rollups = {kind: Rollup(field, n_topics) for kind, field in PROFILE_FIELDS.items()}
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Removes rows from all profiles
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+        for rollup in self.rollups.values():
+            rollup.remove(rows, weights)
+
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds rows to the profiles of their authors and venues
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        for rollup in self.rollups.values():
+            rollup.add(rows, papers, weights)
+
+    def profile(self, kind: ProfileKind, profile_id: str) -> Optional[Profile]:
+        """Looks up a profile
+
+        Arguments:
+            kind (ProfileKind): whether the id is an author, first author or venue
+            profile_id (str): the id
+
+        Returns:
+            Optional[Profile]: its papers and summed topic weights, or None if no indexed
+            paper has the id
+        """
+        return self.rollups[kind].profile(profile_id)
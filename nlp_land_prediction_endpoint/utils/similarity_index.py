@@ -0,0 +1,582 @@
+"""Approximate nearest neighbours of the indexed papers
+
+Every paper is embedded as its TF-IDF vector under the active model, projected to
+SIMILAR_DIM dimensions with a fixed Gaussian matrix and normalized, so that dot products
+approximate the cosine similarities of the TF-IDF vectors. An inverted file (IVF) splits
+the embeddings into lists around spherical k-means centroids; a query only scans the
+SIMILAR_PROBES lists with the closest centroids and re-ranks these candidates exactly by
+their dot product with the query. Small indexes are searched exhaustively.
+
+The lists are kept as one array of rows sorted by list plus a tail of the rows that were
+added or changed since it was sorted. The tail is scanned with every query and merged
+into the sorted rows once it exceeds SIMILAR_TAIL rows. The centroids are trained again
+whenever the number of papers quadrupled.
+
+Adding papers only queues them: flush, which the paper index awaits after every refresh,
+embeds them, trains the centroids and sorts the lists in an executor and swaps the results
+in on the event loop, so searches never wait for either. The arrays are replaced instead of
+modified, so a search captures them (see SimilarityIndex.capture) and runs in an executor
+as well.
+
+save writes the embeddings, centroids and lists as .npy files next to the log of the
+model. A worker that starts later maps them read-only and only embeds the papers whose
+text changed since.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from decouple import config  # type: ignore
+from scipy import sparse  # type: ignore
+
+from nlp_land_prediction_endpoint.utils.paper_index import PaperIndex, PaperListener
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+SIMILAR_DIM = config("SIMILAR_DIM", default=256, cast=int)
+SIMILAR_PROBES = config("SIMILAR_PROBES", default=8, cast=int)
+SIMILAR_MIN_TRAIN = config("SIMILAR_MIN_TRAIN", default=2000, cast=int)
+SIMILAR_TRAIN_SAMPLE = config("SIMILAR_TRAIN_SAMPLE", default=20000, cast=int)
+SIMILAR_TAIL = config("SIMILAR_TAIL", default=4096, cast=int)
+
+SNAPSHOT_PREFIX = "similar-"
+KMEANS_ITERATIONS = 10
+ASSIGN_BATCH = 16384
+
+_projections: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+def text_digest(text: str) -> str:
+    """Identifies the embedded text of a paper
+
+    Arguments:
+        text (str): the text
+
+    Returns:
+        str: a short hex digest of the text
+    """
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def projection(n_terms: int, dim: int) -> np.ndarray:
+    """Returns the random projection of a vocabulary
+
+    The matrix is drawn from a fixed seed, so it is the same for every vocabulary of the
+    same size; embeddings of different models are not comparable.
+
+    Arguments:
+        n_terms (int): size of the vocabulary
+        dim (int): number of dimensions of the embeddings
+
+    Returns:
+        np.ndarray: Gaussian matrix of shape (n_terms, dim)
+    """
+    key = (n_terms, dim)
+    if key not in _projections:
+        rng = np.random.default_rng(0)
+        _projections[key] = rng.standard_normal((n_terms, dim), dtype=np.float32)
+    return _projections[key]
+
+
+def embed(engine: TopicEngine, texts: Sequence[str], dim: int = SIMILAR_DIM) -> np.ndarray:
+    """Embeds texts as normalized random projections of their TF-IDF vectors
+
+    Arguments:
+        engine (TopicEngine): the fitted engine whose vocabulary is used
+        texts (Sequence[str]): the texts
+        dim (int): number of dimensions of the embeddings
+
+    Returns:
+        np.ndarray: float32 embeddings of shape (n_texts, dim); texts without known terms
+        are embedded as zeros
+    """
+    X = engine.vectorize(texts)
+    vectors = np.asarray(X @ projection(X.shape[1], dim), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    embedded: np.ndarray = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    return embedded
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Returns the list with the closest centroid of each vector
+
+    Arguments:
+        vectors (np.ndarray): embeddings
+        centroids (np.ndarray): centroids of the lists (none to assign every vector to -1)
+
+    Returns:
+        np.ndarray: list of each embedding
+    """
+    if not len(centroids):
+        return np.full(len(vectors), -1, dtype=np.int64)
+    return np.concatenate(
+        [
+            np.argmax(vectors[start : start + ASSIGN_BATCH] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), ASSIGN_BATCH)
+        ]
+        or [np.zeros(0, dtype=np.int64)]
+    )
+
+
+def train_centroids(vectors: np.ndarray, train_sample: int) -> np.ndarray:
+    """Trains the centroids of the lists with spherical k-means
+
+    Arguments:
+        vectors (np.ndarray): all embeddings
+        train_sample (int): maximum number of embeddings to train on
+
+    Returns:
+        np.ndarray: float32 centroids, about the square root of the number of embeddings
+    """
+    rng = np.random.default_rng(0)
+    n = len(vectors)
+    n_lists = int(np.clip(np.sqrt(n), 1, 4096))
+    sample = vectors[np.sort(rng.choice(n, min(n, train_sample), False))]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assigned = np.argmax(sample @ centroids.T, axis=1)
+        members = sparse.csr_matrix(
+            (np.ones(len(sample), dtype=np.float32), (assigned, np.arange(len(sample)))),
+            shape=(n_lists, len(sample)),
+        )
+        sums = np.asarray(members @ sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    trained: np.ndarray = centroids.astype(np.float32)
+    return trained
+
+
+def sort_lists(lists: np.ndarray, n_lists: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorts rows by their list
+
+    Arguments:
+        lists (np.ndarray): list of each row
+        n_lists (int): number of lists
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the rows ordered by list and the offset of each list
+        in them (n_lists + 1 entries)
+    """
+    order = np.argsort(lists, kind="stable")
+    return order, np.searchsorted(lists[order], np.arange(n_lists + 1))
+
+
+def _updated(
+    array: np.ndarray, n: int, rows: np.ndarray, values: np.ndarray, fill: object
+) -> np.ndarray:
+    """Returns a copy of an array with n rows and new values in some of them
+
+    Arguments:
+        array (np.ndarray): the array, which is not modified
+        n (int): number of rows of the copy, at least those of the array
+        rows (np.ndarray): the rows to write
+        values (np.ndarray): their new values
+        fill (object): the value of the added rows
+
+    Returns:
+        np.ndarray: the updated copy
+    """
+    updated = np.full((n,) + array.shape[1:], fill, dtype=array.dtype)
+    updated[: len(array)] = array
+    updated[rows] = values
+    return updated
+
+
+def _dict_text(paper: dict) -> str:
+    """Returns the embedded text of a paper, like paper_text
+
+    Arguments:
+        paper (dict): the paper as PaperModel dict
+
+    Returns:
+        str: the title followed by the abstract
+    """
+    return f"{paper['title']}\n{paper['abstractText']}"
+
+
+class Neighbours(NamedTuple):
+    """The result of a search"""
+
+    rows: np.ndarray
+    scores: np.ndarray
+    candidates: int
+
+
+class Searcher(NamedTuple):
+    """The arrays of a similarity index at one point in time, searchable in any thread"""
+
+    vectors: np.ndarray
+    digests: np.ndarray
+    lists: np.ndarray
+    centroids: np.ndarray
+    order: np.ndarray
+    offsets: np.ndarray
+    tail: np.ndarray
+    trained: bool
+    probes: int
+
+    def search(self, query: np.ndarray, k: int, exclude: Optional[int] = None) -> Neighbours:
+        """Finds the most similar rows, scanning only the closest lists
+
+        Arguments:
+            query (np.ndarray): the normalized embedding to search for
+            k (int): number of rows to return
+            exclude (Optional[int]): a row to leave out, e.g., the queried paper
+
+        Returns:
+            Neighbours: the rows ordered by descending similarity
+        """
+        if not self.trained:
+            return self.exact(query, k, exclude)
+        probed = np.argsort(-(self.centroids @ query), kind="stable")[: self.probes]
+        parts = [self.order[self.offsets[lst] : self.offsets[lst + 1]] for lst in probed.tolist()]
+        parts.append(self.tail[np.isin(self.lists[self.tail], probed)])
+        return self._rank(np.unique(np.concatenate(parts)), query, k, exclude)
+
+    def exact(self, query: np.ndarray, k: int, exclude: Optional[int] = None) -> Neighbours:
+        """Finds the most similar rows by brute force
+
+        Arguments:
+            query (np.ndarray): the normalized embedding to search for
+            k (int): number of rows to return
+            exclude (Optional[int]): a row to leave out, e.g., the queried paper
+
+        Returns:
+            Neighbours: the rows ordered by descending similarity
+        """
+        return self._rank(np.arange(len(self.vectors)), query, k, exclude)
+
+    def _rank(
+        self, candidates: np.ndarray, query: np.ndarray, k: int, exclude: Optional[int]
+    ) -> Neighbours:
+        """Scores candidates exactly and keeps the best
+
+        Arguments:
+            candidates (np.ndarray): candidate rows
+            query (np.ndarray): the normalized embedding to search for
+            k (int): number of rows to return
+            exclude (Optional[int]): a row to leave out
+
+        Returns:
+            Neighbours: the best candidates ordered by descending similarity
+        """
+        candidates = candidates[self.digests[candidates] != b""]
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        scores = self.vectors[candidates] @ query
+        if k < len(candidates):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return Neighbours(candidates[top], scores[top], len(candidates))
+
+
+class SimilarityIndex(PaperListener):
+    """IVF index over the embeddings of the papers of a PaperIndex"""
+
+    def __init__(
+        self,
+        papers: PaperIndex,
+        dim: int = SIMILAR_DIM,
+        probes: int = SIMILAR_PROBES,
+        min_train: int = SIMILAR_MIN_TRAIN,
+        train_sample: int = SIMILAR_TRAIN_SAMPLE,
+        tail: int = SIMILAR_TAIL,
+    ) -> None:
+        """Creates an empty index; add it to the listeners of the paper index
+
+        Arguments:
+            papers (PaperIndex): the paper index whose model embeds the papers
+            dim (int): number of dimensions of the embeddings
+            probes (int): number of lists scanned per query
+            min_train (int): number of papers from which on the lists are used
+            train_sample (int): maximum number of papers the centroids are trained on
+            tail (int): number of unsorted rows that triggers a merge
+        """
+        self.papers = papers
+        self.dim = dim
+        self.probes = probes
+        self.min_train = min_train
+        self.train_sample = train_sample
+        self.tail_limit = tail
+        self.epoch = 0
+        self.reset(0)
+
+    def reset(self, n_topics: int) -> None:
+        """Drops all papers and loads the snapshot of the new model if there is one
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+        self.n = 0
+        self.trained_n = 0
+        self.saved_n = 0
+        self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self.digests = np.zeros(0, dtype="S16")
+        self.lists = np.zeros(0, dtype=np.int64)
+        self.centroids = np.zeros((0, self.dim), dtype=np.float32)
+        self.order = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.tail: List[int] = []
+        self.pending: List[Tuple[np.ndarray, List[str], np.ndarray]] = []
+        self.epoch += 1
+        self._flushing: Optional[asyncio.Future] = None
+        if self.papers.model is not None:
+            self.load()
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Nothing to do: replaced rows are embedded again when they are added
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Queues the papers of rows whose text is new or changed for flush
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        if self.papers.model is None or not len(rows):
+            return
+        texts = [_dict_text(paper) for paper in papers]
+        digests = np.array([text_digest(text) for text in texts], dtype="S16")
+        inside = rows < self.n
+        current = np.zeros(len(rows), dtype="S16")
+        current[inside] = self.digests[rows[inside]]
+        changed = np.flatnonzero(current != digests)
+        if len(changed):
+            self.pending.append(
+                (rows[changed], [texts[i] for i in changed.tolist()], digests[changed])
+            )
+
+    async def flush(self) -> None:
+        """Embeds the queued papers and trains the centroids once the papers quadrupled
+
+        The work runs in an executor. Concurrent calls wait for the same flush, which runs
+        until nothing is queued.
+        """
+        if self._flushing is None:
+            flushing = self._flushing = asyncio.ensure_future(self._flush())
+            flushing.add_done_callback(lambda _: self._flushed(flushing))
+        await asyncio.shield(self._flushing)
+
+    def _flushed(self, flushing: asyncio.Future) -> None:
+        """Forgets a finished flush
+
+        Arguments:
+            flushing (asyncio.Future): the finished flush
+        """
+        if self._flushing is flushing:
+            self._flushing = None
+
+    async def _flush(self) -> None:
+        """Applies the queued papers and trains the centroids until the index is up to date
+
+        The results are dropped if the index is reset meanwhile.
+        """
+        loop = asyncio.get_event_loop()
+        epoch = self.epoch
+        while self.pending and self.epoch == epoch:
+            assert self.papers.model is not None
+            engine, centroids = self.papers.model.engine, self.centroids
+            batches, self.pending = self.pending, []
+            rows = np.concatenate([batch[0] for batch in batches])
+            texts = [text for batch in batches for text in batch[1]]
+            digests = np.concatenate([batch[2] for batch in batches])
+            # the last version of a row wins
+            _, last = np.unique(rows[::-1], return_index=True)
+            keep = np.sort(len(rows) - 1 - last)
+            rows, texts, digests = rows[keep], [texts[i] for i in keep.tolist()], digests[keep]
+
+            n = max(self.n, int(rows.max()) + 1)
+            arrays = (self.vectors, self.digests, self.lists)
+
+            def embed_and_assign() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+                vectors = embed(engine, texts, self.dim)
+                lists = assign(vectors, centroids)
+                return (
+                    _updated(arrays[0], n, rows, vectors, 0.0),
+                    _updated(arrays[1], n, rows, digests, b""),
+                    _updated(arrays[2], n, rows, lists, -1),
+                )
+
+            vectors, digests, lists = await loop.run_in_executor(None, embed_and_assign)
+            if self.epoch != epoch:
+                return
+            self.vectors, self.digests, self.lists, self.n = vectors, digests, lists, n
+            self.tail = self.tail + rows.tolist()
+            if self.n >= self.min_train and self.n >= 4 * self.trained_n:
+                await self._train(epoch)
+            elif len(self.tail) > self.tail_limit:
+                await self._merge(epoch)
+
+    async def _train(self, epoch: int) -> None:
+        """Trains the centroids and assigns all rows in an executor
+
+        Arguments:
+            epoch (int): the epoch of the flush; the result is dropped after a reset
+        """
+        vectors, train_sample = self.vectors[: self.n], self.train_sample
+
+        def train() -> Tuple[np.ndarray, np.ndarray]:
+            centroids = train_centroids(vectors, train_sample)
+            return centroids, assign(vectors, centroids)
+
+        centroids, lists = await asyncio.get_event_loop().run_in_executor(None, train)
+        if self.epoch != epoch:
+            return
+        self.centroids, self.lists = centroids, lists
+        self.trained_n = len(lists)
+        await self._merge(epoch)
+
+    async def _merge(self, epoch: int) -> None:
+        """Sorts all rows by their list in an executor and empties the tail
+
+        Arguments:
+            epoch (int): the epoch of the flush; the result is dropped after a reset
+        """
+        if len(self.centroids):
+            order, offsets = await asyncio.get_event_loop().run_in_executor(
+                None, sort_lists, self.lists[: self.n], len(self.centroids)
+            )
+            if self.epoch != epoch:
+                return
+            self.order, self.offsets = order, offsets
+        self.tail = []
+
+    def vector(self, row: int) -> Optional[np.ndarray]:
+        """Returns the embedding of a row
+
+        Arguments:
+            row (int): the row
+
+        Returns:
+            Optional[np.ndarray]: its embedding, or None if the row is not embedded
+        """
+        return self.vectors[row] if row < self.n and self.digests[row] else None
+
+    def capture(self) -> Searcher:
+        """Captures the current arrays so that they can be searched elsewhere
+
+        The arrays are replaced instead of modified when papers are flushed, so they are
+        captured by reference and a search in an executor sees a consistent index.
+
+        Returns:
+            Searcher: the index at this point in time
+        """
+        return Searcher(
+            self.vectors[: self.n],
+            self.digests[: self.n],
+            self.lists[: self.n],
+            self.centroids,
+            self.order,
+            self.offsets,
+            np.asarray(self.tail, dtype=np.int64),
+            self.trained_n > 0,
+            self.probes,
+        )
+
+    def search(self, query: np.ndarray, k: int, exclude: Optional[int] = None) -> Neighbours:
+        """Finds the most similar rows, scanning only the closest lists (see Searcher)
+
+        Arguments:
+            query (np.ndarray): the normalized embedding to search for
+            k (int): number of rows to return
+            exclude (Optional[int]): a row to leave out, e.g., the queried paper
+
+        Returns:
+            Neighbours: the rows ordered by descending similarity
+        """
+        return self.capture().search(query, k, exclude)
+
+    def exact(self, query: np.ndarray, k: int, exclude: Optional[int] = None) -> Neighbours:
+        """Finds the most similar rows by brute force (see Searcher)
+
+        Arguments:
+            query (np.ndarray): the normalized embedding to search for
+            k (int): number of rows to return
+            exclude (Optional[int]): a row to leave out, e.g., the queried paper
+
+        Returns:
+            Neighbours: the rows ordered by descending similarity
+        """
+        return self.capture().exact(query, k, exclude)
+
+    def _snapshots(self) -> List[str]:
+        """Returns the snapshots of the model, newest first
+
+        Returns:
+            List[str]: paths of the snapshot directories
+        """
+        assert self.papers.model is not None
+        directory = self.papers.directory(self.papers.model)
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(name for name in os.listdir(directory) if name.startswith(SNAPSHOT_PREFIX))
+        return [os.path.join(directory, name) for name in reversed(names)]
+
+    def save(self) -> Optional[str]:
+        """Stores the embeddings, centroids and lists of the model as .npy files
+
+        The snapshot is written under a temporary name and renamed when complete, and older
+        snapshots are removed.
+
+        Returns:
+            Optional[str]: the directory of the snapshot, or None without a model
+        """
+        if self.papers.model is None:
+            return None
+        directory = self.papers.directory(self.papers.model)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{self.n:010d}")
+        if not os.path.exists(path):
+            tmp_path = tempfile.mkdtemp(dir=directory, prefix=".tmp-")
+            np.save(os.path.join(tmp_path, "vectors.npy"), self.vectors[: self.n])
+            np.save(os.path.join(tmp_path, "digests.npy"), self.digests[: self.n])
+            np.save(os.path.join(tmp_path, "lists.npy"), self.lists[: self.n])
+            np.save(os.path.join(tmp_path, "centroids.npy"), self.centroids)
+            with open(os.path.join(tmp_path, "meta.json"), "w") as fp:
+                json.dump({"n": self.n, "trained_n": self.trained_n}, fp)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # another worker stored the same snapshot
+                shutil.rmtree(tmp_path)
+        for older in self._snapshots():
+            if older < path:
+                shutil.rmtree(older, ignore_errors=True)
+        self.saved_n = self.n
+        return path
+
+    def load(self) -> bool:
+        """Maps the newest snapshot of the model read-only into memory
+
+        Returns:
+            bool: whether there was a snapshot
+        """
+        for path in self._snapshots():
+            try:
+                with open(os.path.join(path, "meta.json")) as fp:
+                    meta = json.load(fp)
+                arrays = [
+                    np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                    for name in ("vectors", "digests", "lists", "centroids")
+                ]
+            except (OSError, ValueError):
+                continue
+            self.vectors, self.digests, self.lists, self.centroids = arrays
+            self.n = self.saved_n = meta["n"]
+            self.trained_n = meta["trained_n"]
+            if len(self.centroids):
+                self.order, self.offsets = sort_lists(self.lists[: self.n], len(self.centroids))
+            return True
+        return False
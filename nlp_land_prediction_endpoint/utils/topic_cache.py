@@ -0,0 +1,189 @@
+"""Content-addressed cache for topic results
+
+Results are keyed by a stable hash of the fields of each paper that determine its
+topics (id, title, abstractText, preProcessingGitHash) and the model version. An in-memory
+LRU/TTL tier can be backed by an on-disk tier (TOPIC_CACHE_DIR) that is shared by all
+workers and survives restarts. The on-disk tier holds at most TOPIC_CACHE_DIR_MAX_BYTES;
+when a write exceeds it, expired results and then the oldest ones are deleted.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import suppress
+from typing import Dict, Optional, Sequence
+
+from decouple import config  # type: ignore
+
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.paper_records import PaperLike
+from nlp_land_prediction_endpoint.utils.ttl_cache import TTLCache
+
+CACHE_SIZE = config("TOPIC_CACHE_SIZE", default=1024, cast=int)
+CACHE_TTL = config("TOPIC_CACHE_TTL_SECONDS", default=3600, cast=float)
+CACHE_DIR = config("TOPIC_CACHE_DIR", default="")
+CACHE_DIR_MAX_BYTES = config("TOPIC_CACHE_DIR_MAX_BYTES", default=256 * 2**20, cast=int)
+# Fraction of the size bound that is kept when the on-disk tier is pruned
+PRUNE_TARGET = 0.8
+
+
+def corpus_key(papers: Sequence[PaperLike], model_version: str) -> str:
+    """Computes the cache key of a corpus
+
+    Arguments:
+        papers (Sequence[PaperLike]): the papers of the corpus in request order
+        model_version (str): the version of the model producing the topics
+
+    Returns:
+        str: a hex digest identifying the corpus and the model
+    """
+    digest = hashlib.sha256(model_version.encode())
+    for paper in papers:
+        for field in (paper.id, paper.title, paper.abstractText, paper.preProcessingGitHash):
+            encoded = field.encode()
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+    return digest.hexdigest()
+
+
+class TopicCache:
+    """Two-tier (memory and optional disk) cache of topic results"""
+
+    def __init__(
+        self,
+        max_size: int = CACHE_SIZE,
+        ttl: float = CACHE_TTL,
+        directory: Optional[str] = CACHE_DIR or None,
+        max_bytes: int = CACHE_DIR_MAX_BYTES,
+    ) -> None:
+        """Creates the cache
+
+        Arguments:
+            max_size (int): maximum number of results held in memory
+            ttl (float): lifetime of a result in seconds
+            directory (Optional[str]): directory of the on-disk tier; None disables it
+            max_bytes (int): maximum total size of the files of the on-disk tier
+        """
+        self.ttl = ttl
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.disk_bytes = 0
+        self.memory: TTLCache[str, TopicResponseModel] = TTLCache(max_size, ttl)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.prune()
+
+    def _path(self, key: str) -> str:
+        """Returns the file of a key in the on-disk tier
+
+        Arguments:
+            key (str): the cache key
+
+        Returns:
+            str: the path of the file
+        """
+        assert self.directory is not None
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[TopicResponseModel]:
+        """Loads a result from the on-disk tier into memory
+
+        Arguments:
+            key (str): the cache key
+
+        Returns:
+            Optional[TopicResponseModel]: the stored result or None if missing or expired
+        """
+        path = self._path(key)
+        try:
+            expires_at = os.path.getmtime(path) + self.ttl
+            if expires_at <= time.time():
+                os.remove(path)
+                return None
+            result = TopicResponseModel.parse_file(path)
+        except (OSError, ValueError):
+            return None
+        self.memory.set(key, result, expires_at)
+        return result
+
+    def get(self, key: str) -> Optional[TopicResponseModel]:
+        """Looks up a result in memory and then on disk
+
+        Arguments:
+            key (str): the cache key (see corpus_key)
+
+        Returns:
+            Optional[TopicResponseModel]: the cached result or None
+        """
+        result = self.memory.get(key)
+        if result is None and self.directory:
+            result = self._load(key)
+            if result is not None:
+                self.disk_hits += 1
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, key: str, result: TopicResponseModel) -> None:
+        """Stores a result in both tiers
+
+        Arguments:
+            key (str): the cache key (see corpus_key)
+            result (TopicResponseModel): the result to store
+        """
+        self.memory.set(key, result)
+        if self.directory:
+            data = result.json()
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fp:
+                fp.write(data)
+            os.replace(tmp_path, self._path(key))
+            self.disk_bytes += len(data)
+            if self.disk_bytes > self.max_bytes:
+                self.prune()
+
+    def prune(self) -> None:
+        """Deletes expired and then the oldest files until the on-disk tier fits its bound
+
+        Other workers write to the same directory, so the size is recounted from the
+        directory; between prunes it is estimated from the writes of this process.
+        Leftover temporary files of interrupted writes are deleted once they expire.
+        """
+        assert self.directory is not None
+        files = []
+        expired_before = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            # files deleted by another worker in the meantime are skipped
+            with suppress(FileNotFoundError):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * PRUNE_TARGET
+        for mtime, size, path in files:
+            if mtime > expired_before and total <= target:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+        self.disk_bytes = total
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counts
+
+        Returns:
+            Dict[str, int]: size, hits (of which disk_hits), misses and the estimated size
+            of the on-disk tier in bytes
+        """
+        return {
+            "size": len(self.memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self.disk_bytes,
+        }
@@ -0,0 +1,820 @@
+"""Vectorized topic-modeling engine (sparse TF-IDF + NMF)
+
+Papers are turned into a sparse TF-IDF matrix and factorized with non-negative
+matrix factorization using multiplicative updates. Every step works on the
+sparse matrix directly, so one iteration costs O(nnz * n_topics) and the
+memory footprint is bounded by the vocabulary cap (``max_features``) and the
+number of papers.
+
+A fitted engine also keeps the statistics to update it with new papers (see
+partial_fit): document frequencies, the running products W^T X and W^T W of an
+online NMF and the digest and terms of each tracked paper. Only papers whose
+abstract or preprocessing changed are processed again.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp  # type: ignore
+from decouple import config  # type: ignore
+from scipy.sparse.linalg import svds  # type: ignore
+
+import nlp_land_prediction_endpoint
+from nlp_land_prediction_endpoint.models.model_topic import (
+    TopicModel,
+    TopicResponseModel,
+)
+from nlp_land_prediction_endpoint.utils.paper_records import PaperLike
+
+NUM_TOPICS = config("TOPIC_NUM_TOPICS", default=10, cast=int)
+NUM_KEYWORDS = config("TOPIC_NUM_KEYWORDS", default=10, cast=int)
+MAX_FEATURES = config("TOPIC_MAX_FEATURES", default=20000, cast=int)
+MAX_ITER = config("TOPIC_MAX_ITER", default=200, cast=int)
+# Weight of the previous statistics after an update with as many papers as the model has
+FORGET_FACTOR = config("TOPIC_FORGET_FACTOR", default=0.7, cast=float)
+
+# Identifies the engine and its settings; results of different versions may differ
+MODEL_VERSION = (
+    f"tfidf-nmf-{nlp_land_prediction_endpoint.__version__}"
+    f"-{NUM_TOPICS}-{NUM_KEYWORDS}-{MAX_FEATURES}-{MAX_ITER}"
+)
+
+# Number of documents that are looked up against the vocabulary at once.
+# This bounds the size of the temporary token arrays during vectorization.
+VECTORIZE_CHUNK_SIZE = 2048
+
+# Arrays of a fitted engine that are stored as memory-mappable .npy files
+ARTIFACTS = ("terms_", "idf_", "components_")
+
+# Arrays used to update a fitted engine; models stored without them cannot be updated
+UPDATE_ARTIFACTS = ("df_", "stats_xw_", "stats_ww_", "papers_", "digests_")
+
+# The ids and texts of the papers of a corpus
+Corpus = Tuple[Sequence[str], Sequence[str]]
+
+# Terms below this fraction of a topic's largest weight are not reported as keywords
+KEYWORD_MIN_WEIGHT = 1e-2
+
+_EPS = 1e-10
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]{1,29}")
+STOP_WORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down during each
+    few for from further had has have having he her here hers herself him himself his how
+    however i if in into is it its itself just me more most my myself no nor not now of off
+    on once only or other our ours ourselves out over own same she should so some such than
+    that the their theirs them themselves then there these they this those through to too
+    under until up us very via was we were what when where which while who whom why will
+    with within without would you your yours yourself yourselves
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits a text into lowercased tokens without stop words
+
+    Arguments:
+        text (str): the text to tokenize
+
+    Returns:
+        List[str]: the tokens of the text in order of appearance
+    """
+    return [tok for tok in _TOKEN_PATTERN.findall(text.lower()) if tok not in STOP_WORDS]
+
+
+def paper_text(paper: PaperLike) -> str:
+    """Returns the text of a paper that is used for topic modeling
+
+    Arguments:
+        paper (PaperLike): the paper or its compact record
+
+    Returns:
+        str: the title followed by the abstract
+    """
+    return f"{paper.title}\n{paper.abstractText}"
+
+
+def paper_digest(paper: PaperLike) -> str:
+    """Identifies the abstract and its preprocessing to detect papers that changed
+
+    Arguments:
+        paper (PaperLike): the paper or its compact record
+
+    Returns:
+        str: a short hex digest of abstractText and preProcessingGitHash
+    """
+    content = f"{paper.abstractText}\0{paper.preProcessingGitHash}".encode()
+    return hashlib.sha1(content).hexdigest()[:16]
+
+
+class TopicEngine:
+    """Topic model based on a sparse TF-IDF matrix factorized with NMF
+
+    Attributes:
+        version (str): identifies the engine settings or the stored model
+        parent (Optional[str]): version of the model this one was updated from
+        terms_ (np.ndarray): sorted vocabulary; the column index of a term is its position
+        idf_ (np.ndarray): inverse document frequency for each term
+        components_ (np.ndarray): topic-term matrix of shape (n_topics, n_terms)
+        n_docs_ (int): number of distinct papers the model was fitted on
+        df_ (np.ndarray): document frequency of each term
+        stats_xw_ (np.ndarray): running W^T X of shape (n_topics, n_terms)
+        stats_ww_ (np.ndarray): running W^T W of shape (n_topics, n_topics)
+        papers_ (np.ndarray): sorted ids of the tracked papers
+        digests_ (np.ndarray): paper_digest of each tracked paper
+        presence_ (sp.csr_matrix): binary paper-term matrix of the tracked papers; only
+            partial_fit needs it, so a stored model maps it on first access
+    """
+
+    def __init__(
+        self,
+        n_topics: int = NUM_TOPICS,
+        n_keywords: int = NUM_KEYWORDS,
+        max_features: int = MAX_FEATURES,
+        max_iter: int = MAX_ITER,
+        tol: float = 1e-4,
+        random_state: int = 0,
+    ) -> None:
+        """Creates an unfitted engine
+
+        Arguments:
+            n_topics (int): maximum number of topics to extract
+            n_keywords (int): number of keywords reported per topic
+            max_features (int): maximum vocabulary size (most frequent terms are kept)
+            max_iter (int): maximum number of multiplicative update iterations
+            tol (float): relative improvement of the reconstruction error to stop at
+            random_state (int): seed for the factor initialization
+        """
+        self.n_topics = n_topics
+        self.n_keywords = n_keywords
+        self.max_features = max_features
+        self.max_iter = max_iter
+        self.tol = tol
+        self.random_state = random_state
+        self.version = MODEL_VERSION
+        self.terms_ = np.empty(0, dtype="<U1")
+        self.idf_ = np.empty(0)
+        self.components_ = np.empty((0, 0))
+        self.parent: Optional[str] = None
+        self.n_docs_ = 0
+        self.df_ = np.empty(0, dtype=np.int64)
+        self.stats_xw_ = np.empty((0, 0))
+        self.stats_ww_ = np.empty((0, 0))
+        self.papers_ = np.empty(0, dtype="<U1")
+        self.digests_ = np.empty(0, dtype="<U1")
+        self._presence: Optional[sp.csr_matrix] = sp.csr_matrix((0, 0))
+        self._presence_path: Optional[str] = None
+
+    @property
+    def presence_(self) -> sp.csr_matrix:
+        """The binary paper-term matrix, mapped from the stored model on first access
+
+        Returns:
+            sp.csr_matrix: presence of shape (n_papers, n_terms)
+        """
+        if self._presence is None:
+            assert self._presence_path is not None
+            indptr = np.load(
+                os.path.join(self._presence_path, "presence_indptr.npy"), mmap_mode="r"
+            )
+            indices = np.load(
+                os.path.join(self._presence_path, "presence_indices.npy"), mmap_mode="r"
+            )
+            self._presence = sp.csr_matrix(
+                (np.ones(len(indices), dtype=np.int8), indices, indptr),
+                shape=(len(indptr) - 1, len(self.terms_)),
+            )
+        return self._presence
+
+    @presence_.setter
+    def presence_(self, presence: sp.csr_matrix) -> None:
+        """Replaces the binary paper-term matrix
+
+        Arguments:
+            presence (sp.csr_matrix): presence of shape (n_papers, n_terms)
+        """
+        self._presence = presence
+
+    def _select_terms(self, tokenized: Sequence[List[str]]) -> np.ndarray:
+        """Chooses the vocabulary by document frequency
+
+        Arguments:
+            tokenized (Sequence[List[str]]): tokenized documents
+
+        Returns:
+            np.ndarray: the sorted vocabulary
+        """
+        df: Counter = Counter()
+        for tokens in tokenized:
+            df.update(set(tokens))
+        if len(df) > self.max_features:
+            kept = sorted(df.items(), key=lambda item: (-item[1], item[0]))[: self.max_features]
+            terms = [term for term, _ in kept]
+        else:
+            terms = list(df)
+        return np.array(sorted(terms), dtype=str)
+
+    def _count_matrix(self, tokenized: Sequence[List[str]]) -> sp.csr_matrix:
+        """Builds the sparse document-term count matrix against the vocabulary
+
+        Arguments:
+            tokenized (Sequence[List[str]]): tokenized documents
+
+        Returns:
+            sp.csr_matrix: counts of shape (n_documents, n_terms)
+        """
+        n_terms = len(self.terms_)
+        blocks = []
+        for start in range(0, len(tokenized), VECTORIZE_CHUNK_SIZE):
+            chunk = tokenized[start : start + VECTORIZE_CHUNK_SIZE]
+            lengths = np.fromiter(
+                (len(tokens) for tokens in chunk), dtype=np.int64, count=len(chunk)
+            )
+            tokens = np.array([tok for doc in chunk for tok in doc], dtype=str)
+            rows = np.repeat(np.arange(len(chunk)), lengths)
+            if n_terms and len(tokens):
+                cols = np.searchsorted(self.terms_, tokens)
+                cols[cols == n_terms] = 0
+                known = self.terms_[cols] == tokens
+                rows, cols = rows[known], cols[known]
+            else:
+                rows = cols = np.empty(0, dtype=np.int64)
+            block = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(chunk), n_terms))
+            block.sum_duplicates()
+            blocks.append(block)
+        if not blocks:
+            return sp.csr_matrix((0, n_terms))
+        return sp.vstack(blocks, format="csr")
+
+    def _tfidf(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        """Weights a count matrix with sublinear TF-IDF and normalizes each row
+
+        Arguments:
+            counts (sp.csr_matrix): document-term counts
+
+        Returns:
+            sp.csr_matrix: the L2 normalized TF-IDF matrix
+        """
+        X = counts.copy()
+        X.data = (1.0 + np.log(X.data)) * self.idf_[X.indices]
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        X.data /= np.repeat(norms, np.diff(X.indptr))
+        return X
+
+    def vectorize(self, texts: Iterable[str]) -> sp.csr_matrix:
+        """Turns texts into a TF-IDF matrix using the fitted vocabulary
+
+        Arguments:
+            texts (Iterable[str]): the texts to vectorize
+
+        Returns:
+            sp.csr_matrix: TF-IDF matrix of shape (n_texts, n_terms)
+        """
+        return self._tfidf(self._count_matrix([tokenize(text) for text in texts]))
+
+    def _random_factor(
+        self, X: sp.csr_matrix, n_topics: int, shape: Tuple[int, int], seed: int
+    ) -> np.ndarray:
+        """Creates a random non-negative factor scaled to the data
+
+        Arguments:
+            X (sp.csr_matrix): the TF-IDF matrix
+            n_topics (int): the number of topics
+            shape (Tuple[int, int]): the shape of the factor
+            seed (int): distinguishes the factors drawn for the same random_state
+
+        Returns:
+            np.ndarray: a random matrix of the given shape
+        """
+        rng = np.random.default_rng([self.random_state, seed])
+        scale = np.sqrt(X.sum() / (X.shape[0] * X.shape[1] * n_topics)) if X.nnz else 1.0
+        return scale * rng.random(shape)
+
+    def _nndsvd(self, X: sp.csr_matrix, n_topics: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Initializes both factors from a truncated SVD (NNDSVDa)
+
+        Falls back to random factors if the matrix is too small for a truncated SVD.
+
+        Arguments:
+            X (sp.csr_matrix): the TF-IDF matrix
+            n_topics (int): the number of topics
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: factors of shape (n_documents, n_topics) and
+            (n_topics, n_terms)
+        """
+        if n_topics >= min(X.shape):
+            W = self._random_factor(X, n_topics, (X.shape[0], n_topics), 0)
+            H = self._random_factor(X, n_topics, (n_topics, X.shape[1]), 1)
+            return W, H
+        v0 = np.random.default_rng([self.random_state, 2]).random(min(X.shape))
+        U, S, Vt = svds(X, k=n_topics, v0=v0)
+        order = np.argsort(-S)
+        U, S, Vt = U[:, order], S[order], Vt[order]
+        W = np.zeros((X.shape[0], n_topics))
+        H = np.zeros((n_topics, X.shape[1]))
+        W[:, 0] = np.sqrt(S[0]) * np.abs(U[:, 0])
+        H[0] = np.sqrt(S[0]) * np.abs(Vt[0])
+        for j in range(1, n_topics):
+            x, y = U[:, j], Vt[j]
+            x_pos, x_neg, y_pos, y_neg = (
+                np.maximum(x, 0),
+                np.maximum(-x, 0),
+                np.maximum(y, 0),
+                np.maximum(-y, 0),
+            )
+            norms_pos = np.linalg.norm(x_pos), np.linalg.norm(y_pos)
+            norms_neg = np.linalg.norm(x_neg), np.linalg.norm(y_neg)
+            if norms_pos[0] * norms_pos[1] >= norms_neg[0] * norms_neg[1]:
+                u, v, (x_norm, y_norm) = x_pos, y_pos, norms_pos
+            else:
+                u, v, (x_norm, y_norm) = x_neg, y_neg, norms_neg
+            scale = np.sqrt(S[j] * x_norm * y_norm)
+            W[:, j] = scale * u / max(x_norm, _EPS)
+            H[j] = scale * v / max(y_norm, _EPS)
+        mean = X.sum() / (X.shape[0] * X.shape[1])
+        W[W == 0] = mean
+        H[H == 0] = mean
+        return W, H
+
+    def _update_weights(self, W: np.ndarray, XHt: np.ndarray, HHt: np.ndarray) -> np.ndarray:
+        """One multiplicative update of the document-topic weights
+
+        Arguments:
+            W (np.ndarray): document-topic weights
+            XHt (np.ndarray): the product X @ H.T of the TF-IDF and topic-term matrices
+            HHt (np.ndarray): the product H @ H.T of the topic-term matrix
+
+        Returns:
+            np.ndarray: the updated weights
+        """
+        W *= XHt / (W @ HHt + _EPS)
+        return W
+
+    def _error(self, X: sp.csr_matrix, W: np.ndarray, H: np.ndarray, x_norm: float) -> float:
+        """Computes the Frobenius reconstruction error without densifying X
+
+        Arguments:
+            X (sp.csr_matrix): the TF-IDF matrix
+            W (np.ndarray): document-topic weights
+            H (np.ndarray): topic-term matrix
+            x_norm (float): the squared Frobenius norm of X
+
+        Returns:
+            float: the squared reconstruction error
+        """
+        cross = float(np.sum(np.asarray(X @ H.T) * W))
+        gram = float(np.sum((W.T @ W) * (H @ H.T)))
+        return max(x_norm - 2 * cross + gram, 0.0)
+
+    def fit_transform(
+        self,
+        texts: Sequence[str],
+        ids: Optional[Sequence[str]] = None,
+        digests: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        """Learns vocabulary, idf and topics from texts
+
+        Arguments:
+            texts (Sequence[str]): the texts to learn the topics from
+            ids (Optional[Sequence[str]]): ids of the papers, tracked for partial_fit
+            digests (Optional[Sequence[str]]): paper_digest of each paper (with ids)
+
+        Returns:
+            np.ndarray: document-topic weights of shape (n_texts, n_topics)
+        """
+        tokenized = [tokenize(text) for text in texts]
+        self.terms_ = self._select_terms(tokenized)
+        counts = self._count_matrix(tokenized)
+        self.n_docs_ = len(tokenized)
+        self.df_ = np.bincount(counts.indices, minlength=len(self.terms_))
+        self.idf_ = self._idf(self.df_, self.n_docs_)
+        X = self._tfidf(counts)
+        self.papers_ = self.digests_ = np.empty(0, dtype="<U1")
+        self.presence_ = sp.csr_matrix((0, len(self.terms_)), dtype=np.int8)
+        self._track(np.asarray(ids or [], dtype=str), np.asarray(digests or [], dtype=str), counts)
+
+        n_topics = min(self.n_topics, X.shape[0], X.shape[1])
+        if n_topics == 0:
+            self.components_ = np.empty((0, X.shape[1]))
+            self.stats_xw_, self.stats_ww_ = self.components_, np.empty((0, 0))
+            return np.empty((X.shape[0], 0))
+
+        W, H = self._nndsvd(X, n_topics)
+        x_norm = float(X.multiply(X).sum())
+        previous = self._error(X, W, H, x_norm)
+        for iteration in range(1, self.max_iter + 1):
+            H *= np.asarray((X.T @ W).T) / ((W.T @ W) @ H + _EPS)
+            W = self._update_weights(W, np.asarray(X @ H.T), H @ H.T)
+            if iteration % 10 == 0:
+                error = self._error(X, W, H, x_norm)
+                if previous - error < self.tol * max(previous, _EPS):
+                    break
+                previous = error
+        self.components_ = H
+        self.stats_xw_ = np.asarray((X.T @ W).T)
+        self.stats_ww_ = W.T @ W
+        return W
+
+    @staticmethod
+    def _idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+        """Computes the smoothed inverse document frequency
+
+        Arguments:
+            df (np.ndarray): document frequency of each term
+            n_docs (int): number of documents
+
+        Returns:
+            np.ndarray: the idf of each term
+        """
+        return np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+    def _track(self, ids: np.ndarray, digests: np.ndarray, counts: sp.csr_matrix) -> None:
+        """Adds papers to the tracked papers, replacing earlier versions of them
+
+        Arguments:
+            ids (np.ndarray): ids of the papers (empty to track none)
+            digests (np.ndarray): paper_digest of each paper
+            counts (sp.csr_matrix): document-term counts of the papers
+        """
+        if not len(ids):
+            return
+        presence = counts.copy()
+        presence.data = np.ones(len(presence.data), dtype=np.int8)
+        keep = ~np.isin(self.papers_, ids)
+        papers = np.concatenate([self.papers_[keep], ids])
+        order = np.argsort(papers, kind="stable")
+        self.papers_ = papers[order]
+        self.digests_ = np.concatenate([self.digests_[keep], digests])[order]
+        self.presence_ = sp.vstack([self.presence_[keep], presence], format="csr")[order]
+
+    def _remap_terms(self, terms: np.ndarray) -> None:
+        """Moves all term-indexed arrays to a new sorted vocabulary
+
+        Terms that are new get no document frequency and small topic weights that the next
+        update adjusts; terms that are missing in the new vocabulary are dropped.
+
+        Arguments:
+            terms (np.ndarray): the new sorted vocabulary
+        """
+        old_terms = np.asarray(self.terms_)
+        positions = np.minimum(np.searchsorted(old_terms, terms), max(len(old_terms) - 1, 0))
+        known = old_terms[positions] == terms if len(old_terms) else np.zeros(len(terms), bool)
+        old_columns = positions[known]
+        H = np.asarray(self.components_)
+        components = np.full((H.shape[0], len(terms)), H.mean() if H.size else _EPS)
+        components[:, known] = H[:, old_columns]
+        stats_xw = np.zeros((H.shape[0], len(terms)))
+        stats_xw[:, known] = np.asarray(self.stats_xw_)[:, old_columns]
+        df = np.zeros(len(terms), dtype=np.int64)
+        df[known] = np.asarray(self.df_)[old_columns]
+        new_column = np.full(len(old_terms), -1)
+        new_column[old_columns] = np.flatnonzero(known)
+        presence = self.presence_.tocoo()
+        columns = new_column[presence.col]
+        kept = columns >= 0
+        self.presence_ = sp.csr_matrix(
+            (presence.data[kept], (presence.row[kept], columns[kept])),
+            shape=(presence.shape[0], len(terms)),
+        )
+        self.terms_, self.components_, self.stats_xw_, self.df_ = (
+            terms,
+            components,
+            stats_xw,
+            df,
+        )
+
+    def partial_fit(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        digests: Sequence[str],
+        forget_factor: float = FORGET_FACTOR,
+    ) -> np.ndarray:
+        """Updates vocabulary, idf and topics with new or changed papers
+
+        Papers that are tracked with the same digest are skipped. The document frequencies
+        of changed papers are replaced exactly; the topics follow an online NMF whose
+        statistics W^T X and W^T W are decayed by forget_factor ** (n_batch / n_docs)
+        before the batch is added, so earlier versions of changed papers fade out. After
+        an update, parent is the version of the model before it.
+
+        Arguments:
+            ids (Sequence[str]): ids of the papers
+            texts (Sequence[str]): texts of the papers (see paper_text)
+            digests (Sequence[str]): paper_digest of each paper
+            forget_factor (float): weight of the previous statistics (see above)
+
+        Raises:
+            ValueError: if the model was stored without its update statistics
+
+        Returns:
+            np.ndarray: indices of the papers that were processed
+        """
+        n_topics = np.asarray(self.components_).shape[0]
+        if n_topics == 0 or np.asarray(self.stats_ww_).shape != (n_topics, n_topics):
+            raise ValueError("the model has no update statistics; fit it again")
+        id_array = np.asarray(ids, dtype=str)
+        digest_array = np.asarray(digests, dtype=str)
+        # the last version of a paper in the batch wins
+        _, last = np.unique(id_array[::-1], return_index=True)
+        rows: np.ndarray = np.sort(len(id_array) - 1 - last)
+        papers = np.asarray(self.papers_)
+        positions = np.minimum(np.searchsorted(papers, id_array[rows]), max(len(papers) - 1, 0))
+        if len(papers):
+            known = papers[positions] == id_array[rows]
+            changed = ~known | (np.asarray(self.digests_)[positions] != digest_array[rows])
+        else:
+            known = np.zeros(len(rows), dtype=bool)
+            changed = ~known
+        rows, positions, known = rows[changed], positions[changed], known[changed]
+        if not len(rows):
+            return rows
+        self.parent = self.fingerprint()
+
+        tokenized = [tokenize(texts[row]) for row in rows]
+        replaced = self.presence_[positions[known]]
+        df = np.asarray(self.df_, dtype=np.int64)
+        df = df - np.bincount(replaced.indices, minlength=len(df))
+        self.df_ = df
+        batch_terms = np.array(sorted({term for tokens in tokenized for term in tokens}), dtype=str)
+        self._remap_terms(np.union1d(np.asarray(self.terms_), batch_terms))
+        counts = self._count_matrix(tokenized)
+        self.df_ = self.df_ + np.bincount(counts.indices, minlength=len(self.terms_))
+        self.n_docs_ += int(np.count_nonzero(~known))
+        if len(self.terms_) > self.max_features:
+            df = np.asarray(self.df_)
+            kept = np.sort(np.lexsort((self.terms_, -df))[: self.max_features])
+            counts = counts[:, kept]
+            self._remap_terms(np.asarray(self.terms_)[kept])
+        self.idf_ = self._idf(np.asarray(self.df_), self.n_docs_)
+        self._track(id_array[rows], digest_array[rows], counts)
+
+        X = self._tfidf(counts)
+        H = np.array(self.components_)
+        W = self._random_factor(X, n_topics, (X.shape[0], n_topics), 0)
+        XHt, HHt = np.asarray(X @ H.T), H @ H.T
+        for _ in range(self.max_iter):
+            W = self._update_weights(W, XHt, HHt)
+        decay = forget_factor ** (len(rows) / max(self.n_docs_, 1))
+        stats_xw = decay * np.asarray(self.stats_xw_) + np.asarray((X.T @ W).T)
+        stats_ww = decay * np.asarray(self.stats_ww_) + W.T @ W
+        for _ in range(self.max_iter):
+            H *= stats_xw / (stats_ww @ H + _EPS)
+        self.components_, self.stats_xw_, self.stats_ww_ = H, stats_xw, stats_ww
+        return rows
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """Computes topic weights for texts against the fitted topics
+
+        Arguments:
+            texts (Sequence[str]): the texts to score
+
+        Returns:
+            np.ndarray: document-topic weights of shape (n_texts, n_topics)
+        """
+        X = self.vectorize(texts)
+        H = np.asarray(self.components_)
+        W = self._random_factor(X, H.shape[0], (X.shape[0], H.shape[0]), 0)
+        XHt = np.asarray(X @ H.T)
+        HHt = H @ H.T
+        for _ in range(self.max_iter):
+            W = self._update_weights(W, XHt, HHt)
+        return W
+
+    def fingerprint(self) -> str:
+        """Hashes the fitted arrays; used as the version of a stored model
+
+        Returns:
+            str: a short hex digest of the vocabulary, idf and topic-term matrix
+        """
+        digest = hashlib.sha1()
+        for name in ARTIFACTS:
+            digest.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+        return digest.hexdigest()[:12]
+
+    def save(self, path: str) -> str:
+        """Stores the fitted model as a directory of memory-mappable artifacts
+
+        The directory is written under a temporary name and renamed when complete, so
+        readers never see a partially written model. The version of the stored model is
+        its fingerprint.
+
+        Arguments:
+            path (str): the directory to create
+
+        Raises:
+            FileExistsError: if the directory already exists
+
+        Returns:
+            str: the version of the stored model
+        """
+        if os.path.exists(path):
+            raise FileExistsError(path)
+        self.version = self.fingerprint()
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        for name in ARTIFACTS + UPDATE_ARTIFACTS:
+            np.save(os.path.join(tmp_path, f"{name.rstrip('_')}.npy"), getattr(self, name))
+        # int32 indices (the common case) are mapped by load without a copy
+        presence = self.presence_
+        index_dtype = np.int32 if presence.nnz <= np.iinfo(np.int32).max else np.int64
+        np.save(os.path.join(tmp_path, "presence_indptr.npy"), presence.indptr.astype(index_dtype))
+        np.save(
+            os.path.join(tmp_path, "presence_indices.npy"), presence.indices.astype(index_dtype)
+        )
+        params = {
+            "n_topics": self.n_topics,
+            "n_keywords": self.n_keywords,
+            "max_features": self.max_features,
+            "max_iter": self.max_iter,
+            "tol": self.tol,
+            "random_state": self.random_state,
+        }
+        with open(os.path.join(tmp_path, "meta.json"), "w") as fp:
+            json.dump(
+                {
+                    "version": self.version,
+                    "parent": self.parent,
+                    "n_docs": self.n_docs_,
+                    "params": params,
+                },
+                fp,
+            )
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path)
+            raise FileExistsError(path)
+        return self.version
+
+    @classmethod
+    def load(cls, path: str) -> "TopicEngine":
+        """Maps a stored model read-only into memory
+
+        Nothing is deserialized eagerly; pages are loaded by the OS on first access and
+        shared between all processes that map the same files. The presence matrix is only
+        mapped when partial_fit first needs it. Models stored before the
+        update statistics existed load without them.
+
+        Arguments:
+            path (str): the directory written by save
+
+        Returns:
+            TopicEngine: the fitted engine
+        """
+        with open(os.path.join(path, "meta.json")) as fp:
+            meta = json.load(fp)
+        engine = cls(**meta["params"])
+        engine.version = meta["version"]
+        engine.parent = meta.get("parent")
+        engine.n_docs_ = meta.get("n_docs", 0)
+        for name in ARTIFACTS + UPDATE_ARTIFACTS:
+            file = os.path.join(path, f"{name.rstrip('_')}.npy")
+            if name in ARTIFACTS or os.path.exists(file):
+                setattr(engine, name, np.load(file, mmap_mode="r"))
+        if os.path.exists(os.path.join(path, "presence_indptr.npy")):
+            engine._presence, engine._presence_path = None, path
+        return engine
+
+    def keywords(self, topic: int) -> List[str]:
+        """Returns the most important terms of a topic
+
+        Arguments:
+            topic (int): index of the topic
+
+        Returns:
+            List[str]: up to n_keywords terms ordered by weight
+        """
+        row = np.asarray(self.components_[topic])
+        top = np.argsort(-row, kind="stable")[: self.n_keywords]
+        significant = row[top] > KEYWORD_MIN_WEIGHT * row.max()
+        return [str(term) for term in self.terms_[top[significant]]]
+
+    def topics(self, weights: np.ndarray, ids: Sequence[str]) -> TopicResponseModel:
+        """Aggregates document-topic weights into a response
+
+        Each paper is assigned to its dominant topic. The score of a topic is its share
+        of the total topic weight in the corpus.
+
+        Arguments:
+            weights (np.ndarray): document-topic weights of shape (n_papers, n_topics)
+            ids (Sequence[str]): ids of the papers in row order
+
+        Returns:
+            TopicResponseModel: topics ordered by descending score
+        """
+        if weights.size == 0 or weights.sum() <= 0:
+            return TopicResponseModel(topics=[])
+        shares = weights.sum(axis=0) / weights.sum()
+        rows = np.flatnonzero(weights.sum(axis=1) > 0)
+        dominant = weights[rows].argmax(axis=1)
+        order = np.lexsort((-weights[rows, dominant], dominant))
+        members = np.split(
+            rows[order], np.cumsum(np.bincount(dominant, minlength=len(shares)))[:-1]
+        )
+        id_array = np.asarray(ids, dtype=object)
+
+        topics = []
+        for topic in np.argsort(-shares, kind="stable"):
+            if shares[topic] <= 0:
+                continue
+            keywords = self.keywords(topic)
+            topics.append(
+                TopicModel.construct(
+                    id=hashlib.sha1("|".join(keywords).encode()).hexdigest()[:24],
+                    name=", ".join(keywords[:3]),
+                    keywords=keywords,
+                    score=float(shares[topic]),
+                    paper_ids=id_array[members[topic]].tolist(),
+                )
+            )
+        return TopicResponseModel.construct(topics=topics)
+
+
+_engines: Dict[str, TopicEngine] = {}
+
+
+def get_engine(path: str) -> TopicEngine:
+    """Returns the stored model at path, mapping it on first use in this process
+
+    Arguments:
+        path (str): the directory of the stored model
+
+    Returns:
+        TopicEngine: the fitted engine
+    """
+    if path not in _engines:
+        _engines[path] = TopicEngine.load(path)
+    return _engines[path]
+
+
+def release_engines(keep: Iterable[str]) -> None:
+    """Forgets all mapped models but the ones at keep
+
+    A released model is unmapped once no running inference uses it anymore, so old
+    versions do not stay mapped after a switch.
+
+    Arguments:
+        keep (Iterable[str]): the directories of the models to keep
+    """
+    kept = set(keep)
+    for path in [path for path in _engines if path not in kept]:
+        del _engines[path]
+
+
+def infer_topics(
+    ids: Sequence[str], texts: Sequence[str], model_path: Optional[str] = None
+) -> TopicResponseModel:
+    """Extracts the topics of a corpus
+
+    Arguments:
+        ids (Sequence[str]): ids of the papers
+        texts (Sequence[str]): texts of the papers (see paper_text)
+        model_path (Optional[str]): a stored model to score against (see infer_many)
+
+    Returns:
+        TopicResponseModel: the topics of the corpus
+    """
+    return infer_many([(ids, texts)], model_path)[0]
+
+
+def infer_many(
+    corpora: Sequence[Corpus], model_path: Optional[str] = None
+) -> List[TopicResponseModel]:
+    """Extracts the topics of several corpora
+
+    With a stored model, all corpora are scored against its topics in one vectorized
+    pass. Without one, the topics of each corpus are learned from that corpus alone, so
+    the result of a corpus never depends on the corpora it is batched with.
+
+    Arguments:
+        corpora (Sequence[Corpus]): (ids, texts) of each corpus
+        model_path (Optional[str]): a stored model whose topics are used; if None, the
+            topics are learned from each corpus itself
+
+    Returns:
+        List[TopicResponseModel]: the topics of each corpus in the same order
+    """
+    if not model_path:
+        results = []
+        for ids, texts in corpora:
+            engine = TopicEngine()
+            results.append(engine.topics(engine.fit_transform(texts), ids))
+        return results
+    engine = get_engine(model_path)
+    weights = engine.transform([text for _, texts in corpora for text in texts])
+    bounds = np.cumsum([0] + [len(ids) for ids, _ in corpora])
+    return [
+        engine.topics(weights[start:end], ids)
+        for (ids, _), start, end in zip(corpora, bounds[:-1], bounds[1:])
+    ]
@@ -0,0 +1,113 @@
+"""Fast JSON encoding of topic responses
+
+Topic responses can hold very long paper_ids lists. Returning a TopicResponseModel from a
+route makes FastAPI validate it again against the response model and walk it with
+jsonable_encoder before the stdlib json encodes it. Instead, the routes encode the model
+once with orjson and return the bytes directly, optionally with a page of each topic's
+paper_ids only.
+"""
+from typing import List, NamedTuple, Optional
+
+import orjson
+from decouple import config  # type: ignore
+from fastapi import Query
+from starlette.responses import Response
+
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.metrics import stage
+
+MAX_PAPER_IDS = config("TOPIC_MAX_PAPER_IDS", default=0, cast=int)
+
+
+class PaperIdsPage(NamedTuple):
+    """The slice of the paper_ids of each topic that is returned
+
+    Attributes:
+        offset (int): index of the first returned paper id
+        limit (Optional[int]): maximum number of returned paper ids (None for all)
+    """
+
+    offset: int = 0
+    limit: Optional[int] = None
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether all paper ids are returned
+
+        Returns:
+            bool: True if the page neither skips nor truncates paper ids
+        """
+        return self.offset == 0 and self.limit is None
+
+
+def paper_ids_page(
+    paper_ids_offset: int = Query(0, ge=0, description="Skip the first paper ids of each topic."),
+    paper_ids_limit: Optional[int] = Query(
+        None, ge=0, description="Return at most this many paper ids per topic."
+    ),
+) -> PaperIdsPage:
+    """Dependency reading the page of paper_ids from the query; TOPIC_MAX_PAPER_IDS caps it
+
+    Arguments:
+        paper_ids_offset (int): index of the first returned paper id
+        paper_ids_limit (Optional[int]): maximum number of returned paper ids
+
+    Returns:
+        PaperIdsPage: the requested page
+    """
+    if MAX_PAPER_IDS > 0:
+        paper_ids_limit = (
+            MAX_PAPER_IDS if paper_ids_limit is None else min(MAX_PAPER_IDS, paper_ids_limit)
+        )
+    return PaperIdsPage(paper_ids_offset, paper_ids_limit)
+
+
+def encode_topics(topics: TopicResponseModel, page: PaperIdsPage = PaperIdsPage()) -> bytes:
+    """Encodes a topic response without revalidating or copying it
+
+    Arguments:
+        topics (TopicResponseModel): the topics to encode
+        page (PaperIdsPage): the paper ids to include; incomplete pages add the total
+            number of papers of each topic as paper_count (topics whose paper_ids are
+            already a page keep their paper_count and are encoded with the full page)
+
+    Returns:
+        bytes: the JSON encoded response
+    """
+    with stage("serialization"):
+        end = None if page.limit is None else page.offset + page.limit
+        items: List[dict] = []
+        for topic in topics.topics:
+            item: dict = {
+                "id": topic.id,
+                "name": topic.name,
+                "keywords": topic.keywords,
+                "score": topic.score,
+                "paper_ids": topic.paper_ids,
+            }
+            if not page.is_complete:
+                item["paper_ids"] = topic.paper_ids[page.offset : end]
+                item["paper_count"] = len(topic.paper_ids)
+            elif topic.paper_count is not None:
+                item["paper_count"] = topic.paper_count
+            items.append(item)
+        return orjson.dumps({"topics": items})
+
+
+class TopicJSONResponse(Response):
+    """JSON response for content that is already encoded or plain JSON data"""
+
+    media_type = "application/json"
+
+    def render(self, content: object) -> bytes:
+        """Passes encoded content through and encodes everything else with orjson
+
+        Arguments:
+            content (object): the encoded bytes or JSON serializable data
+
+        Returns:
+            bytes: the body of the response
+        """
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
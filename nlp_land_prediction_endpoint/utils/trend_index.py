@@ -0,0 +1,198 @@
+"""Topic weights of the indexed papers aggregated per month of publication
+
+A TrendIndex keeps one bucket per month between the earliest and the latest datePublished
+of the indexed papers, holding the summed topic weights and the number of papers of that
+month. The buckets are updated with every added or replaced paper, so a trend over any
+range costs O(buckets) instead of O(papers); years are summed from their twelve months.
+Papers whose datePublished does not start with YYYY-MM are not counted.
+"""
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from nlp_land_prediction_endpoint.enums.enum_trend import Granularity
+from nlp_land_prediction_endpoint.utils.paper_index import PaperListener
+
+MONTH_PATTERN = re.compile(r"(\d{4})-(\d{2})")
+YEAR_PATTERN = re.compile(r"(\d{4})$")
+
+
+def parse_month(value: str) -> int:
+    """Converts the start of an ISO date to a month number
+
+    Arguments:
+        value (str): a date starting with YYYY-MM, e.g., a datePublished
+
+    Raises:
+        ValueError: if the value does not start with a valid month
+
+    Returns:
+        int: number of months since the start of year 0
+    """
+    match = MONTH_PATTERN.match(value)
+    if match is None or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"{value!r} does not start with YYYY-MM")
+    return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+
+def parse_period(value: str, end: bool = False) -> int:
+    """Converts the bound of a query range to a month number
+
+    Arguments:
+        value (str): a month (YYYY-MM) or a year (YYYY)
+        end (bool): whether a year stands for its last instead of its first month
+
+    Raises:
+        ValueError: if the value is neither a month nor a year
+
+    Returns:
+        int: number of months since the start of year 0
+    """
+    match = YEAR_PATTERN.match(value)
+    if match is not None:
+        return int(match.group(1)) * 12 + (11 if end else 0)
+    return parse_month(value)
+
+
+def month_label(month: int) -> str:
+    """Formats a month number
+
+    Arguments:
+        month (int): number of months since the start of year 0
+
+    Returns:
+        str: the month as YYYY-MM
+    """
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+class Trend(NamedTuple):
+    """Topic weights per time bucket"""
+
+    periods: List[str]
+    papers: np.ndarray
+    weights: np.ndarray
+
+
+class TrendIndex(PaperListener):
+    """Summed topic weights and paper counts per month of publication"""
+
+    def __init__(self) -> None:
+        """Creates an empty index"""
+        self.reset(0)
+
+    def reset(self, n_topics: int) -> None:
+        """Drops all buckets
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+        self.origin = 0
+        self.sums = np.zeros((0, n_topics))
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.row_months = np.zeros(0, dtype=np.int64)
+
+    def _months(self, papers: Sequence[dict]) -> np.ndarray:
+        """Returns the month of publication of papers
+
+        Arguments:
+            papers (Sequence[dict]): the papers as PaperModel dicts
+
+        Returns:
+            np.ndarray: the month number of each paper, or -1 without a valid month
+        """
+        months = np.full(len(papers), -1, dtype=np.int64)
+        for i, paper in enumerate(papers):
+            try:
+                months[i] = parse_month(paper["datePublished"])
+            except (KeyError, TypeError, ValueError):
+                pass
+        return months
+
+    def _cover(self, months: np.ndarray) -> None:
+        """Adds empty buckets so that the buckets span months
+
+        Arguments:
+            months (np.ndarray): valid month numbers
+        """
+        if not len(months):
+            return
+        if not len(self.counts):
+            self.origin = int(months.min())
+        first = min(self.origin, int(months.min()))
+        last = max(self.origin + len(self.counts), int(months.max()) + 1)
+        if (first, last) == (self.origin, self.origin + len(self.counts)):
+            return
+        sums = np.zeros((last - first, self.sums.shape[1]))
+        counts = np.zeros(last - first, dtype=np.int64)
+        offset = self.origin - first
+        sums[offset : offset + len(self.counts)] = self.sums
+        counts[offset : offset + len(self.counts)] = self.counts
+        self.origin, self.sums, self.counts = first, sums, counts
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Subtracts rows from the buckets of their months
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+        months = self.row_months[rows]
+        dated = months >= 0
+        np.subtract.at(self.sums, months[dated] - self.origin, weights[dated])
+        np.subtract.at(self.counts, months[dated] - self.origin, 1)
+        self.row_months[rows] = -1
+
+    def add(self, rows: np.ndarray, papers: Sequence[dict], weights: np.ndarray) -> None:
+        """Adds rows to the buckets of their months
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (Sequence[dict]): the papers of the rows as PaperModel dicts
+            weights (np.ndarray): their topic weights
+        """
+        months = self._months(papers)
+        if len(rows) and rows.max() >= len(self.row_months):
+            row_months = np.full(max(rows.max() + 1, 2 * len(self.row_months)), -1, dtype=np.int64)
+            row_months[: len(self.row_months)] = self.row_months
+            self.row_months = row_months
+        self.row_months[rows] = months
+        dated = months >= 0
+        self._cover(months[dated])
+        np.add.at(self.sums, months[dated] - self.origin, weights[dated])
+        np.add.at(self.counts, months[dated] - self.origin, 1)
+
+    def trend(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        granularity: Granularity = Granularity.MONTH,
+    ) -> Trend:
+        """Sums the buckets of a range of months
+
+        Arguments:
+            start (Optional[int]): the first month, or the earliest month with papers
+            end (Optional[int]): the last month (inclusive), or the latest month with papers
+            granularity (Granularity): whether to return months or whole years
+
+        Returns:
+            Trend: the periods of the range with their number of papers and topic weights
+        """
+        first = self.origin if start is None else start
+        last = self.origin + len(self.counts) - 1 if end is None else end
+        if granularity == Granularity.YEAR:
+            first, last = first - first % 12, last - last % 12 + 11
+        lo, hi = max(first - self.origin, 0), min(last - self.origin + 1, len(self.counts))
+        if lo >= hi:
+            return Trend([], np.zeros(0, dtype=np.int64), np.zeros((0, self.sums.shape[1])))
+        months = np.arange(lo, hi) + self.origin
+        sums, counts = np.maximum(self.sums[lo:hi], 0), self.counts[lo:hi]
+        if granularity == Granularity.YEAR:
+            starts = np.flatnonzero(np.r_[True, np.diff(months // 12) != 0])
+            return Trend(
+                [str(month // 12) for month in months[starts].tolist()],
+                np.add.reduceat(counts, starts),
+                np.add.reduceat(sums, starts),
+            )
+        return Trend([month_label(month) for month in months.tolist()], counts, sums)
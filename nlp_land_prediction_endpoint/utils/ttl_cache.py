@@ -0,0 +1,97 @@
+"""In-memory LRU cache with time-to-live eviction"""
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Size-bounded LRU cache whose entries expire after a time-to-live
+
+    Attributes:
+        max_size (int): maximum number of entries; the least recently used entry is evicted
+        ttl (Optional[float]): default lifetime of an entry in seconds (None for no expiry)
+        hits (int): number of successful lookups
+        misses (int): number of lookups of missing or expired entries
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None) -> None:
+        """Creates an empty cache
+
+        Arguments:
+            max_size (int): maximum number of entries
+            ttl (Optional[float]): default lifetime of an entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[K, Tuple[V, Optional[float]]]" = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        """Looks up an entry and marks it as recently used
+
+        Arguments:
+            key (K): the key of the entry
+
+        Returns:
+            Optional[V]: the value or None if it is missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: K, value: V, expires_at: Optional[float] = None) -> None:
+        """Stores an entry, evicting the least recently used one if full
+
+        Arguments:
+            key (K): the key of the entry
+            value (V): the value to store
+            expires_at (Optional[float]): unix timestamp after which the entry expires;
+                defaults to now + ttl
+        """
+        if self.max_size <= 0:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Removes an entry if present
+
+        Arguments:
+            key (K): the key of the entry
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all entries"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Number of stored entries (including expired ones not yet evicted)
+
+        Returns:
+            int: the number of entries
+        """
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns size, hits and misses of the cache
+
+        Returns:
+            Dict[str, int]: the statistics
+        """
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
@@ -1,22 +1,185 @@
-"""Module for getting the version of NLP-Land-backend"""
+"""Module for getting the version of NLP-Land-backend
+
+If AUTH_BACKEND_URL contains "{version}" and no AUTH_BACKEND_VERSION is configured, the
+version is discovered from the backend with a timeout. The discovered version is written
+to AUTH_BACKEND_VERSION_FILE, so later boots and sibling workers start from the stored
+version without waiting for the network, and it is refreshed in the background. While
+the version is unresolved, the discovery is retried with a backoff from
+AUTH_BACKEND_VERSION_RETRY_SECONDS up to the refresh interval, and logins fail with 503.
+"""
+import asyncio
+import json
+import logging
 import os
+import tempfile
+from typing import List, Optional
 
-import requests
+import httpx
 from decouple import config  # type: ignore
 
+from nlp_land_prediction_endpoint.utils.http_client import backend_client
+
+VERSION_FILE = config("AUTH_BACKEND_VERSION_FILE", default=".backend_version.json")
+VERSION_TIMEOUT = config("AUTH_BACKEND_VERSION_TIMEOUT", default=3.0, cast=float)
+VERSION_REFRESH_SECONDS = config("AUTH_BACKEND_VERSION_REFRESH_SECONDS", default=300, cast=float)
+VERSION_RETRY_SECONDS = config("AUTH_BACKEND_VERSION_RETRY_SECONDS", default=1, cast=float)
+
+logger = logging.getLogger(__name__)
+
+
+class BackendVersion:
+    """Discovers, persists and refreshes the version of the backend"""
+
+    def __init__(
+        self,
+        path: str = VERSION_FILE,
+        timeout: float = VERSION_TIMEOUT,
+        refresh_seconds: float = VERSION_REFRESH_SECONDS,
+        retry_seconds: float = VERSION_RETRY_SECONDS,
+    ) -> None:
+        """Creates an unresolved version
+
+        Arguments:
+            path (str): file storing the last discovered version
+            timeout (float): seconds to wait for the backend
+            refresh_seconds (float): interval of the background refresh
+            retry_seconds (float): first pause between retries while the version is unresolved
+        """
+        self.path = path
+        self.timeout = timeout
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.template: Optional[str] = None
+        self.version: Optional[str] = None
+        self.stored = False
+        self._tasks: List[asyncio.Task] = []
+
+    def _apply(self, version: str) -> None:
+        """Points AUTH_BACKEND_URL to a version of the backend
+
+        Arguments:
+            version (str): the version, e.g., "v0"
+        """
+        assert self.template is not None
+        self.version = version
+        os.environ["AUTH_BACKEND_VERSION"] = version
+        os.environ["AUTH_BACKEND_URL"] = self.template.format(version=version)
+
+    def _read(self) -> Optional[str]:
+        """Reads the stored version if it was discovered for the same backend URL
+
+        Returns:
+            Optional[str]: the stored version or None
+        """
+        try:
+            with open(self.path) as fp:
+                stored = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(stored, dict) or stored.get("url") != self.template:
+            return None
+        return stored.get("version")
+
+    def _write(self, version: str) -> None:
+        """Stores a discovered version atomically
+
+        Arguments:
+            version (str): the version to store
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fp:
+                json.dump({"url": self.template, "version": version}, fp)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning("could not store the backend version in %s", self.path)
+
+    async def discover(self) -> Optional[str]:
+        """Asks the backend for its version
+
+        Returns:
+            Optional[str]: the version or None if the backend did not answer in time
+        """
+        assert self.template is not None
+        try:
+            response = await asyncio.wait_for(
+                backend_client.request("GET", self.template.format(version="version")),
+                self.timeout,
+            )
+            version = response.json()
+        except (httpx.HTTPError, asyncio.TimeoutError, ValueError):
+            return None
+        if not isinstance(version, dict) or "__v" not in version:
+            return None
+        return "v" + str(version["__v"])
+
+    async def resolve(self) -> None:
+        """Resolves AUTH_BACKEND_URL from the configuration, the stored or the discovered
+        version (in this order)
+        """
+        if config("AUTH_BACKEND_VERSION", default=None) is not None:
+            url = config("AUTH_BACKEND_URL").format(version=config("AUTH_BACKEND_VERSION"))
+            os.environ["AUTH_BACKEND_URL"] = url
+            return
+        if self.template is None:
+            if "{version}" not in config("AUTH_BACKEND_URL"):
+                return
+            self.template = config("AUTH_BACKEND_URL")
+        version = self._read()
+        self.stored = version is not None
+        if version is None:
+            version = await self.discover()
+            if version is None:
+                logger.warning("backend version discovery failed; retrying in the background")
+                return
+            self._write(version)
+        self._apply(version)
+
+    async def refresh(self) -> None:
+        """Rediscovers the version, or follows a version stored by a sibling worker"""
+        if self.template is None:
+            return
+        version = await self.discover()
+        if version is None:
+            version = self._read()
+        elif version != self._read():
+            self._write(version)
+        if version is not None and version != self.version:
+            logger.info("backend version changed to %s", version)
+            self._apply(version)
+
+    async def _refresh_forever(self) -> None:
+        """Refreshes the version periodically; right away if it is unverified
+
+        While the version is unresolved, the pause between retries doubles from
+        retry_seconds up to refresh_seconds.
+        """
+        delay = 0.0 if self.stored or self.version is None else self.refresh_seconds
+        retry = self.retry_seconds
+        while True:
+            await asyncio.sleep(delay)
+            await self.refresh()
+            if self.version is None:
+                delay, retry = retry, min(2 * retry, self.refresh_seconds)
+            else:
+                delay, retry = self.refresh_seconds, self.retry_seconds
+
+    async def start(self) -> None:
+        """Resolves the version and starts refreshing it in the background"""
+        await self.resolve()
+        if self.template is not None:
+            self._tasks.append(asyncio.ensure_future(self._refresh_forever()))
+
+    async def stop(self) -> None:
+        """Stops the background refresh"""
+        while self._tasks:
+            self._tasks.pop().cancel()
+
+
+backend_version = BackendVersion()
+
 
-def get_backend_version() -> None:
+async def get_backend_version() -> None:
     """Utility function which provides to correct version for the backend"""
-    if config("AUTH_BACKEND_VERSION", default=None) is None:
-        if config("AUTH_BACKEND_URL").endswith("{version}"):
-            AUTH_BACKEND_VERSION_ROUTE = config("AUTH_BACKEND_URL").format(version="version")
-            version_response = requests.get(AUTH_BACKEND_VERSION_ROUTE)
-            version = version_response.json()
-            if "__v" in version:
-                AUTH_BACKEND_VERSION = "v" + str(version["__v"])
-                os.environ["AUTH_BACKEND_VERSION"] = AUTH_BACKEND_VERSION
-                new_backend_url = config("AUTH_BACKEND_URL").format(version=AUTH_BACKEND_VERSION)
-                os.environ["AUTH_BACKEND_URL"] = new_backend_url
-    else:
-        new_backend_url = config("AUTH_BACKEND_URL").format(version=config("AUTH_BACKEND_VERSION"))
-        os.environ["AUTH_BACKEND_URL"] = new_backend_url
+    await backend_version.resolve()
@@ -1,5 +1,8 @@
 """The production environment using uvicorn server."""
 import argparse
+import glob
+import os
+import tempfile
 
 import uvicorn  # type: ignore
 
@@ -12,9 +15,24 @@ if __name__ == "__main__":
     )
     parser.add_argument("--port", type=int, default=8000, help="Port to run the server on.")
     parser.add_argument("--host", type=str, default="0.0.0.0", help="Host to run the server on.")
+    parser.add_argument(
+        "--metrics-dir",
+        type=str,
+        default=os.environ.get("PROMETHEUS_MULTIPROC_DIR"),
+        help="Directory where the workers share their metrics (*.db files are removed on start).",
+    )
 
     args = parser.parse_args()
 
+    # Each worker writes its metrics to this directory, /metrics aggregates all of them
+    metrics_dir = args.metrics_dir or tempfile.mkdtemp(prefix="nlp-land-metrics-")
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Metrics of a previous run would be added up; only remove the files prometheus_client
+    # writes, since the directory may hold other files
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
     uvicorn.run(
         "nlp_land_prediction_endpoint.app:app",
         host=args.host,
@@ -0,0 +1,5 @@
+"""Configuration shared by all tests"""
+import os
+
+# The app opens the job store on startup; keep it out of the working directory
+os.environ["JOB_STORE_URL"] = "sqlite://:memory:"
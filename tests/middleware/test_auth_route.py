@@ -1,21 +1,28 @@
 """Unittests for the authentication middlware"""
+import asyncio
+import hashlib
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Generator
 
+import httpx
 import pytest
-import requests
 from fastapi.testclient import TestClient
-from requests.models import Response
 
 from nlp_land_prediction_endpoint import __version__
 from nlp_land_prediction_endpoint.app import app
-from nlp_land_prediction_endpoint.middleware.auth import create_token, decode_token
+from nlp_land_prediction_endpoint.middleware import auth
+from nlp_land_prediction_endpoint.middleware.auth import (
+    create_token,
+    decode_token,
+    get_current_user,
+)
 from nlp_land_prediction_endpoint.models.model_token import TokenModel
 from nlp_land_prediction_endpoint.models.model_token_data import TokenData
 from nlp_land_prediction_endpoint.models.model_user import UserModel
 from nlp_land_prediction_endpoint.models.model_user_login import UserLoginModel
+from nlp_land_prediction_endpoint.utils.http_client import backend_client
 
 
 @pytest.fixture
@@ -86,38 +93,32 @@ def dummy_token() -> str:
 
 @pytest.fixture
 def mock_post(monkeypatch: Any) -> None:
-    """Simulates a request.post call by overwriting the function
+    """Simulates a backend request by overwriting the shared client
 
     Arguments:
         monkeypatch: a monkeypatch object
     """
 
-    def mock_post(*agrs, **kwargs):
-        # type: (*str, **int) -> Response
-        response = Response()
-        response.status_code = 200
-        response._content = b'{"email": "test@test.de"}'
-        return response
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        return httpx.Response(200, json={"email": "test@test.de"})
 
-    monkeypatch.setattr(requests, "post", mock_post)
+    monkeypatch.setattr(backend_client, "request", mock_request)
 
 
 @pytest.fixture
 def mock_post_failure(monkeypatch: Any) -> None:
-    """Simulates a request.post call by overwriting the function
+    """Simulates a failing backend request by overwriting the shared client
 
     Arguments:
         monkeypatch: a monkeypatch object
     """
 
-    def mock_post(*agrs, **kwargs):
-        # type: (*str, **int) -> Response
-        response = Response()
-        response.status_code = 401
-        response._content = b'{"message": "error"}'
-        return response
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        return httpx.Response(401, json={"message": "error"})
 
-    monkeypatch.setattr(requests, "post", mock_post)
+    monkeypatch.setattr(backend_client, "request", mock_request)
 
 
 def test_simulated_existing_failed_auth(
@@ -132,7 +133,7 @@ def test_simulated_existing_failed_auth(
         client (TestClient): The current test client.
         login_endpoint (str): Endpoint prefix.
         dummy_login (UserLoginModel): A dummy user to test.
-        mock_post_failure (Any): this overwrites the request.post call
+        mock_post_failure (Any): this overwrites the backend request
     """
     os.environ["AUTH_BACKEND_URL"] = "http://127.0.0.1"
     os.environ["AUTH_TOKEN_ROUTE"] = login_endpoint
@@ -152,7 +153,7 @@ def test_simulated_existing_auth_success(
         client (TestClient): The current test client.
         login_endpoint (str): Endpoint prefix.
         dummy_login (UserLoginModel): A dummy user to test.
-        mock_post (Any): this overwrites the request.post call
+        mock_post (Any): this overwrites the backend request
     """
     os.environ["AUTH_BACKEND_URL"] = "http://127.0.0.1"
     os.environ["AUTH_TOKEN_ROUTE"] = login_endpoint
@@ -179,6 +180,28 @@ def test_non_existing_auth(
     assert response.status_code == 401
 
 
+def test_unresolved_backend_version(
+    client: TestClient,
+    login_endpoint: str,
+    dummy_login: UserLoginModel,
+    mock_post: Any,
+    monkeypatch: Any,
+) -> None:
+    """Test that logins fail explicitly while the backend version is not discovered
+
+    Arguments:
+        client (TestClient): The current test client.
+        login_endpoint (str): Endpoint prefix.
+        dummy_login (UserLoginModel): A dummy user to test.
+        mock_post (Any): this overwrites the backend request
+        monkeypatch (Any): used to set an unresolved backend URL
+    """
+    monkeypatch.setenv("AUTH_BACKEND_URL", "http://127.0.0.1/api/{version}")
+    response = client.post(login_endpoint, json=dummy_login.dict())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
 def test_refresh_forged(client: TestClient, refresh_endpoint: str) -> None:
     """Test the refresh endpoint with a invalid token
 
@@ -207,3 +230,40 @@ def test_refresh(client: TestClient, refresh_endpoint: str, dummy_token: str) ->
     assert datetime.fromtimestamp(int(decoded_refresh.exp)) > datetime.fromtimestamp(
         int(decoded_dummy.exp)
     )
+
+
+def test_verified_token_cache(dummy_token: str, monkeypatch: Any) -> None:
+    """Test that a verified token is decoded only once
+
+    Arguments:
+        dummy_token (str): a valid dummy token
+        monkeypatch (Any): used to count the decodings
+    """
+    decoded = []
+
+    def counting_decode(token: str) -> TokenData:
+        decoded.append(token)
+        return decode_token(token)
+
+    monkeypatch.setattr(auth, "decode_token", counting_decode)
+    auth.token_cache.clear()
+    first = asyncio.run(get_current_user(dummy_token))
+    second = asyncio.run(get_current_user(dummy_token))
+    assert first == second
+    assert decoded == [dummy_token]
+
+
+def test_verified_token_cache_expiry(dummy_user: UserModel, monkeypatch: Any) -> None:
+    """Test that cached tokens expire together with the token
+
+    Arguments:
+        dummy_user (UserModel): a dummy user
+        monkeypatch (Any): used to advance the clock
+    """
+    auth.token_cache.clear()
+    token = create_token(dummy_user, timedelta(seconds=5))
+    asyncio.run(get_current_user(token))
+    assert len(auth.token_cache) == 1
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    assert auth.token_cache.get(hashlib.sha256(token.encode()).digest()) is None
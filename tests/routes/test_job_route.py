@@ -0,0 +1,211 @@
+"""Test the job route."""
+import asyncio
+import time
+from typing import Any, Generator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from nlp_land_prediction_endpoint import __version__
+from nlp_land_prediction_endpoint.app import app
+from nlp_land_prediction_endpoint.middleware.auth import create_token
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_token_data import TokenData
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.routes import route_job
+from nlp_land_prediction_endpoint.utils.job_store import SQLiteJobStore
+from nlp_land_prediction_endpoint.utils.jobs import make_job
+from nlp_land_prediction_endpoint.utils.model_registry import registry
+from nlp_land_prediction_endpoint.utils.paper_records import PaperRecord
+
+
+@pytest.fixture
+def client(monkeypatch: Any) -> Generator:
+    """Get a test client whose jobs are stored in memory.
+
+    Args:
+        monkeypatch (Any): Used to replace the job store.
+
+    Yields:
+        Generator: Yields the test client as input argument for each test.
+    """
+    monkeypatch.setattr(route_job.runner, "store", SQLiteJobStore(":memory:"))
+    monkeypatch.setattr(route_job.runner, "poll_seconds", 0.05)
+    monkeypatch.setattr(registry, "_active", None)
+    with TestClient(app) as tc:
+        yield tc
+
+
+@pytest.fixture
+def endpoint() -> str:
+    """Get the endpoint for tests.
+
+    Returns:
+        str: The endpoint including current version.
+    """
+    return f"/api/v{__version__.split('.')[0]}/jobs/"
+
+
+@pytest.fixture
+def dummy_papers() -> List[dict]:
+    """Create a small corpus of dummy papers with two themes.
+
+    Returns:
+        List[dict]: The dummy papers as JSON.
+    """
+    example = PaperModel.Config.schema_extra.get("example", {})
+    texts = [
+        "neural translation attention encoder decoder",
+        "attention encoder translation transformer",
+        "parsing grammar syntax treebank",
+        "syntax treebank dependency parsing",
+    ]
+    return [
+        {**example, "id": str(i), "title": "", "abstractText": text} for i, text in enumerate(texts)
+    ]
+
+
+def auth_header(email: str = "a@nlp.de", is_admin: bool = False) -> dict:
+    """Create an authorization header.
+
+    Args:
+        email (str): The email of the user.
+        is_admin (bool): Whether the user is an admin.
+
+    Returns:
+        dict: The header with a valid bearer token.
+    """
+    example = UserModel.Config.schema_extra.get("example", {})
+    token = create_token(TokenData(**{**example, "email": email, "isAdmin": is_admin}))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def wait_for(client: TestClient, url: str, timeout: float = 60) -> dict:
+    """Poll a job until it is no longer queued or running.
+
+    Args:
+        client (TestClient): The current test client.
+        url (str): The URL of the job.
+        timeout (float): Seconds to wait.
+
+    Returns:
+        dict: The finished job.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(url, headers=auth_header()).json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"{url} did not finish")
+
+
+def test_submit_and_fetch_job(
+    client: TestClient, endpoint: str, dummy_papers: List[dict], monkeypatch: Any
+) -> None:
+    """Test that a submitted job is processed in chunks and its topics can be fetched.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[dict]): The dummy papers.
+        monkeypatch (Any): Used to shrink the chunks.
+    """
+    monkeypatch.setattr(route_job.make_job, "__defaults__", (3, 100))
+    response = client.post(endpoint, json=dummy_papers)
+    assert response.status_code == 401
+
+    response = client.post(endpoint, json=dummy_papers, headers=auth_header())
+    assert response.status_code == 202
+    job = response.json()
+    assert job["total"] == 4 and job["processed"] == 0
+    url = f"{endpoint}{job['id']}"
+
+    job = wait_for(client, url)
+    assert job["status"] == "done"
+    assert job["processed"] == 4 and job["progress"] == 1.0
+
+    response = client.get(f"{url}/topics", headers=auth_header())
+    assert response.status_code == 200
+    topics = response.json()["topics"]
+    assert topics
+    assert sum(topic["score"] for topic in topics) == pytest.approx(1.0)
+    assert sorted(paper for topic in topics for paper in topic["paper_ids"]) == [
+        "0",
+        "1",
+        "2",
+        "3",
+    ]
+
+    response = client.get(f"{url}/topics?paper_ids_limit=1", headers=auth_header())
+    page = response.json()["topics"]
+    assert [topic["paper_ids"] for topic in page] == [topic["paper_ids"][:1] for topic in topics]
+    assert [topic["paper_count"] for topic in page] == [len(topic["paper_ids"]) for topic in topics]
+
+
+def test_jobs_of_other_users(client: TestClient, endpoint: str, dummy_papers: List[dict]) -> None:
+    """Test that only the owner and admins can see a job.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[dict]): The dummy papers.
+    """
+    job = client.post(endpoint, json=dummy_papers, headers=auth_header()).json()
+    url = f"{endpoint}{job['id']}"
+    assert client.get(url, headers=auth_header("b@nlp.de")).status_code == 404
+    assert client.get(url, headers=auth_header("b@nlp.de", is_admin=True)).status_code == 200
+    assert client.get(f"{endpoint}missing", headers=auth_header()).status_code == 404
+
+
+def test_topics_of_unfinished_job(
+    client: TestClient, endpoint: str, dummy_papers: List[dict], monkeypatch: Any
+) -> None:
+    """Test that the topics of a job are only available when it is done.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[dict]): The dummy papers.
+        monkeypatch (Any): Used to keep the job queued.
+    """
+
+    async def claim_nothing(stale_before: float) -> None:
+        return None
+
+    monkeypatch.setattr(route_job.runner.store, "claim", claim_nothing)
+    job = client.post(endpoint, json=dummy_papers, headers=auth_header()).json()
+    response = client.get(f"{endpoint}{job['id']}/topics", headers=auth_header())
+    assert response.status_code == 409
+
+
+def test_topics_without_papers_are_omitted(client: TestClient, endpoint: str) -> None:
+    """Test that topics no paper of the corpus belongs to are not returned.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+    """
+    job, _ = make_job([PaperRecord("0", "", "parsing", "hash")], "a@nlp.de", "models/acl/1")
+    topics = [{"id": str(i), "name": "parsing", "keywords": ["parsing"]} for i in range(2)]
+    job.update(status="done", processed=1, topics=topics, weights=[0.0, 1.0])
+    store = route_job.runner.store
+    asyncio.run(store.create(job, []))
+    asyncio.run(store.add_results(job["id"], [{"paper_id": "0", "topic": 1, "weight": 1.0}]))
+
+    response = client.get(f"{endpoint}{job['id']}/topics", headers=auth_header())
+    assert response.status_code == 200
+    assert [(topic["id"], topic["paper_ids"]) for topic in response.json()["topics"]] == [
+        ("1", ["0"])
+    ]
+
+
+def test_submit_invalid_job(client: TestClient, endpoint: str) -> None:
+    """Test that papers without the fields of the topics are rejected.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+    """
+    response = client.post(endpoint, json=[{"id": "1"}], headers=auth_header())
+    assert response.status_code == 422
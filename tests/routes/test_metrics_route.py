@@ -0,0 +1,145 @@
+"""Test the metrics route."""
+import os
+import subprocess
+import sys
+from typing import Any, Generator
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client.mmap_dict import MmapedDict  # type: ignore
+from prometheus_client.parser import text_string_to_metric_families  # type: ignore
+
+from nlp_land_prediction_endpoint import __version__
+from nlp_land_prediction_endpoint.app import app
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.utils import metrics
+
+
+@pytest.fixture
+def client() -> Generator:
+    """Get the test client for tests and reuse it.
+
+    Yields:
+        Generator: Yields the test client as input argument for each test.
+    """
+    with TestClient(app) as tc:
+        yield tc
+
+
+@pytest.fixture
+def prefix() -> str:
+    """Get the prefix of all endpoints for tests.
+
+    Returns:
+        str: The prefix including current version.
+    """
+    return f"/api/v{__version__.split('.')[0]}"
+
+
+def scrape(client: TestClient, prefix: str) -> dict:
+    """Scrape the metrics.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+
+    Returns:
+        dict: The value of each sample by name and sorted labels.
+    """
+    response = client.get(f"{prefix}/metrics/")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_per_router_and_stage(client: TestClient, prefix: str) -> None:
+    """Test that requests are counted per router and their stages are timed.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+    """
+    before = scrape(client, prefix)
+    paper = PaperModel(**PaperModel.Config.schema_extra.get("example", {}))
+    assert client.get(f"{prefix}/status/").status_code == 200
+    assert client.post(f"{prefix}/topics/", json=paper.dict()).status_code == 200
+    assert client.post(f"{prefix}/topics/", json={}).status_code == 422
+    after = scrape(client, prefix)
+
+    def delta(name: str, **labels: str) -> float:
+        key = (name, tuple(sorted(labels.items())))
+        return after.get(key, 0) - before.get(key, 0)
+
+    requests = "nlp_land_requests_total"
+    assert delta(requests, router="Status", method="GET", status="200") == 1
+    assert delta(requests, router="Topics", method="POST", status="200") == 1
+    assert delta(requests, router="Topics", method="POST", status="422") == 1
+    assert delta("nlp_land_request_duration_seconds_count", router="Topics") == 2
+    for stage in ("validation", "serialization"):
+        assert delta("nlp_land_stage_duration_seconds_count", stage=stage) >= 2
+    assert after[("nlp_land_requests_in_flight", (("router", "Topics"),))] == 0
+    assert ("nlp_land_queue_depth", (("queue", "scheduler"),)) in after
+
+
+def test_metrics_aggregate_across_workers(tmp_path: Any) -> None:
+    """Test that the counters of several worker processes are summed up.
+
+    Args:
+        tmp_path (Any): The shared metrics directory.
+    """
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = (
+        "from nlp_land_prediction_endpoint.utils.metrics import REQUESTS;"
+        "REQUESTS.labels('Status', 'GET', '200').inc()"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+    scraper = (
+        "from nlp_land_prediction_endpoint.utils.metrics import latest;"
+        "print(latest().body.decode())"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", scraper], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    assert 'nlp_land_requests_total{method="GET",router="Status",status="200"} 2.0' in output
+
+
+def test_sync_endpoint_is_timed() -> None:
+    """Test that endpoints defined without async are timed as well."""
+    router = APIRouter(route_class=metrics.MetricsRoute)
+
+    @router.get("/sync", tags=["Sync"])
+    def sync() -> dict:
+        """Answer synchronously.
+
+        Returns:
+            dict: A constant body.
+        """
+        return {"ok": True}
+
+    sync_app = FastAPI()
+    sync_app.include_router(router)
+    with TestClient(sync_app) as tc:
+        assert tc.get("/sync").json() == {"ok": True}
+    labels = {"router": "Sync", "method": "GET", "status": "200"}
+    assert metrics.REGISTRY.get_sample_value("nlp_land_requests_total", labels) == 1
+
+
+def test_multiprocess_mode(tmp_path: Any, monkeypatch: Any) -> None:
+    """Test that the metrics are read from and cleaned up in the shared directory.
+
+    Args:
+        tmp_path (Any): The shared metrics directory.
+        monkeypatch (Any): Used to enable the multiprocess mode.
+    """
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    MmapedDict(str(tmp_path / f"gauge_livesum_{os.getpid()}.db")).close()
+    response = metrics.latest()
+    assert response.media_type == metrics.CONTENT_TYPE_LATEST
+    metrics.mark_process_dead()
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,172 @@
+"""Test the model registry route."""
+import asyncio
+from typing import Any, Generator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from nlp_land_prediction_endpoint import __version__
+from nlp_land_prediction_endpoint.app import app
+from nlp_land_prediction_endpoint.middleware.auth import create_token
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_token_data import TokenData
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.routes import route_model
+from nlp_land_prediction_endpoint.utils.model_registry import ModelRegistry, registry
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+
+@pytest.fixture
+def client() -> Generator:
+    """Get the test client for tests and reuse it.
+
+    Yields:
+        Generator: Yields the test client as input argument for each test.
+    """
+    with TestClient(app) as tc:
+        yield tc
+
+
+@pytest.fixture
+def endpoint() -> str:
+    """Get the endpoint for tests.
+
+    Returns:
+        str: The endpoint including current version.
+    """
+    return f"/api/v{__version__.split('.')[0]}/models/"
+
+
+@pytest.fixture
+def model_version(tmp_path: Any, monkeypatch: Any) -> str:
+    """Register a model in a temporary registry.
+
+    Args:
+        tmp_path (Any): Directory of the temporary registry.
+        monkeypatch (Any): Used to point the registry to the directory.
+
+    Returns:
+        str: The version of the registered model "acl".
+    """
+    monkeypatch.setattr(registry, "root", str(tmp_path))
+    monkeypatch.setattr(registry, "_active", None)
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(
+        ["attention translation encoder", "parsing syntax treebank", "translation decoder"]
+    )
+    return registry.register("acl", engine)
+
+
+def auth_header(is_admin: bool) -> dict:
+    """Create an authorization header.
+
+    Args:
+        is_admin (bool): Whether the user is an admin.
+
+    Returns:
+        dict: The header with a valid bearer token.
+    """
+    example = UserModel.Config.schema_extra.get("example", {})
+    token = create_token(TokenData(**{**example, "isAdmin": is_admin}))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_list_models(client: TestClient, endpoint: str, model_version: str) -> None:
+    """Test listing the registered models.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        model_version (str): Version of the registered model.
+    """
+    response = client.get(endpoint, headers=auth_header(False))
+    assert response.status_code == 200
+    assert response.json() == {
+        "models": [{"name": "acl", "version": model_version, "parent": None}],
+        "active": None,
+    }
+    assert client.get(endpoint).status_code == 401
+
+
+def test_activate_requires_admin(client: TestClient, endpoint: str, model_version: str) -> None:
+    """Test that only admins may switch the model.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        model_version (str): Version of the registered model.
+    """
+    url = f"{endpoint}acl/{model_version}/activate"
+    assert client.post(url, headers=auth_header(False)).status_code == 403
+    assert registry.active is None
+    response = client.post(f"{endpoint}acl/missing/activate", headers=auth_header(True))
+    assert response.status_code == 404
+
+
+def test_activate_switches_topics(client: TestClient, endpoint: str, model_version: str) -> None:
+    """Test that topics are computed with the activated model.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        model_version (str): Version of the registered model.
+    """
+    response = client.post(f"{endpoint}acl/{model_version}/activate", headers=auth_header(True))
+    assert response.status_code == 200
+    assert response.json()["active"] == {"name": "acl", "version": model_version, "parent": None}
+
+    example = PaperModel.Config.schema_extra.get("example", {})
+    paper = {**example, "id": "registry", "title": "", "abstractText": "parsing a treebank"}
+    response = client.post(f"/api/v{__version__.split('.')[0]}/topics/", json=paper)
+    assert response.status_code == 200
+    topics = response.json()["topics"]
+    assert len(topics) == 1
+    assert "treebank" in topics[0]["keywords"][:3]
+
+
+def test_rollback_model(client: TestClient, endpoint: str, model_version: str) -> None:
+    """Test rolling back an update of the active model.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        model_version (str): Version of the registered model.
+    """
+    response = client.post(f"{endpoint}acl/rollback", headers=auth_header(True))
+    assert response.status_code == 404
+
+    engine = TopicEngine.load(registry.path("acl", model_version))
+    engine.partial_fit(["new"], ["speech recognition acoustic"], ["digest"])
+    updated = registry.register("acl", engine)
+    registry.activate("acl", updated)
+    response = client.post(f"{endpoint}acl/rollback", headers=auth_header(False))
+    assert response.status_code == 403
+    response = client.post(f"{endpoint}acl/rollback", headers=auth_header(True))
+    assert response.status_code == 200
+    assert response.json()["active"]["version"] == model_version
+    assert {"name": "acl", "version": updated, "parent": model_version} in response.json()["models"]
+
+    response = client.post(f"{endpoint}acl/rollback", headers=auth_header(True))
+    assert response.status_code == 404
+
+
+def test_refresh_follows_sibling_switch(model_version: str, monkeypatch: Any) -> None:
+    """Test that the background refresh picks up a model activated by another worker.
+
+    Args:
+        model_version (str): Version of the registered model.
+        monkeypatch (Any): Used to refresh without a pause.
+    """
+    monkeypatch.setattr(route_model, "MODEL_REFRESH_SECONDS", 0)
+    ModelRegistry(registry.root).activate("acl", model_version)
+
+    async def follow() -> None:
+        task = asyncio.ensure_future(route_model._refresh_forever())
+        try:
+            while registry.active is None:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+
+    asyncio.run(asyncio.wait_for(follow(), 10))
+    assert registry.active is not None and registry.active.version == model_version
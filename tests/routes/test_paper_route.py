@@ -0,0 +1,328 @@
+"""Test the paper index route."""
+import os
+import shutil
+import time
+from typing import Any, Generator, List
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from nlp_land_prediction_endpoint import __version__
+from nlp_land_prediction_endpoint.app import app
+from nlp_land_prediction_endpoint.middleware.auth import create_token
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_token_data import TokenData
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.routes import route_paper, route_topic
+from nlp_land_prediction_endpoint.utils.model_registry import registry
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+
+@pytest.fixture
+def client(tmp_path: Any, monkeypatch: Any) -> Generator:
+    """Get a test client with an active model and an empty paper index.
+
+    Args:
+        tmp_path (Any): Directory of the registry and the paper log.
+        monkeypatch (Any): Used to point the registry and the index to the directory.
+
+    Yields:
+        Generator: Yields the test client as input argument for each test.
+    """
+    monkeypatch.setattr(registry, "root", str(tmp_path / "models"))
+    monkeypatch.setattr(registry, "_active", None)
+    monkeypatch.setattr(route_paper.papers, "root", str(tmp_path / "papers"))
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(
+        ["attention translation encoder", "parsing syntax treebank", "translation decoder"]
+    )
+    registry.activate("acl", registry.register("acl", engine))
+    with TestClient(app) as tc:
+        yield tc
+    route_paper.papers.reset(None)
+
+
+@pytest.fixture
+def fast_refresh(monkeypatch: Any) -> None:
+    """Follow the log of sibling workers quickly.
+
+    Args:
+        monkeypatch (Any): Used to shorten the refresh interval.
+    """
+    monkeypatch.setattr(route_paper, "PAPER_INDEX_REFRESH_SECONDS", 0.01)
+
+
+@pytest.fixture
+def endpoint() -> str:
+    """Get the endpoint for tests.
+
+    Returns:
+        str: The endpoint including current version.
+    """
+    return f"/api/v{__version__.split('.')[0]}/papers/"
+
+
+@pytest.fixture
+def dummy_papers() -> List[dict]:
+    """Create papers of different types.
+
+    Returns:
+        List[dict]: The dummy papers as JSON.
+    """
+    example = PaperModel.Config.schema_extra.get("example", {})
+    return [
+        {
+            **example,
+            "id": "1",
+            "abstractText": "attention translation",
+            "typeOfPaper": "conference",
+        },
+        {**example, "id": "2", "abstractText": "syntax treebank", "typeOfPaper": "workshop"},
+        {
+            **example,
+            "id": "3",
+            "abstractText": "parsing treebank",
+            "typeOfPaper": "workshop",
+            "atMainConference": False,
+        },
+    ]
+
+
+def auth_header() -> dict:
+    """Create an authorization header.
+
+    Returns:
+        dict: The header with a valid bearer token.
+    """
+    example = UserModel.Config.schema_extra.get("example", {})
+    return {"Authorization": f"Bearer {create_token(TokenData(**example))}"}
+
+
+def test_add_papers_requires_auth(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test that only authenticated users add papers.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    assert client.post(endpoint, json=dummy_papers).status_code == 401
+
+
+def test_add_papers_requires_model(
+    client: TestClient, endpoint: str, dummy_papers: list, monkeypatch: Any
+) -> None:
+    """Test that papers are only indexed with an active model.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+        monkeypatch (Any): Used to deactivate the model.
+    """
+    monkeypatch.setattr(registry, "_active", None)
+    response = client.post(endpoint, json=dummy_papers, headers=auth_header())
+    assert response.status_code == 409
+
+
+def test_add_papers_pool_saturated(
+    client: TestClient, endpoint: str, dummy_papers: list, monkeypatch: Any
+) -> None:
+    """Test that a saturated inference pool answers with 503.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+        monkeypatch (Any): Used to saturate the pool.
+    """
+    monkeypatch.setattr(route_topic.pool, "max_pending", 0)
+    response = client.post(endpoint, json=dummy_papers, headers=auth_header())
+    assert response.status_code == 503
+    assert client.get(endpoint).json()["papers"] == 0
+
+
+def test_follows_sibling_workers(
+    fast_refresh: None, client: TestClient, endpoint: str, dummy_papers: list
+) -> None:
+    """Test that papers indexed by another worker are applied in the background.
+
+    Args:
+        fast_refresh (None): Shortens the refresh interval.
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    records = [PaperModel(**paper).dict() for paper in dummy_papers]
+    route_paper.papers.append(registry.active, records, np.full((3, 2), 0.5))
+    deadline = time.monotonic() + 10
+    while client.get(endpoint).json()["papers"] < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_filtered_topics(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test that the topics are aggregated over the papers matching the facets.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    response = client.post(endpoint, json=dummy_papers, headers=auth_header())
+    assert response.status_code == 200
+    state = response.json()
+    assert state["papers"] == 3 and state["model"].startswith("acl/")
+    assert state["facets"]["typeOfPaper"] == {"conference": 1, "workshop": 2}
+    assert client.get(endpoint).json() == state
+
+    def paper_ids(query: str) -> List[str]:
+        response = client.get(f"{endpoint}topics{query}")
+        assert response.status_code == 200
+        return sorted(i for topic in response.json()["topics"] for i in topic["paper_ids"])
+
+    assert paper_ids("") == ["1", "2", "3"]
+    assert paper_ids("?typeOfPaper=workshop") == ["2", "3"]
+    assert paper_ids("?typeOfPaper=workshop&typeOfPaper=conference") == ["1", "2", "3"]
+    assert paper_ids("?typeOfPaper=workshop&atMainConference=true") == ["2"]
+    assert paper_ids("?typeOfPaper=demo") == []
+    assert client.get(f"{endpoint}topics?typeOfPaper=unknown").status_code == 422
+
+
+def test_replaced_papers(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test that sending a paper again replaces it.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    client.post(endpoint, json=dummy_papers, headers=auth_header())
+    changed = {**dummy_papers[0], "typeOfPaper": "workshop"}
+    state = client.post(endpoint, json=[changed], headers=auth_header()).json()
+    assert state["papers"] == 3
+    assert state["facets"]["typeOfPaper"] == {"workshop": 3}
+
+
+def test_trends(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test that the topic prevalence is aggregated per period of publication.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    dates = ["2019-06-01", "2021-01-15", "2021-07-01"]
+    dated = [{**paper, "datePublished": date} for paper, date in zip(dummy_papers, dates)]
+    client.post(endpoint, json=dated, headers=auth_header())
+    response = client.get(f"{endpoint}trends")
+    assert response.status_code == 200
+    trend = response.json()
+    assert len(trend["topics"]) == 2
+    assert [bucket["period"] for bucket in trend["buckets"]] == ["2019", "2020", "2021"]
+    assert [bucket["papers"] for bucket in trend["buckets"]] == [1, 0, 2]
+    assert sum(trend["buckets"][0]["scores"]) == pytest.approx(1.0)
+    assert trend["buckets"][1]["scores"] == [0.0, 0.0]
+    months = client.get(f"{endpoint}trends?granularity=month&start=2021-01&end=2021-02").json()
+    assert [(bucket["period"], bucket["papers"]) for bucket in months["buckets"]] == [
+        ("2021-01", 1),
+        ("2021-02", 0),
+    ]
+    assert client.get(f"{endpoint}trends?start=January").status_code == 422
+
+
+def test_influence(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test that cited papers rank highest in their topic.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    assert client.get(f"{endpoint}influence").json() == {"edges": 0, "topics": []}
+    citing = [["2", "3"], [], ["1"]]
+    cited = [{**paper, "citedBy": ids} for paper, ids in zip(dummy_papers, citing)]
+    client.post(endpoint, json=cited, headers=auth_header())
+    response = client.get(f"{endpoint}influence?limit=2")
+    assert response.status_code == 200
+    influence = response.json()
+    assert influence["edges"] == 3
+    assert len(influence["topics"]) == 2
+    for topic in influence["topics"]:
+        scores = [paper["score"] for paper in topic["papers"]]
+        assert len(scores) == 2 and scores == sorted(scores, reverse=True)
+    assert client.get(f"{endpoint}influence?limit=0").status_code == 422
+
+
+def test_profiles(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test the topic profiles of authors and venues.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    author = dummy_papers[0]["firstAuthor"]
+    assert client.get(f"{endpoint}profiles/author/{author}").status_code == 404
+    client.post(endpoint, json=dummy_papers, headers=auth_header())
+    response = client.get(f"{endpoint}profiles/author/{author}")
+    assert response.status_code == 200
+    profile = response.json()
+    assert profile["kind"] == "author" and profile["papers"] == 3
+    assert profile["paper_ids"] == ["1", "2", "3"]
+    assert sum(topic["score"] for topic in profile["topics"]) == pytest.approx(1.0)
+    venue = dummy_papers[0]["venues"][0]
+    paged = client.get(f"{endpoint}profiles/venue/{venue}?paper_ids_offset=1&paper_ids_limit=1")
+    assert paged.json()["paper_ids"] == ["2"]
+    assert client.get(f"{endpoint}profiles/firstAuthor/unknown").status_code == 404
+    assert client.get(f"{endpoint}profiles/reviewer/{author}").status_code == 422
+
+
+def test_similar(client: TestClient, endpoint: str, dummy_papers: list) -> None:
+    """Test the papers most similar to an indexed paper or a text.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+    """
+    assert client.get(f"{endpoint}similar?paper_id=2").status_code == 404
+    client.post(endpoint, json=dummy_papers, headers=auth_header())
+    response = client.get(f"{endpoint}similar?paper_id=2&k=1&recall=true")
+    assert response.status_code == 200
+    result = response.json()
+    assert [paper["id"] for paper in result["papers"]] == ["3"]
+    assert result["recall"] == 1.0 and result["candidates"] == 2
+    text = {"abstractText": "attention translation encoder"}
+    result = client.post(f"{endpoint}similar?k=2", json=text).json()
+    assert result["papers"][0]["id"] == "1" and result["recall"] is None
+    result = client.post(f"{endpoint}similar", json={"abstractText": "unrelated words"}).json()
+    assert result["papers"] == []
+
+
+def test_similar_after_restart(
+    client: TestClient, endpoint: str, dummy_papers: list, monkeypatch: Any
+) -> None:
+    """Test that a restarted worker embeds the log and stores a snapshot of the embeddings.
+
+    Args:
+        client (TestClient): The test client.
+        endpoint (str): The endpoint of the paper index.
+        dummy_papers (list): Papers to add.
+        monkeypatch (Any): Used to deactivate the model.
+    """
+    client.post(endpoint, json=dummy_papers, headers=auth_header())
+    for snapshot in route_paper.similar._snapshots():
+        shutil.rmtree(snapshot)
+    route_paper.papers.reset(None)
+    with TestClient(app) as restarted:
+        assert route_paper.similar.n == 3
+        snapshots = route_paper.similar._snapshots()
+        assert [os.path.basename(path) for path in snapshots] == ["similar-0000000003"]
+        result = restarted.get(f"{endpoint}similar?paper_id=2&k=1").json()
+        assert [paper["id"] for paper in result["papers"]] == ["3"]
+        monkeypatch.setattr(registry, "_active", None)
+        route_paper.papers.reset(None)
+        text = {"abstractText": "attention translation encoder"}
+        assert restarted.post(f"{endpoint}similar", json=text).json()["papers"] == []
@@ -0,0 +1,149 @@
+"""Test the opt-in request profiling."""
+import json
+from typing import Any, Generator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from nlp_land_prediction_endpoint import __version__
+from nlp_land_prediction_endpoint.app import app
+from nlp_land_prediction_endpoint.middleware import profiling
+from nlp_land_prediction_endpoint.middleware.auth import create_token
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_token_data import TokenData
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+
+
+@pytest.fixture
+def client(tmp_path: Any, monkeypatch: Any) -> Generator:
+    """Get the test client for tests and store profiles in a temporary directory.
+
+    Args:
+        tmp_path (Any): The working directory of the test.
+        monkeypatch (Any): Used to change the working directory.
+
+    Yields:
+        Generator: Yields the test client as input argument for each test.
+    """
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as tc:
+        yield tc
+
+
+@pytest.fixture
+def prefix() -> str:
+    """Get the prefix of all endpoints for tests.
+
+    Returns:
+        str: The prefix including current version.
+    """
+    return f"/api/v{__version__.split('.')[0]}"
+
+
+def auth_header(is_admin: bool) -> dict:
+    """Create an authorization header.
+
+    Args:
+        is_admin (bool): Whether the user is an admin.
+
+    Returns:
+        dict: The header with a valid bearer token.
+    """
+    example = UserModel.Config.schema_extra.get("example", {})
+    token = create_token(TokenData(**{**example, "isAdmin": is_admin}))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_profile_only_for_admins(client: TestClient, prefix: str) -> None:
+    """Test that the profile flag is ignored for other users.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+    """
+    paper = PaperModel(**PaperModel.Config.schema_extra.get("example", {})).dict()
+    response = client.post(f"{prefix}/topics/", json=paper, headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    headers = {**auth_header(False), "X-Profile": "1"}
+    response = client.post(f"{prefix}/topics/?profile=1", json=paper, headers=headers)
+    assert "x-profile-id" not in response.headers
+    response = client.post(f"{prefix}/topics/", json=paper, headers=auth_header(True))
+    assert "x-profile-id" not in response.headers
+
+
+def test_profile_of_admin_request(client: TestClient, prefix: str) -> None:
+    """Test profiling a topic request and downloading the profile.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+    """
+    paper = PaperModel(**PaperModel.Config.schema_extra.get("example", {})).dict()
+    response = client.post(f"{prefix}/topics/?profile=1", json=paper, headers=auth_header(True))
+    assert response.status_code == 200
+    assert response.json()["topics"]
+    profile_id = response.headers["x-profile-id"]
+
+    url = f"{prefix}/profiling/{profile_id}"
+    assert client.get(url, headers=auth_header(False)).status_code == 403
+    response = client.get(url, headers=auth_header(True))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    response = client.get(f"{url}?format=text", headers=auth_header(True))
+    assert response.status_code == 200
+    assert "fit_transform" in response.text
+    response = client.get(f"{prefix}/profiling/{'0' * 32}", headers=auth_header(True))
+    assert response.status_code == 404
+
+
+def test_profile_needs_valid_bearer_token(client: TestClient, prefix: str) -> None:
+    """Test that the profile flag is ignored without a valid bearer token.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+    """
+    paper = PaperModel(**PaperModel.Config.schema_extra.get("example", {})).dict()
+    for authorization in ("Basic YWRtaW46YWRtaW4=", "Bearer invalid"):
+        headers = {"Authorization": authorization, "X-Profile": "1"}
+        response = client.post(f"{prefix}/topics/", json=paper, headers=headers)
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+
+
+def test_profile_of_streamed_request(client: TestClient, prefix: str) -> None:
+    """Test profiling a NDJSON stream, which bypasses the cache of the topics.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+    """
+    paper = PaperModel(**PaperModel.Config.schema_extra.get("example", {}))
+    headers = {**auth_header(True), "X-Profile": "1"}
+    response = client.post(f"{prefix}/topics/stream", data=paper.json(), headers=headers)
+    assert response.status_code == 200
+    assert json.loads(response.text.splitlines()[0])["topics"]
+    profile_id = response.headers["x-profile-id"]
+    response = client.get(f"{prefix}/profiling/{profile_id}?format=text", headers=headers)
+    assert "infer_topics" in response.text
+
+
+def test_one_profiled_request_at_a_time(client: TestClient, prefix: str) -> None:
+    """Test that a profiled request is rejected while another one is profiled.
+
+    Args:
+        client (TestClient): The current test client.
+        prefix (str): Endpoint prefix.
+    """
+    paper = PaperModel(**PaperModel.Config.schema_extra.get("example", {})).dict()
+    headers = {**auth_header(True), "X-Profile": "1"}
+    with profiling._loop_profiled:
+        response = client.post(f"{prefix}/topics/", json=paper, headers=headers)
+        assert response.status_code == 409
+        assert "x-profile-id" not in response.headers
+        response = client.post(f"{prefix}/topics/", json=paper, headers=auth_header(True))
+        assert response.status_code == 200
+    response = client.post(f"{prefix}/topics/", json=paper, headers=headers)
+    assert response.status_code == 200
+    assert "x-profile-id" in response.headers
@@ -1,12 +1,17 @@
 """Test the status route."""
-from typing import Generator
+import json
+from typing import Any, Generator, List
 
 import pytest
 from fastapi.testclient import TestClient
 
 from nlp_land_prediction_endpoint import __version__
 from nlp_land_prediction_endpoint.app import app
+from nlp_land_prediction_endpoint.middleware.auth import create_token
 from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_token_data import TokenData
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.routes import route_topic
 
 
 @pytest.fixture
@@ -41,6 +46,26 @@ def dummy_paper() -> PaperModel:
     return PaperModel(**example)
 
 
+@pytest.fixture
+def dummy_papers() -> List[PaperModel]:
+    """Create a small corpus of dummy papers with two themes.
+
+    Returns:
+        List[PaperModel]: The dummy papers.
+    """
+    example = PaperModel.Config.schema_extra.get("example", {})
+    texts = [
+        "neural translation attention encoder decoder",
+        "attention encoder translation transformer",
+        "parsing grammar syntax treebank",
+        "syntax treebank dependency parsing",
+    ]
+    return [
+        PaperModel(**{**example, "id": str(i), "title": "", "abstractText": text})
+        for i, text in enumerate(texts)
+    ]
+
+
 def test_post_topic_for_papers(client: TestClient, endpoint: str, dummy_paper: PaperModel) -> None:
     """Test the backend status.
 
@@ -51,14 +76,153 @@ def test_post_topic_for_papers(client: TestClient, endpoint: str, dummy_paper: P
     """
     response = client.post(endpoint, json=dummy_paper.dict())
     assert response.status_code == 200
-    assert response.json() == {
-        "topics": [
-            {
-                "id": "5136bc054aed4daf9e2a1237",
-                "name": "Topic 1",
-                "score": 0.5,
-                "keywords": ["keyword 1", "keyword 2"],
-                "paper_ids": ["5136bc054aed4daf9e2a1239", "5136bc054aed4daf9e2a1238"],
-            }
-        ]
-    }
+    topics = response.json()["topics"]
+    assert len(topics) == 1
+    assert topics[0]["score"] == pytest.approx(1.0)
+    assert topics[0]["paper_ids"] == [dummy_paper.id]
+    assert "attention" in topics[0]["keywords"]
+
+
+def test_post_topic_for_paper_batch(
+    client: TestClient, endpoint: str, dummy_papers: List[PaperModel]
+) -> None:
+    """Test topics for a batch of papers.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[PaperModel]): Dummy papers to test.
+    """
+    response = client.post(f"{endpoint}batch", json=[paper.dict() for paper in dummy_papers])
+    assert response.status_code == 200
+    topics = response.json()["topics"]
+    assert sorted(paper_id for topic in topics for paper_id in topic["paper_ids"]) == [
+        "0",
+        "1",
+        "2",
+        "3",
+    ]
+    assert sum(topic["score"] for topic in topics) == pytest.approx(1.0)
+
+
+def test_post_topic_for_paper_batch_page(
+    client: TestClient, endpoint: str, dummy_papers: List[PaperModel]
+) -> None:
+    """Test truncating the paper ids of the topics.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[PaperModel]): Dummy papers to test.
+    """
+    body = [paper.dict() for paper in dummy_papers]
+    response = client.post(f"{endpoint}batch?paper_ids_limit=1", json=body)
+    assert response.status_code == 200
+    topics = response.json()["topics"]
+    assert all(len(topic["paper_ids"]) <= 1 for topic in topics)
+    assert sum(topic["paper_count"] for topic in topics) == 4
+    assert client.post(f"{endpoint}batch?paper_ids_limit=-1", json=body).status_code == 422
+
+
+def test_post_topic_for_empty_batch(client: TestClient, endpoint: str) -> None:
+    """Test topics for an empty batch.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+    """
+    response = client.post(f"{endpoint}batch", json=[])
+    assert response.status_code == 200
+    assert response.json() == {"topics": []}
+
+
+def test_post_topic_for_paper_bulk(
+    client: TestClient, endpoint: str, dummy_papers: List[PaperModel]
+) -> None:
+    """Test the trusted bulk path against the validated batch path.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[PaperModel]): Dummy papers to test.
+    """
+    example = UserModel.Config.schema_extra.get("example", {})
+    headers = {"Authorization": f"Bearer {create_token(TokenData(**example))}"}
+    body = [paper.dict() for paper in dummy_papers]
+    assert client.post(f"{endpoint}bulk", json=body).status_code == 401
+    response = client.post(f"{endpoint}bulk", json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == client.post(f"{endpoint}batch", json=body).json()
+    minimal = [
+        {"id": paper.id, "title": paper.title, "abstractText": paper.abstractText}
+        for paper in dummy_papers
+    ]
+    response = client.post(f"{endpoint}bulk", json=minimal, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 0, "preProcessingGitHash"]
+
+
+def test_post_topic_for_paper_stream(
+    client: TestClient, endpoint: str, dummy_papers: List[PaperModel], monkeypatch: Any
+) -> None:
+    """Test topics for a NDJSON stream of papers processed in chunks.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_papers (List[PaperModel]): Dummy papers to test.
+        monkeypatch (Any): Used to shrink the chunk size.
+    """
+    monkeypatch.setattr(route_topic, "STREAM_CHUNK_SIZE", 2)
+    lines = [paper.json() for paper in dummy_papers[:3]] + ["", '{"id": "broken"}']
+    lines += [paper.json() for paper in dummy_papers[3:]]
+    response = client.post(f"{endpoint}stream", data="\n".join(lines))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 4
+    assert records[1]["error"]["line"] == 4
+    paper_ids = [
+        sorted(paper_id for topic in record["topics"] for paper_id in topic["paper_ids"])
+        for record in (records[0], records[2], records[3])
+    ]
+    assert paper_ids == [["0", "1"], ["2"], ["3"]]
+
+
+def test_topic_stats(client: TestClient, endpoint: str, dummy_paper: PaperModel) -> None:
+    """Test the scheduler statistics after a request.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_paper (PaperModel): A dummy paper to test.
+    """
+    client.post(endpoint, json=dummy_paper.dict())
+    hits = client.get(f"{endpoint}stats").json()["cache"]["hits"]
+    client.post(endpoint, json=dummy_paper.dict())
+    response = client.get(f"{endpoint}stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["scheduler"]["batches"] >= 1
+    assert stats["scheduler"]["queue_depth"] == 0
+    assert stats["cache"]["hits"] == hits + 1
+
+
+def test_topic_pool_saturated(
+    client: TestClient, endpoint: str, dummy_paper: PaperModel, monkeypatch: Any
+) -> None:
+    """Test that a saturated inference pool answers with 503 and Retry-After.
+
+    Args:
+        client (TestClient): The current test client.
+        endpoint (str): Endpoint prefix.
+        dummy_paper (PaperModel): A dummy paper to test.
+        monkeypatch (Any): Used to saturate the pool.
+    """
+    monkeypatch.setattr(route_topic.pool, "max_pending", 0)
+    uncached_paper = dummy_paper.copy(update={"id": "uncached"})
+    response = client.post(endpoint, json=uncached_paper.dict())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    response = client.post(f"{endpoint}stream", data=dummy_paper.json())
+    assert response.status_code == 503
@@ -0,0 +1,111 @@
+"""Unittests for the micro-batching scheduler"""
+import asyncio
+from typing import List, Sequence
+
+import pytest
+
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.batch_scheduler import MicroBatchScheduler
+from nlp_land_prediction_endpoint.utils.topic_engine import Corpus
+
+
+class RecordingRunner:
+    """Runner that records the batches and echoes the paper ids as a topic"""
+
+    def __init__(self) -> None:
+        self.batches: List[int] = []
+
+    async def __call__(self, corpora: Sequence[Corpus]) -> List[TopicResponseModel]:
+        self.batches.append(len(corpora))
+        return [
+            TopicResponseModel(
+                topics=[{"id": "t", "name": "t", "keywords": [], "score": 1.0, "paper_ids": ids}]
+            )
+            for ids, _ in corpora
+        ]
+
+
+def test_coalesces_concurrent_requests() -> None:
+    runner = RecordingRunner()
+    scheduler = MicroBatchScheduler(runner, window_ms=50, max_size=100)
+
+    async def run() -> List[TopicResponseModel]:
+        await scheduler.start()
+        results = await asyncio.gather(*(scheduler.submit([str(i)], ["text"]) for i in range(5)))
+        await scheduler.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert runner.batches == [5]
+    assert [result.topics[0].paper_ids for result in results] == [[str(i)] for i in range(5)]
+    stats = scheduler.stats.as_dict()
+    assert stats["batches"] == 1
+    assert stats["mean_batch_requests"] == 5
+    assert stats["max_queue_wait_ms"] >= 0
+
+
+def test_max_size_splits_batches() -> None:
+    runner = RecordingRunner()
+    scheduler = MicroBatchScheduler(runner, window_ms=1000, max_size=2)
+
+    async def run() -> None:
+        await scheduler.start()
+        await asyncio.gather(*(scheduler.submit([str(i)], ["text"]) for i in range(4)))
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert runner.batches == [2, 2]
+
+
+def test_errors_are_propagated() -> None:
+    async def failing_runner(corpora: Sequence[Corpus]) -> List[TopicResponseModel]:
+        raise ValueError("inference failed")
+
+    scheduler = MicroBatchScheduler(failing_runner, window_ms=1)
+
+    async def run() -> None:
+        await scheduler.start()
+        try:
+            await scheduler.submit(["1"], ["text"])
+        finally:
+            await scheduler.stop()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_submit_without_start() -> None:
+    runner = RecordingRunner()
+    scheduler = MicroBatchScheduler(runner)
+    result = asyncio.run(scheduler.submit(["1"], ["text"]))
+    assert result.topics[0].paper_ids == ["1"]
+    assert scheduler.queue_depth == 0
+
+
+def test_zero_window_dispatches_each_request() -> None:
+    runner = RecordingRunner()
+    scheduler = MicroBatchScheduler(runner, window_ms=0)
+
+    async def run() -> None:
+        await scheduler.start()
+        await asyncio.gather(*(scheduler.submit([str(i)], ["text"]) for i in range(3)))
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert runner.batches == [1, 1, 1]
+
+
+def test_stop_cancels_queued_requests() -> None:
+    scheduler = MicroBatchScheduler(RecordingRunner())
+
+    async def run() -> bool:
+        scheduler._queue = asyncio.Queue()
+        task = asyncio.ensure_future(scheduler.submit(["1"], ["text"]))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 1
+        await scheduler.stop()
+        await asyncio.gather(task, return_exceptions=True)
+        return task.cancelled()
+
+    assert asyncio.run(run())
+    assert scheduler.queue_depth == 0
@@ -0,0 +1,92 @@
+"""Unittests for the citation graph"""
+import asyncio
+from typing import List
+
+import numpy as np
+
+from nlp_land_prediction_endpoint.utils.citation_graph import (
+    CitationGraph,
+    topic_pagerank,
+)
+
+
+def papers(cited_by: List[List[str]], first: int = 0) -> List[dict]:
+    return [{"id": str(first + i), "citedBy": citing} for i, citing in enumerate(cited_by)]
+
+
+def test_edges_between_indexed_papers() -> None:
+    graph = CitationGraph()
+    graph.reset(2)
+    # paper 0 is cited by 1, 2 and an unknown paper; paper 3 arrives later and cites 0
+    graph.add(np.arange(3), papers([["1", "2", "x", "3"], ["2"], []]), np.ones((3, 2)))
+    transition, dangling = graph.transition(3)
+    assert transition.nnz == 3
+    assert dangling.tolist() == [True, False, False]
+    np.testing.assert_allclose(transition.toarray()[:, 2], [0.5, 0.5, 0.0])
+    graph.add(np.array([3]), papers([[]], first=3), np.ones((1, 2)))
+    transition, _ = graph.transition(4)
+    assert transition.nnz == 4
+
+    # replacing paper 0 drops its previous citations
+    graph.remove(np.array([0]), np.ones((1, 2)))
+    graph.add(np.array([0]), papers([["1"]]), np.ones((1, 2)))
+    transition, dangling = graph.transition(4)
+    assert transition.nnz == 2
+    assert graph.n_edges == 2
+    assert dangling.tolist() == [True, False, False, True]
+
+
+def test_pagerank_follows_citations_and_topics() -> None:
+    graph = CitationGraph()
+    graph.reset(2)
+    weights = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 1.0]])
+    # paper 0 is cited by 1 and 3, paper 2 by 3
+    graph.add(np.arange(4), papers([["1", "3"], [], ["3"], []]), weights)
+    transition, dangling = graph.transition(4)
+    ranks = topic_pagerank(transition, dangling, weights, tolerance=1e-10)
+    np.testing.assert_allclose(ranks.sum(axis=0), [1.0, 1.0])
+    assert ranks[:, 0].argmax() == 0
+    assert ranks[:, 1].argmax() == 2
+    assert ranks[0, 1] > ranks[1, 1]
+
+    cached = asyncio.run(graph.ranks(weights))
+    np.testing.assert_allclose(cached, ranks, atol=1e-5)
+    assert asyncio.run(graph.ranks(weights)) is cached
+
+
+def test_ranks_start_from_previous_ranks() -> None:
+    graph = CitationGraph()
+    graph.reset(2)
+    graph.add(np.array([], dtype=np.int64), [], np.empty((0, 2)))
+    assert graph.version == 0 and graph.n_citations == 0
+    weights = np.array([[1.0, 0.0], [0.0, 1.0]])
+    graph.add(np.arange(2), papers([["1"], []]), weights)
+    first = asyncio.run(graph.ranks(weights))
+    assert graph.n_citations == 1
+    weights = np.vstack([weights, [[1.0, 0.0]]])
+    graph.add(np.array([2]), papers([["0"]], first=2), weights[2:])
+    ranks = asyncio.run(graph.ranks(weights))
+    assert ranks.shape == (3, 2) and graph.n_citations == 2
+    np.testing.assert_allclose(ranks.sum(axis=0), [1.0, 1.0])
+    assert not np.allclose(ranks[:2], first)
+
+
+def test_edges_added_while_ranking_are_kept() -> None:
+    graph = CitationGraph()
+    graph.reset(1)
+    weights = np.ones((3, 1))
+    graph.add(np.arange(2), papers([["1"], []]), weights[:2])
+
+    async def rank_and_add() -> np.ndarray:
+        ranking = asyncio.ensure_future(graph.ranks(weights[:2]))
+        await asyncio.sleep(0)
+        # the matrix is built in the executor meanwhile
+        graph.add(np.array([2]), papers([["0", "1"]], first=2), weights[2:])
+        return await ranking
+
+    assert asyncio.run(rank_and_add()).shape == (2, 1)
+    assert graph.n_edges == 3
+    assert graph.transition(3)[0].nnz == 3
+    # the transition of the earlier graph is not taken for the current one
+    assert asyncio.run(graph.ranks(weights)).shape == (3, 1)
+    assert graph.n_citations == 3
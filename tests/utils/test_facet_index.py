@@ -0,0 +1,44 @@
+"""Unittests for the facet bitmap index"""
+from typing import List
+
+import numpy as np
+
+from nlp_land_prediction_endpoint.enums.enum_paper import TypeOfPaper
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.utils.facet_index import FacetIndex
+
+
+def papers() -> List[dict]:
+    example = PaperModel.Config.schema_extra.get("example", {})
+    return [
+        {**example, "typeOfPaper": "conference", "atMainConference": True},
+        {**example, "typeOfPaper": "workshop", "atMainConference": False},
+        {**example, "typeOfPaper": "conference", "atMainConference": False},
+        {**example, "typeOfPaper": "demo", "atMainConference": True},
+    ]
+
+
+def test_select_combines_facets() -> None:
+    index = FacetIndex()
+    index.reset(2)
+    index.add(np.arange(4), papers(), np.zeros((4, 2)))
+    assert index.rows({}).tolist() == [0, 1, 2, 3]
+    assert index.rows({"typeOfPaper": [TypeOfPaper.CONFERENCE]}).tolist() == [0, 2]
+    assert index.rows(
+        {"typeOfPaper": ["conference", "demo"], "atMainConference": [True]}
+    ).tolist() == [0, 3]
+    assert index.rows({"typeOfPaper": ["poster"]}).tolist() == []
+    assert index.rows({"typeOfPaper": None, "atMainConference": [False]}).tolist() == [1, 2]
+
+
+def test_remove_and_counts() -> None:
+    index = FacetIndex()
+    index.add(np.arange(4), papers(), np.zeros((4, 2)))
+    index.remove(np.array([0, 1]), np.zeros((2, 2)))
+    index.add(np.array([1]), papers()[:1], np.zeros((1, 2)))
+    assert index.rows({"typeOfPaper": ["conference"]}).tolist() == [1, 2]
+    counts = index.counts()
+    assert counts["typeOfPaper"] == {"conference": 2, "demo": 1}
+    assert counts["atMainConference"] == {"false": 1, "true": 2}
+    index.reset(2)
+    assert index.rows({}).tolist() == []
@@ -0,0 +1,54 @@
+"""Unittests for the pooled backend client"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Generator
+
+import pytest
+
+from nlp_land_prediction_endpoint.utils.http_client import BackendClient
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every request with a keep-alive 200"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        """Send an empty 200 response."""
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args: Any) -> None:
+        """Keep the test output quiet.
+
+        Args:
+            *args (Any): The log arguments.
+        """
+
+
+@pytest.fixture
+def url() -> Generator:
+    """Serve requests on a local port.
+
+    Yields:
+        Generator: The URL of the server.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_reopens_in_new_loop_and_closes_old_pool(url: str) -> None:
+    client = BackendClient()
+    assert asyncio.run(client.request("GET", url)).status_code == 200
+    previous = client._client
+    assert previous is not None and not previous.is_closed
+    assert asyncio.run(client.request("GET", url)).status_code == 200
+    assert previous.is_closed
+    assert client._client is not previous
+    asyncio.run(client.close())
+    assert client._client is None
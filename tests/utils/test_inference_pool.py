@@ -0,0 +1,89 @@
+"""Unittests for the inference pool"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from nlp_land_prediction_endpoint.utils.inference_pool import (
+    InferencePool,
+    PoolSaturatedError,
+    _init_worker,
+    _run_and_wait,
+)
+
+
+def test_runs_in_worker_process() -> None:
+    pool = InferencePool(workers=1, max_pending=2)
+
+    async def run() -> int:
+        await pool.start()
+        try:
+            return await pool.run(pow, 2, 10)
+        finally:
+            await pool.stop()
+
+    assert asyncio.run(run()) == 1024
+    assert pool.stats()["pending"] == 0
+
+
+def test_rejects_when_saturated() -> None:
+    pool = InferencePool(workers=0, max_pending=1)
+
+    async def run() -> None:
+        await pool.start()
+        slow = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.05)
+        assert pool.saturated
+        try:
+            with pytest.raises(PoolSaturatedError):
+                await pool.run(time.sleep, 0)
+            await pool.run(time.sleep, 0, block=True)
+        finally:
+            await slow
+            await pool.stop()
+
+    asyncio.run(run())
+    assert pool.stats()["rejected"] == 1
+
+
+def record_pid(directory: str) -> None:
+    """Record the worker process in a directory.
+
+    Args:
+        directory (str): The directory to create a file named after the process id in.
+    """
+    open(os.path.join(directory, str(os.getpid())), "a").close()
+
+
+def test_broadcast_runs_once_per_worker(tmp_path: Any) -> None:
+    pool = InferencePool(workers=2, max_pending=2)
+    pool.broadcast(record_pid, str(tmp_path))
+    assert os.listdir(str(tmp_path)) == []
+
+    async def run() -> None:
+        await pool.start()
+        try:
+            for directory in (tmp_path / "first", tmp_path / "second"):
+                directory.mkdir()
+                pool.broadcast(record_pid, str(directory))
+        finally:
+            await pool.stop()
+
+    asyncio.run(run())
+    workers = os.listdir(str(tmp_path / "first"))
+    assert len(workers) == 2
+    assert sorted(os.listdir(str(tmp_path / "second"))) == sorted(workers)
+
+
+def test_run_and_wait_releases_on_timeout(tmp_path: Any) -> None:
+    _init_worker(threading.Barrier(2))
+    _run_and_wait(record_pid, [str(tmp_path)], 0.01)
+    assert os.listdir(str(tmp_path)) == [str(os.getpid())]
+
+
+def test_run_without_start() -> None:
+    pool = InferencePool(workers=0, max_pending=1)
+    assert asyncio.run(pool.run(pow, 2, 3)) == 8
@@ -0,0 +1,275 @@
+"""Unittests for the job store"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pytest
+from pymongo import ASCENDING, ReturnDocument, UpdateOne  # type: ignore
+
+from nlp_land_prediction_endpoint.utils import job_store
+from nlp_land_prediction_endpoint.utils.job_store import (
+    SAMPLE_CHUNK,
+    JobStore,
+    MongoJobStore,
+    SQLiteJobStore,
+    open_store,
+)
+
+
+def matches(document: dict, query: dict) -> bool:
+    """Evaluate the subset of Mongo queries the store uses
+
+    Arguments:
+        document (dict): a stored document
+        query (dict): equality conditions, {"$lt": value} and "$or"
+
+    Returns:
+        bool: whether the document matches the query
+    """
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, alternative) for alternative in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not (field in document and document[field] < condition["$lt"]):
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+def project(document: dict, projection: Optional[dict]) -> dict:
+    """Apply a projection that excludes _id or includes single fields
+
+    Arguments:
+        document (dict): a stored document
+        projection (Optional[dict]): the projection
+
+    Returns:
+        dict: a copy of the projected document
+    """
+    included = [field for field, keep in (projection or {}).items() if keep]
+    if included:
+        return {field: document[field] for field in included if field in document}
+    return {field: value for field, value in document.items() if field != "_id"}
+
+
+class FakeCursor:
+    """Sorts, skips and limits the documents of a find"""
+
+    def __init__(self, documents: List[dict], projection: Optional[dict] = None) -> None:
+        self.documents = documents
+        self.projection = projection
+
+    def sort(self, keys: List[tuple]) -> "FakeCursor":
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda doc: doc[field], reverse=direction != ASCENDING)
+        return self
+
+    def skip(self, offset: int) -> "FakeCursor":
+        self.documents = self.documents[offset:]
+        return self
+
+    def limit(self, limit: int) -> "FakeCursor":
+        self.documents = self.documents[: limit or None]
+        return self
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        for document in self.documents:
+            yield project(document, self.projection)
+
+
+class FakeCollection:
+    """In-memory collection with the coroutines of motor that the store uses"""
+
+    def __init__(self) -> None:
+        self.documents: Dict[Any, dict] = {}
+        self.indexes: List[Any] = []
+
+    async def create_index(self, keys: List[tuple], **kwargs: Any) -> None:
+        self.indexes.append(keys)
+
+    async def insert_one(self, document: dict) -> None:
+        self.documents[document.get("_id", len(self.documents))] = dict(document)
+
+    async def insert_many(self, documents: List[dict]) -> None:
+        for document in documents:
+            await self.insert_one(document)
+
+    def _matching(self, query: dict) -> List[dict]:
+        return [doc for doc in self.documents.values() if matches(doc, query)]
+
+    async def find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        found = self._matching(query)
+        return project(found[0], projection) if found else None
+
+    def find(self, query: dict, projection: Optional[dict] = None) -> FakeCursor:
+        return FakeCursor(self._matching(query), projection)
+
+    async def find_one_and_update(
+        self,
+        query: dict,
+        update: dict,
+        projection: Optional[dict] = None,
+        sort: Optional[List[tuple]] = None,
+        return_document: bool = ReturnDocument.BEFORE,
+    ) -> Optional[dict]:
+        found = FakeCursor(self._matching(query)).sort(sort or []).documents
+        if not found:
+            return None
+        found[0].update(update["$set"])
+        return project(found[0], projection)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False) -> None:
+        found = self._matching(query)
+        if found:
+            found[0].update(update["$set"])
+        elif upsert:
+            await self.insert_one({**query, **update["$set"]})
+
+    async def delete_many(self, query: dict) -> None:
+        for key in [key for key, doc in self.documents.items() if matches(doc, query)]:
+            del self.documents[key]
+
+    async def bulk_write(self, requests: List[UpdateOne], ordered: bool = True) -> None:
+        for request in requests:
+            await self.update_one(request._filter, request._doc, upsert=request._upsert)
+
+    async def count_documents(self, query: dict) -> int:
+        return len(self._matching(query))
+
+
+class FakeMotorClient:
+    """Stands in for AsyncIOMotorClient; databases and collections are created on access"""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.closed = False
+        self.databases: Dict[str, Dict[str, FakeCollection]] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        collections = self.databases.setdefault(name, {})
+
+        class Database:
+            def __getattr__(self, collection: str) -> FakeCollection:
+                return collections.setdefault(collection, FakeCollection())
+
+        return Database()
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def make_job(job_id: str, created_at: float) -> dict:
+    """Create a queued job
+
+    Arguments:
+        job_id (str): id of the job
+        created_at (float): submission time
+
+    Returns:
+        dict: the job
+    """
+    return {
+        "id": job_id,
+        "status": "queued",
+        "created_at": created_at,
+        "updated_at": created_at,
+        "processed": 0,
+    }
+
+
+def test_open_store() -> None:
+    assert isinstance(open_store("sqlite://:memory:"), SQLiteJobStore)
+    assert isinstance(open_store("mongodb://mongo:27017"), MongoJobStore)
+    with pytest.raises(ValueError):
+        open_store("redis://localhost")
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def store(request: Any, monkeypatch: Any) -> JobStore:
+    """Create an unconnected store of each backend
+
+    Arguments:
+        request (Any): selects the backend
+        monkeypatch (Any): replaces the Mongo client with an in-memory fake
+
+    Returns:
+        JobStore: the store
+    """
+    if request.param == "sqlite":
+        return SQLiteJobStore(":memory:")
+    monkeypatch.setattr(job_store, "AsyncIOMotorClient", FakeMotorClient)
+    return MongoJobStore("mongodb://mongo:27017")
+
+
+def test_interface_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        JobStore()  # type: ignore
+
+
+def test_claim_order_is_indexed(monkeypatch: Any) -> None:
+    monkeypatch.setattr(job_store, "AsyncIOMotorClient", FakeMotorClient)
+    store = MongoJobStore("mongodb://mongo:27017")
+    asyncio.run(store.open())
+    assert [("status", 1), ("created_at", 1)] in store._db.jobs.indexes
+
+
+def test_jobs_and_chunks(store: JobStore) -> None:
+    async def run() -> None:
+        await store.open()
+        chunks = [
+            {"index": 0, "ids": ["a"], "texts": ["x"]},
+            {"index": SAMPLE_CHUNK, "ids": [], "texts": ["x"]},
+        ]
+        await store.create(make_job("new", 2.0), chunks)
+        await store.create(make_job("old", 1.0), [])
+        assert await store.get("missing") is None
+        assert (await store.get("new"))["status"] == "queued"
+        assert (await store.chunk("new", 0))["ids"] == ["a"]
+        assert (await store.chunk("new", SAMPLE_CHUNK))["texts"] == ["x"]
+
+        claimed = await store.claim(stale_before=0)
+        assert claimed is not None and claimed["id"] == "old"
+        assert claimed["status"] == "running"
+        assert (await store.claim(stale_before=0))["id"] == "new"
+        assert await store.claim(stale_before=0) is None
+        # a running job without progress is taken over
+        assert (await store.claim(stale_before=time.time() + 1))["id"] == "old"
+
+        await store.update("new", {"processed": 1})
+        assert (await store.get("new"))["processed"] == 1
+        await store.update("missing", {"processed": 1})
+        assert await store.get("missing") is None
+        await store.drop_chunks("new")
+        assert await store.chunk("new", 0) is None
+        await store.close()
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_results_are_paged_by_weight(store: JobStore) -> None:
+    async def run() -> None:
+        await store.open()
+        await store.add_results(
+            "job",
+            [
+                {"paper_id": "a", "topic": 0, "weight": 0.1},
+                {"paper_id": "b", "topic": 0, "weight": 0.9},
+                {"paper_id": "c", "topic": 1, "weight": 0.5},
+                {"paper_id": "d", "topic": 0, "weight": 0.5},
+            ],
+        )
+        # reprocessing a paper replaces its result
+        await store.add_results("job", [{"paper_id": "c", "topic": 0, "weight": 0.7}])
+        assert await store.paper_ids("job", 0) == ["b", "c", "d", "a"]
+        assert await store.paper_ids("job", 0, offset=1, limit=2) == ["c", "d"]
+        assert await store.paper_ids("job", 1) == []
+        assert await store.paper_ids("job", 0, limit=0) == []
+        await store.add_results("job", [])
+        assert await store.count("job", 0) == 4
+        assert await store.count("other", 0) == 0
+        await store.close()
+
+    asyncio.run(run())
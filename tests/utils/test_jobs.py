@@ -0,0 +1,205 @@
+"""Unittests for the background topic jobs"""
+import asyncio
+import time
+from typing import Any, List
+
+import numpy as np
+
+from nlp_land_prediction_endpoint.utils import jobs
+from nlp_land_prediction_endpoint.utils.inference_pool import InferencePool
+from nlp_land_prediction_endpoint.utils.job_store import SAMPLE_CHUNK, SQLiteJobStore
+from nlp_land_prediction_endpoint.utils.jobs import (
+    JobRunner,
+    dominant_topics,
+    make_job,
+    score_chunk,
+)
+from nlp_land_prediction_endpoint.utils.paper_records import PaperRecord
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+TEXTS = [
+    "neural translation attention encoder decoder",
+    "attention encoder translation transformer",
+    "parsing grammar syntax treebank",
+    "syntax treebank dependency parsing",
+    "translation decoder attention",
+]
+
+
+def make_papers() -> List[PaperRecord]:
+    """Create a small corpus with two themes
+
+    Returns:
+        List[PaperRecord]: the papers
+    """
+    return [PaperRecord(str(i), "", text, "hash") for i, text in enumerate(TEXTS)]
+
+
+def test_make_job_chunks_and_sample() -> None:
+    job, chunks = make_job(make_papers(), "a@nlp.de", None, chunk_size=2, sample_size=3)
+    assert job["status"] == "queued" and job["owner"] == "a@nlp.de"
+    assert job["total"] == 5 and job["chunks"] == 3
+    assert [chunk["index"] for chunk in chunks] == [0, 1, 2, SAMPLE_CHUNK, SAMPLE_CHUNK - 1]
+    assert [chunk["ids"] for chunk in chunks[:3]] == [["0", "1"], ["2", "3"], ["4"]]
+    assert job["sample_chunks"] == 2
+    assert [len(chunk["texts"]) for chunk in chunks[3:]] == [2, 1]
+
+    job, chunks = make_job(make_papers(), "a@nlp.de", "models/acl/1", chunk_size=2)
+    assert job["model"] == "models/acl/1" and job["sample_chunks"] == 0
+    assert SAMPLE_CHUNK not in [chunk["index"] for chunk in chunks]
+
+
+def test_dominant_topics_skip_papers_without_weight() -> None:
+    weights = np.array([[0.1, 0.3], [0.0, 0.0], [0.4, 0.2]])
+    assert dominant_topics(["a", "b", "c"], weights) == [
+        {"paper_id": "a", "topic": 1, "weight": 0.3},
+        {"paper_id": "c", "topic": 0, "weight": 0.4},
+    ]
+    assert dominant_topics([], np.empty((0, 0))) == []
+
+
+def test_runner_processes_all_chunks(monkeypatch: Any) -> None:
+    store = SQLiteJobStore(":memory:")
+    runner = JobRunner(store, InferencePool(workers=0))
+    fit_engine = jobs.fit_engine
+    sampled: List[str] = []
+
+    def spy_fit(texts: List[str]) -> TopicEngine:
+        """Record the sample the topics are learned from
+
+        Args:
+            texts (List[str]): the sampled texts.
+
+        Returns:
+            TopicEngine: the fitted engine.
+        """
+        sampled.extend(texts)
+        return fit_engine(texts)
+
+    async def run() -> None:
+        await runner.pool.start()
+        await store.open()
+        job, chunks = make_job(make_papers(), "a@nlp.de", None, chunk_size=2)
+        await store.create(job, chunks)
+        monkeypatch.setattr(jobs, "fit_engine", spy_fit)
+        assert await runner.run_once()
+        # the sample is read back from all of its pieces
+        assert job["sample_chunks"] == 3 and [text.strip() for text in sampled] == TEXTS
+        assert not await runner.run_once()
+        done = await store.get(job["id"])
+        assert done["status"] == "done"
+        assert done["processed"] == 5 and done["next_chunk"] == 3
+        assert len(done["topics"]) == len(done["weights"]) > 0
+        papers = [
+            paper_id
+            for topic in range(len(done["topics"]))
+            for paper_id in await store.paper_ids(job["id"], topic)
+        ]
+        assert sorted(papers) == ["0", "1", "2", "3", "4"]
+        assert await store.chunk(job["id"], 0) is None
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_runner_records_failures(monkeypatch: Any) -> None:
+    store = SQLiteJobStore(":memory:")
+    runner = JobRunner(store, InferencePool(workers=0))
+
+    async def fail(*args: Any, **kwargs: Any) -> None:
+        raise RuntimeError("out of memory")
+
+    async def run() -> None:
+        await runner.pool.start()
+        await store.open()
+        job, chunks = make_job(make_papers(), "a@nlp.de", None)
+        await store.create(job, chunks)
+        monkeypatch.setattr(runner.pool, "run", fail)
+        assert await runner.run_once()
+        failed = await store.get(job["id"])
+        assert failed["status"] == "failed" and failed["error"] == "out of memory"
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_score_chunk_with_stored_model(tmp_path: Any) -> None:
+    engine = TopicEngine()
+    engine.fit_transform(TEXTS)
+    path = str(tmp_path / "model")
+    engine.save(path)
+    weights = score_chunk(TEXTS[:2], path, None)
+    assert weights.shape == (2, engine.components_.shape[0])
+
+
+def test_heartbeat_keeps_a_long_fit_claimed(monkeypatch: Any) -> None:
+    store = SQLiteJobStore(":memory:")
+    runner = JobRunner(store, InferencePool(workers=0), stale_seconds=0.2, heartbeat_seconds=0.05)
+    fit_engine = jobs.fit_engine
+
+    def slow_fit(texts: List[str]) -> TopicEngine:
+        """Fit for longer than a job may go without progress
+
+        Args:
+            texts (List[str]): the sampled texts.
+
+        Returns:
+            TopicEngine: the fitted engine.
+        """
+        time.sleep(0.5)
+        return fit_engine(texts)
+
+    async def run() -> None:
+        await runner.pool.start()
+        await store.open()
+        job, chunks = make_job(make_papers(), "a@nlp.de", None)
+        await store.create(job, chunks)
+        monkeypatch.setattr(jobs, "fit_engine", slow_fit)
+        processing = asyncio.ensure_future(runner.run_once())
+        await asyncio.sleep(0.35)
+        assert await store.claim(time.time() - runner.stale_seconds) is None
+        assert await processing
+        assert (await store.get(job["id"]))["status"] == "done"
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_heartbeat_survives_store_errors(monkeypatch: Any) -> None:
+    store = SQLiteJobStore(":memory:")
+    runner = JobRunner(store, InferencePool(workers=0), heartbeat_seconds=0)
+    calls = []
+
+    async def fail(*args: Any) -> None:
+        calls.append(args)
+        raise ConnectionError("store is down")
+
+    async def run() -> None:
+        monkeypatch.setattr(store, "update", fail)
+        heartbeat = asyncio.ensure_future(runner._heartbeat("job"))
+        while len(calls) < 2:
+            await asyncio.sleep(0)
+        heartbeat.cancel()
+
+    asyncio.run(run())
+    assert calls[:2] == [("job", {}), ("job", {})]
+
+
+def test_runner_keeps_polling_after_errors(monkeypatch: Any) -> None:
+    store = SQLiteJobStore(":memory:")
+    runner = JobRunner(store, InferencePool(workers=0), poll_seconds=0)
+    claims = []
+
+    async def fail(stale_before: float) -> None:
+        claims.append(stale_before)
+        raise ConnectionError("store is down")
+
+    async def run() -> None:
+        await runner.start()
+        monkeypatch.setattr(store, "claim", fail)
+        while len(claims) < 2:
+            await asyncio.sleep(0)
+        await runner.stop()
+
+    asyncio.run(run())
+    assert len(claims) >= 2
@@ -0,0 +1,68 @@
+"""Unittests for the login cache"""
+import asyncio
+from typing import List, Optional
+
+from nlp_land_prediction_endpoint.models.model_user import UserModel
+from nlp_land_prediction_endpoint.models.model_user_login import UserLoginModel
+from nlp_land_prediction_endpoint.utils.login_cache import Authenticator, LoginCache
+
+
+def make_backend(calls: List[str]) -> Authenticator:
+    """Create a fake backend that accepts the password "12345"
+
+    Arguments:
+        calls (List[str]): receives the email of every backend call
+
+    Returns:
+        Authenticator: the fake backend call
+    """
+
+    async def authenticate(login: UserLoginModel) -> Optional[UserModel]:
+        calls.append(login.email)
+        await asyncio.sleep(0.01)
+        if login.password != "12345":
+            return None
+        return UserModel(email=login.email)
+
+    return authenticate
+
+
+def test_caches_successful_logins_only() -> None:
+    calls: List[str] = []
+    cache = LoginCache(max_size=8, ttl=60)
+    valid = UserLoginModel(email="a@nlp.de", password="12345")
+    invalid = UserLoginModel(email="a@nlp.de", password="wrong")
+
+    async def run() -> None:
+        assert await cache.authenticate(valid, make_backend(calls)) is not None
+        assert await cache.authenticate(valid, make_backend(calls)) is not None
+        assert await cache.authenticate(invalid, make_backend(calls)) is None
+        assert await cache.authenticate(invalid, make_backend(calls)) is None
+
+    asyncio.run(run())
+    assert calls == ["a@nlp.de"] * 3
+    assert cache.stats()["size"] == 1
+
+
+def test_key_never_contains_password() -> None:
+    cache = LoginCache(max_size=8, ttl=60)
+    email, digest = cache.key(UserLoginModel(email="a@nlp.de", password="12345"))
+    assert email == "a@nlp.de"
+    assert b"12345" not in digest
+    other = LoginCache(max_size=8, ttl=60)
+    assert other.key(UserLoginModel(email="a@nlp.de", password="12345"))[1] != digest
+
+
+def test_concurrent_logins_share_backend_call() -> None:
+    calls: List[str] = []
+    cache = LoginCache(max_size=8, ttl=0)
+    login = UserLoginModel(email="a@nlp.de", password="12345")
+
+    async def run() -> List[Optional[UserModel]]:
+        backend = make_backend(calls)
+        return await asyncio.gather(*(cache.authenticate(login, backend) for _ in range(5)))
+
+    users = asyncio.run(run())
+    assert calls == ["a@nlp.de"]
+    assert all(user is not None and user.email == "a@nlp.de" for user in users)
+    assert cache.stats()["size"] == 0
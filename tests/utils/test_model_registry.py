@@ -0,0 +1,115 @@
+"""Unittests for the topic model registry"""
+import json
+import os
+from typing import Any, List, Optional
+
+import pytest
+
+from nlp_land_prediction_endpoint.utils import topic_engine
+from nlp_land_prediction_endpoint.utils.model_registry import (
+    ModelNotFoundError,
+    ModelRegistry,
+    warm,
+)
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+
+@pytest.fixture
+def engine() -> TopicEngine:
+    """Create a fitted engine.
+
+    Returns:
+        TopicEngine: An engine with two topics.
+    """
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(
+        ["attention translation encoder", "parsing syntax treebank", "translation decoder"]
+    )
+    return engine
+
+
+def test_register_and_activate(tmp_path: Any, engine: TopicEngine) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.list_models() == {}
+    assert registry.refresh() is None
+    assert ModelRegistry(str(tmp_path / "missing")).list_models() == {}
+    version = registry.register("acl", engine)
+    assert registry.register("acl", engine) == version
+    assert registry.list_models() == {"acl": [version]}
+    active = registry.activate("acl", version)
+    assert registry.active == active
+    assert active.engine.version == version
+
+
+def test_sibling_follows_switch(tmp_path: Any, engine: TopicEngine) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    sibling = ModelRegistry(str(tmp_path))
+    version = registry.register("acl", engine)
+    registry.activate("acl", version)
+    assert sibling.active is None
+    active = sibling.refresh()
+    assert active is not None and (active.name, active.version) == ("acl", version)
+    assert sibling.refresh() is active
+
+
+def test_unknown_model(tmp_path: Any) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    with pytest.raises(ModelNotFoundError):
+        registry.activate("acl", "missing")
+
+
+def test_rollback_activates_parent(tmp_path: Any, engine: TopicEngine) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    with pytest.raises(ModelNotFoundError):
+        registry.rollback("acl")
+    base = registry.register("acl", engine)
+    engine.partial_fit(["new"], ["speech recognition acoustic"], ["digest"])
+    updated = registry.register("acl", engine)
+    assert registry.parent("acl", base) is None
+    assert registry.parent("acl", updated) == base
+    registry.activate("acl", updated)
+    assert registry.rollback("acl").version == base
+    with pytest.raises(ModelNotFoundError):
+        registry.rollback("acl")
+    with pytest.raises(ModelNotFoundError):
+        registry.parent("acl", "missing")
+
+
+def test_warmers_run_before_switch(tmp_path: Any, engine: TopicEngine) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    warmed: List[Optional[str]] = []
+
+    def failing(path: str) -> None:
+        raise RuntimeError("worker died")
+
+    registry.warmers.extend([lambda path: warmed.append(registry.active and path), failing])
+    version = registry.register("acl", engine)
+    active = registry.activate("acl", version)
+    assert warmed == [None]
+    assert list(topic_engine._engines) == [active.path]
+
+
+def test_switch_releases_previous_versions(tmp_path: Any, engine: TopicEngine) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    sibling = ModelRegistry(str(tmp_path))
+    base = registry.register("acl", engine)
+    engine.partial_fit(["new"], ["speech recognition acoustic"], ["digest"])
+    updated = registry.register("acl", engine)
+    registry.activate("acl", base)
+    sibling.refresh()
+    warm(registry.path("acl", updated))
+    assert list(topic_engine._engines) == [registry.path("acl", updated)]
+    registry.activate("acl", updated)
+    registry.activate("acl", base)
+    assert sibling.refresh().version == base
+    assert list(topic_engine._engines) == [registry.path("acl", base)]
+
+
+def test_ignores_unregistered_pointer(tmp_path: Any) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    (tmp_path / "notes.txt").write_text("not a model")
+    with open(os.path.join(str(tmp_path), "ACTIVE.json"), "w") as fp:
+        json.dump({"name": "acl", "version": "missing"}, fp)
+    assert registry.list_models() == {}
+    assert registry.refresh() is None
+    assert ModelRegistry(str(tmp_path / "missing")).list_models() == {}
@@ -0,0 +1,51 @@
+"""Unittests for the NDJSON pipeline"""
+import asyncio
+from typing import AsyncIterator, List
+
+from starlette.background import BackgroundTask
+
+from nlp_land_prediction_endpoint.utils.ndjson import (
+    NDJSONStreamingResponse,
+    iter_chunks,
+    iter_lines,
+)
+
+
+async def stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    """Yield the chunks of a request body
+
+    Args:
+        chunks (bytes): the chunks.
+
+    Yields:
+        bytes: the next chunk.
+    """
+    for chunk in chunks:
+        yield chunk
+
+
+def test_lines_and_chunks() -> None:
+    async def run() -> List[List[bytes]]:
+        lines = iter_lines(stream(b'{"a"', b': 1}\n\n  \n{"b": 2}\n{"c"', b": 3}"))
+        return [chunk async for chunk in iter_chunks(lines, 2)]
+
+    assert asyncio.run(run()) == [[b'{"a": 1}', b'{"b": 2}'], [b'{"c": 3}']]
+
+
+def test_response_runs_background_task() -> None:
+    messages: List[dict] = []
+    done: List[bool] = []
+
+    async def receive() -> dict:
+        raise AssertionError("the response must not listen for disconnects")
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    response = NDJSONStreamingResponse(
+        stream(b"1\n", b"2\n"), background=BackgroundTask(lambda: done.append(True))
+    )
+    asyncio.run(response({"type": "http"}, receive, send))
+    assert messages[0]["headers"] == [(b"content-type", b"application/x-ndjson")]
+    assert [message.get("body") for message in messages[1:]] == [b"1\n", b"2\n", b""]
+    assert done == [True]
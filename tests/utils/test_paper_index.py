@@ -0,0 +1,154 @@
+"""Unittests for the paper index"""
+import asyncio
+import errno
+import os
+from typing import Any, List
+
+import numpy as np
+import pytest
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.utils import paper_index
+from nlp_land_prediction_endpoint.utils.model_registry import ActiveModel, ModelRegistry
+from nlp_land_prediction_endpoint.utils.paper_index import PaperIndex, PaperListener
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+
+class Recorder(PaperListener):
+    """Records the calls of the index"""
+
+    def __init__(self) -> None:
+        """Creates an empty record"""
+        self.calls: List[tuple] = []
+
+    def reset(self, n_topics: int) -> None:
+        """Records a reset
+
+        Arguments:
+            n_topics (int): number of topics of the model
+        """
+        self.calls.append(("reset", n_topics))
+
+    def remove(self, rows: np.ndarray, weights: np.ndarray) -> None:
+        """Records removed rows
+
+        Arguments:
+            rows (np.ndarray): the rows
+            weights (np.ndarray): their previous topic weights
+        """
+        self.calls.append(("remove", rows.tolist()))
+
+    def add(self, rows: np.ndarray, papers: List[dict], weights: np.ndarray) -> None:
+        """Records added rows
+
+        Arguments:
+            rows (np.ndarray): the rows
+            papers (List[dict]): the papers of the rows
+            weights (np.ndarray): their topic weights
+        """
+        self.calls.append(("add", rows.tolist()))
+
+
+@pytest.fixture
+def model(tmp_path: Any) -> ActiveModel:
+    """Activate a model with two topics.
+
+    Returns:
+        ActiveModel: The active model.
+    """
+    registry = ModelRegistry(str(tmp_path / "models"))
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(
+        ["attention translation encoder", "parsing syntax treebank", "translation decoder"]
+    )
+    return registry.activate("acl", registry.register("acl", engine))
+
+
+def papers(*ids: str) -> List[dict]:
+    example = PaperModel.Config.schema_extra.get("example", {})
+    return [{**example, "id": paper_id} for paper_id in ids]
+
+
+def test_append_and_refresh(tmp_path: Any, model: ActiveModel) -> None:
+    recorder = Recorder()
+    index = PaperIndex([recorder], root=str(tmp_path / "papers"))
+    sibling = PaperIndex(root=str(tmp_path / "papers"))
+    assert index.append(model, papers("a", "b"), np.array([[1.0, 0.0], [0.0, 1.0]])) == 0
+    assert index.append(model, papers("c"), np.array([[0.5, 0.5]])) == 1
+    assert asyncio.run(index.refresh(model)) == 3
+    assert asyncio.run(index.refresh(model)) == 0
+    assert asyncio.run(sibling.refresh(model)) == 3
+    assert index.ids == sibling.ids == ["a", "b", "c"]
+    np.testing.assert_array_equal(index.weights, sibling.weights)
+    assert recorder.calls == [("reset", 2), ("add", [0, 1]), ("add", [2])]
+
+
+def test_replaced_paper_keeps_row(tmp_path: Any, model: ActiveModel) -> None:
+    recorder = Recorder()
+    index = PaperIndex([recorder], root=str(tmp_path))
+    index.reset(model)
+    index.apply(papers("a", "b"), np.array([[1.0, 0.0], [0.0, 1.0]]))
+    index.apply(papers("b", "c", "b"), np.array([[0.0, 0.0], [0.5, 0.5], [1.0, 0.0]]))
+    assert index.ids == ["a", "b", "c"]
+    np.testing.assert_array_equal(index.weights, [[1.0, 0.0], [1.0, 0.0], [0.5, 0.5]])
+    assert recorder.calls[-2:] == [("remove", [1]), ("add", [2, 1])]
+
+
+def test_other_model_starts_over(tmp_path: Any, model: ActiveModel) -> None:
+    index = PaperIndex(root=str(tmp_path))
+    index.append(model, papers("a"), np.array([[1.0, 0.0]]))
+    asyncio.run(index.refresh(model))
+    other = ActiveModel(model.name, "other", model.path, model.engine)
+    assert asyncio.run(index.refresh(other)) == 0
+    assert index.ids == [] and index.model is other
+    assert asyncio.run(index.refresh(None)) == 0
+    assert index.model is None
+
+
+def test_topics_of_rows(tmp_path: Any, model: ActiveModel) -> None:
+    index = PaperIndex(root=str(tmp_path))
+    assert index.topics(np.array([], dtype=int)).topics == []
+    index.reset(model)
+    index.apply(papers("a", "b", "c"), np.array([[1.0, 0.0], [0.0, 1.0], [0.2, 0.8]]))
+    topics = index.topics(np.array([1, 2])).topics
+    assert len(topics) == 2
+    assert topics[0].score == pytest.approx(0.9)
+    assert sorted(topics[0].paper_ids) == ["b", "c"] and topics[1].paper_ids == []
+
+
+def test_listener_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        PaperListener()  # type: ignore
+
+
+def test_append_skips_sequence_numbers_taken_meanwhile(
+    tmp_path: Any, model: ActiveModel, monkeypatch: Any
+) -> None:
+    index = PaperIndex(root=str(tmp_path))
+    index.append(model, papers("a"), np.array([[1.0, 0.0]]))
+    # another worker linked segment 0 after this one listed the directory
+    monkeypatch.setattr(paper_index.os, "listdir", lambda directory: [])
+    assert index.append(model, papers("b"), np.array([[0.0, 1.0]])) == 1
+
+    def fail(src: str, dst: str) -> None:
+        raise OSError(errno.EACCES, "permission denied")
+
+    monkeypatch.setattr(paper_index.os, "link", fail)
+    with pytest.raises(PermissionError):
+        index.append(model, papers("c"), np.array([[0.0, 1.0]]))
+    monkeypatch.undo()
+    assert sorted(os.listdir(index.directory(model))) == ["00000000.json", "00000001.json"]
+
+
+def test_concurrent_refresh_applies_segments_once(tmp_path: Any, model: ActiveModel) -> None:
+    recorder = Recorder()
+    index = PaperIndex([recorder], root=str(tmp_path))
+    index.append(model, papers("a", "b"), np.array([[1.0, 0.0], [0.0, 1.0]]))
+
+    async def refresh_twice() -> List[int]:
+        return list(await asyncio.gather(index.refresh(model), index.refresh(model)))
+
+    assert sorted(asyncio.run(refresh_twice())) == [0, 2]
+    assert index.ids == ["a", "b"]
+    index.apply([], np.empty((0, 2)))
+    assert recorder.calls == [("reset", 2), ("add", [0, 1])]
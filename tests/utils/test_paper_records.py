@@ -0,0 +1,37 @@
+"""Unittests for the compact paper records"""
+import json
+
+import pytest
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.utils.paper_records import RecordError, parse_records
+from nlp_land_prediction_endpoint.utils.topic_cache import corpus_key
+from nlp_land_prediction_endpoint.utils.topic_engine import paper_text
+
+
+def test_records_match_models() -> None:
+    example = PaperModel.Config.schema_extra.get("example", {})
+    paper = PaperModel(**example)
+    (record,) = parse_records(json.dumps([example]).encode())
+    assert paper_text(record) == paper_text(paper)
+    assert corpus_key([record], "v") == corpus_key([paper], "v")
+    assert not hasattr(record, "__dict__")
+
+
+def test_invalid_records() -> None:
+    with pytest.raises(RecordError) as e:
+        parse_records(b'{"id": "1"}')
+    assert e.value.errors[0]["type"] == "type_error.list"
+    with pytest.raises(RecordError) as e:
+        parse_records(b"[1, 2")
+    assert e.value.errors[0]["type"] == "value_error.jsondecode"
+    with pytest.raises(RecordError) as e:
+        parse_records(b'[{"id": 1, "title": "", "abstractText": ""}, "paper"]')
+    assert [error["loc"] for error in e.value.errors] == [
+        ["body", 0, "id"],
+        ["body", 0, "preProcessingGitHash"],
+        ["body", 1, "id"],
+        ["body", 1, "title"],
+        ["body", 1, "abstractText"],
+        ["body", 1, "preProcessingGitHash"],
+    ]
@@ -0,0 +1,32 @@
+"""Unittests for the author and venue profiles"""
+import numpy as np
+
+from nlp_land_prediction_endpoint.enums.enum_profile import ProfileKind
+from nlp_land_prediction_endpoint.utils.profile_index import ProfileIndex
+
+
+def test_profiles_follow_papers() -> None:
+    index = ProfileIndex()
+    index.reset(2)
+    papers = [
+        {"authors": ["a", "b"], "firstAuthor": "a", "venues": ["acl"]},
+        {"authors": ["b", "b"], "firstAuthor": "b", "venues": ["acl", "emnlp"]},
+    ]
+    index.add(np.array([0, 1]), papers, np.array([[1.0, 0.0], [0.25, 0.75]]))
+    profile = index.profile(ProfileKind.AUTHOR, "b")
+    assert profile is not None and list(profile.rows) == [0, 1]
+    np.testing.assert_allclose(profile.weights, [1.25, 0.75])
+    first = index.profile(ProfileKind.FIRST_AUTHOR, "a")
+    assert first is not None and list(first.rows) == [0]
+    assert index.profile(ProfileKind.FIRST_AUTHOR, "c") is None
+    assert index.profile(ProfileKind.VENUE, "a") is None
+
+    index.remove(np.array([0]), np.array([[1.0, 0.0]]))
+    index.add(np.array([0]), [{**papers[0], "authors": ["c"]}], np.array([[0.0, 1.0]]))
+    assert index.profile(ProfileKind.AUTHOR, "a") is None
+    profile = index.profile(ProfileKind.AUTHOR, "b")
+    assert profile is not None and list(profile.rows) == [1]
+    np.testing.assert_allclose(profile.weights, [0.25, 0.75])
+    venue = index.profile(ProfileKind.VENUE, "acl")
+    assert venue is not None
+    np.testing.assert_allclose(venue.weights, [0.25, 1.75])
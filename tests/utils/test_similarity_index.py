@@ -0,0 +1,191 @@
+"""Unittests for the similar papers index"""
+import asyncio
+import threading
+from typing import Any, List
+
+import numpy as np
+import pytest
+
+from nlp_land_prediction_endpoint.utils import similarity_index
+from nlp_land_prediction_endpoint.utils.model_registry import ActiveModel, ModelRegistry
+from nlp_land_prediction_endpoint.utils.paper_index import PaperIndex
+from nlp_land_prediction_endpoint.utils.similarity_index import SimilarityIndex, embed
+from nlp_land_prediction_endpoint.utils.topic_engine import TopicEngine
+
+WORDS = [
+    ["attention", "translation", "encoder", "decoder", "transformer", "bleu"],
+    ["parsing", "syntax", "treebank", "grammar", "dependency", "constituency"],
+    ["sentiment", "review", "polarity", "opinion", "aspect", "emotion"],
+]
+
+
+def corpus(n_papers: int, seed: int = 0) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": str(i),
+            "title": "",
+            "abstractText": " ".join(rng.choice(WORDS[i % len(WORDS)], 4).tolist()),
+        }
+        for i in range(n_papers)
+    ]
+
+
+@pytest.fixture
+def model(tmp_path: Any) -> ActiveModel:
+    """Activate a model fitted on the corpus.
+
+    Returns:
+        ActiveModel: The active model.
+    """
+    registry = ModelRegistry(str(tmp_path / "models"))
+    engine = TopicEngine(n_topics=3)
+    engine.fit_transform([paper["abstractText"] for paper in corpus(30)])
+    return registry.activate("acl", registry.register("acl", engine))
+
+
+def index_papers(model: ActiveModel, root: str, papers: List[dict]) -> SimilarityIndex:
+    index = PaperIndex(root=root)
+    similar = SimilarityIndex(index, dim=32, probes=2, min_train=20, tail=8)
+    index.listeners.append(similar)
+    index.reset(model)
+    index.apply(papers, np.zeros((len(papers), 3)))
+    asyncio.run(similar.flush())
+    return similar
+
+
+def test_search_matches_exact(tmp_path: Any, model: ActiveModel) -> None:
+    similar = index_papers(model, str(tmp_path), corpus(90))
+    assert similar.trained_n == 90 and similar.tail == []
+    query = embed(model.engine, ["parsing treebank syntax"], 32)[0]
+    found = similar.search(query, 5)
+    assert similar.trained_n == 90 and len(similar.centroids) == 9
+    assert found.candidates < 90
+    exact = similar.exact(query, 5)
+    assert found.rows.tolist() == exact.rows.tolist()
+    assert all(row % 3 == 1 for row in found.rows.tolist())
+    assert np.all(np.diff(found.scores) <= 0)
+    assert 0 not in similar.search(similar.vectors[0], 5, exclude=0).rows.tolist()
+
+
+def test_changed_papers_are_found(tmp_path: Any, model: ActiveModel) -> None:
+    similar = index_papers(model, str(tmp_path), corpus(90))
+    changed = {"id": "0", "title": "", "abstractText": "sentiment review polarity"}
+    similar.papers.apply([changed], np.zeros((1, 3)))
+    # the paper is embedded by flush, not while it is applied
+    assert similar.tail == [] and len(similar.pending) == 1
+    before = similar.capture()
+    vector = before.vectors[0].copy()
+    asyncio.run(similar.flush())
+    assert similar.tail == [0] and similar.pending == []
+    query = embed(model.engine, ["sentiment review polarity"], 32)[0]
+    assert similar.search(query, 1).rows.tolist() == [0]
+    # a search captured before the flush still sees the previous index
+    np.testing.assert_array_equal(before.vectors[0], vector)
+    assert len(before.tail) == 0 and before.search(query, 1).rows.tolist() != [0]
+
+
+def test_snapshot_is_mapped(tmp_path: Any, model: ActiveModel) -> None:
+    papers = corpus(60)
+    similar = index_papers(model, str(tmp_path), papers)
+    path = similar.save()
+    assert path is not None and path.endswith("similar-0000000060")
+
+    loaded = index_papers(model, str(tmp_path), papers[:30])
+    assert loaded.saved_n == 60 and loaded.trained_n == 60
+    assert not loaded.vectors.flags.writeable
+    np.testing.assert_array_equal(loaded.vectors, similar.vectors[:60])
+    loaded.papers.apply([{**papers[0], "abstractText": "grammar"}], np.zeros((1, 3)))
+    asyncio.run(loaded.flush())
+    assert loaded.vectors.flags.writeable and loaded.tail == [0]
+    loaded.n += 1
+    assert loaded.save() is not None
+    assert [name for name in sorted(tmp_path.glob("acl/*/similar-*"))][-1].name.endswith("61")
+    assert len(list(tmp_path.glob("acl/*/similar-*"))) == 1
+
+
+def test_full_tail_is_merged(tmp_path: Any, model: ActiveModel) -> None:
+    similar = index_papers(model, str(tmp_path), corpus(90))
+    order = similar.order
+    changed = [{**paper, "abstractText": "sentiment review"} for paper in corpus(9)]
+    similar.papers.apply(changed, np.zeros((9, 3)))
+    asyncio.run(similar.flush())
+    assert similar.tail == [] and similar.order is not order
+    assert similar.lists[:9].tolist() == similar.lists[2:3].tolist() * 9
+
+    small = index_papers(model, str(tmp_path / "small"), corpus(6))
+    assert small.trained_n == 0 and small.tail == list(range(6))
+    small.papers.apply(corpus(6, seed=1), np.zeros((6, 3)))
+    asyncio.run(small.flush())
+    assert small.tail == []
+    assert small.search(small.vectors[0], 3).candidates == 6
+
+
+@pytest.mark.parametrize("step", ["embed", "train_centroids", "sort_lists"])
+def test_reset_drops_running_flush(
+    tmp_path: Any, model: ActiveModel, monkeypatch: Any, step: str
+) -> None:
+    index = PaperIndex(root=str(tmp_path))
+    similar = SimilarityIndex(index, dim=32, min_train=10)
+    index.listeners.append(similar)
+    index.reset(model)
+    entered, release = threading.Event(), threading.Event()
+    run_step = getattr(similarity_index, step)
+
+    def blocked(*args: Any) -> Any:
+        """Wait in the executor until the index was reset
+
+        Args:
+            args (Any): the arguments of the step.
+
+        Returns:
+            Any: the result of the step.
+        """
+        entered.set()
+        release.wait(10)
+        return run_step(*args)
+
+    monkeypatch.setattr(similarity_index, step, blocked)
+
+    async def flush_and_reset() -> None:
+        index.apply(corpus(10), np.zeros((10, 3)))
+        flushes = [asyncio.ensure_future(similar.flush()) for _ in range(2)]
+        while not entered.is_set():
+            await asyncio.sleep(0.001)
+        index.reset(model)
+        release.set()
+        await asyncio.gather(*flushes)
+
+    asyncio.run(flush_and_reset())
+    assert similar.n == 0 and similar.trained_n == 0 and similar.pending == []
+    assert len(similar.centroids) == 0
+
+
+def test_snapshot_races_and_damage(tmp_path: Any, model: ActiveModel, monkeypatch: Any) -> None:
+    papers = corpus(30)
+    similar = index_papers(model, str(tmp_path), papers)
+    assert similar.vector(0) is not None and similar.vector(30) is None
+    assert len(similar.exact(similar.vectors[0], 100).rows) == 30
+    similar.add(np.zeros(0, dtype=np.int64), [], np.zeros((0, 3)))
+    assert similar.pending == []
+    older = similar.save()
+    assert older is not None
+
+    # a damaged newer snapshot is skipped
+    (tmp_path / older).with_name("similar-0000000031").mkdir()
+    loaded = index_papers(model, str(tmp_path), [])
+    assert loaded.n == 30
+
+    def taken(src: str, dst: str) -> None:
+        raise OSError("directory not empty")
+
+    similar.n += 2
+    monkeypatch.setattr(similarity_index.os, "rename", taken)
+    # another worker stored the same snapshot meanwhile
+    assert similar.save() is not None and similar.saved_n == 32
+    monkeypatch.undo()
+    assert [path.name for path in tmp_path.glob("acl/*/*")] == []
+
+    empty = SimilarityIndex(PaperIndex(root=str(tmp_path)))
+    empty.add(np.arange(1), papers[:1], np.zeros((1, 3)))
+    assert empty.save() is None and empty.pending == []
@@ -0,0 +1,113 @@
+"""Unittests for the topic result cache"""
+import os
+import time
+from typing import Any
+
+import pytest
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils.topic_cache import TopicCache, corpus_key
+from nlp_land_prediction_endpoint.utils.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def dummy_paper() -> PaperModel:
+    """Create a dummy paper.
+
+    Returns:
+        PaperModel: The example paper.
+    """
+    return PaperModel(**PaperModel.Config.schema_extra["example"])
+
+
+@pytest.fixture
+def dummy_topics() -> TopicResponseModel:
+    """Create a dummy topic response.
+
+    Returns:
+        TopicResponseModel: The example response.
+    """
+    return TopicResponseModel(**TopicResponseModel.Config.schema_extra["example"])
+
+
+def test_corpus_key(dummy_paper: PaperModel) -> None:
+    key = corpus_key([dummy_paper], "v1")
+    assert key == corpus_key([dummy_paper.copy()], "v1")
+    assert key != corpus_key([dummy_paper.copy(update={"title": "other"})], "v1")
+    assert key != corpus_key([dummy_paper], "v2")
+    assert key != corpus_key([dummy_paper.copy(update={"preProcessingGitHash": "x"})], "v1")
+    assert key != corpus_key([dummy_paper, dummy_paper], "v1")
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch: Any) -> None:
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 2}
+    cache.pop("c")
+    cache.pop("missing")
+    assert len(cache) == 0
+
+
+def test_disk_tier_survives_restart(
+    tmp_path: Any, dummy_paper: PaperModel, dummy_topics: TopicResponseModel
+) -> None:
+    key = corpus_key([dummy_paper], "v1")
+    TopicCache(directory=str(tmp_path)).set(key, dummy_topics)
+    cache = TopicCache(directory=str(tmp_path))
+    assert cache.get(key) == dummy_topics
+    assert cache.get(key) == dummy_topics
+    assert cache.get("missing") is None
+    assert cache.stats() == {
+        "size": 1,
+        "hits": 2,
+        "misses": 1,
+        "disk_hits": 1,
+        "disk_bytes": len(dummy_topics.json()),
+    }
+
+
+def test_disk_tier_expiry(
+    tmp_path: Any, dummy_paper: PaperModel, dummy_topics: TopicResponseModel
+) -> None:
+    key = corpus_key([dummy_paper], "v1")
+    cache = TopicCache(directory=str(tmp_path))
+    cache.set(key, dummy_topics)
+    cache.memory.clear()
+    path = os.path.join(str(tmp_path), f"{key}.json")
+    os.utime(path, (0, 0))
+    assert cache.get(key) is None
+    assert not os.path.exists(path)
+
+
+def test_disk_tier_size_bound(
+    tmp_path: Any, dummy_paper: PaperModel, dummy_topics: TopicResponseModel
+) -> None:
+    size = len(dummy_topics.json())
+    cache = TopicCache(directory=str(tmp_path), max_bytes=3 * size)
+    keys = [corpus_key([dummy_paper], f"v{i}") for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.set(key, dummy_topics)
+        os.utime(cache._path(key), (time.time() - 10 + i, time.time() - 10 + i))
+    assert cache.disk_bytes <= 3 * size
+    remaining = sorted(os.listdir(str(tmp_path)))
+    assert len(remaining) == 2
+    assert f"{keys[0]}.json" not in remaining
+    assert f"{keys[3]}.json" in remaining
+
+
+def test_prune_deletes_expired_files(tmp_path: Any) -> None:
+    (tmp_path / "stale.tmp").write_text("x" * 10)
+    os.utime(str(tmp_path / "stale.tmp"), (0, 0))
+    (tmp_path / "fresh.json").write_text("x" * 10)
+    cache = TopicCache(directory=str(tmp_path))
+    assert os.listdir(str(tmp_path)) == ["fresh.json"]
+    assert cache.stats()["disk_bytes"] == 10
@@ -0,0 +1,216 @@
+"""Unittests for the topic engine"""
+import os
+from typing import Any, List
+
+import numpy as np
+import pytest
+
+from nlp_land_prediction_endpoint.utils import topic_engine
+from nlp_land_prediction_endpoint.utils.paper_records import PaperRecord
+from nlp_land_prediction_endpoint.utils.topic_engine import (
+    TopicEngine,
+    get_engine,
+    infer_many,
+    infer_topics,
+    paper_digest,
+    tokenize,
+)
+
+
+@pytest.fixture
+def corpus() -> List[str]:
+    """Create a corpus with two clearly separated themes.
+
+    Returns:
+        List[str]: the texts of the corpus
+    """
+    return [
+        "neural translation attention encoder decoder",
+        "attention encoder translation transformer",
+        "translation decoder neural transformer attention",
+        "parsing grammar syntax treebank",
+        "syntax treebank dependency parsing",
+        "grammar dependency syntax parsing treebank",
+    ]
+
+
+def test_tokenize_removes_stop_words() -> None:
+    assert tokenize("The Transformer is all you need, in 2017!") == ["transformer", "need"]
+
+
+def test_fit_separates_themes(corpus: List[str]) -> None:
+    engine = TopicEngine(n_topics=2)
+    weights = engine.fit_transform(corpus)
+    assert weights.shape == (6, 2)
+    dominant = weights.argmax(axis=1)
+    assert len(set(dominant[:3])) == 1
+    assert len(set(dominant[3:])) == 1
+    assert dominant[0] != dominant[3]
+
+
+def test_transform_matches_fit(corpus: List[str]) -> None:
+    engine = TopicEngine(n_topics=2)
+    dominant = engine.fit_transform(corpus).argmax(axis=1)
+    weights = engine.transform(["treebank parsing", "attention translation", "unknown words"])
+    assert weights[0].argmax() == dominant[3]
+    assert weights[1].argmax() == dominant[0]
+    assert np.all(weights[2] == 0)
+
+
+def test_max_features(corpus: List[str]) -> None:
+    engine = TopicEngine(n_topics=2, max_features=4)
+    engine.fit_transform(corpus)
+    assert len(engine.terms_) == 4
+    assert list(engine.terms_) == sorted(engine.terms_)
+
+
+def test_infer_topics(corpus: List[str]) -> None:
+    ids = [str(i) for i in range(len(corpus))]
+    response = infer_topics(ids, corpus)
+    assert sum(topic.score for topic in response.topics) == pytest.approx(1.0)
+    assigned = sorted(paper_id for topic in response.topics for paper_id in topic.paper_ids)
+    assert assigned == ids
+    assert all(topic.keywords for topic in response.topics)
+
+
+def test_infer_topics_empty() -> None:
+    assert infer_topics([], []).topics == []
+    assert infer_topics(["1"], ["the and of"]).topics == []
+
+
+def test_infer_many_fits_corpora_separately(corpus: List[str]) -> None:
+    ids = [str(i) for i in range(len(corpus))]
+    other = ["confidential secretword memo", "secretword confidential draft"]
+    coalesced = infer_many([(ids, corpus), (["x", "y"], other)])
+    assert coalesced[0] == infer_topics(ids, corpus)
+    assert coalesced[1] == infer_topics(["x", "y"], other)
+    keywords = {keyword for topic in coalesced[0].topics for keyword in topic.keywords}
+    assert not keywords & {"confidential", "secretword", "memo", "draft"}
+
+
+def test_save_and_load_memory_mapped(corpus: List[str], tmp_path: Any) -> None:
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(corpus)
+    path = str(tmp_path / "model")
+    version = engine.save(path)
+    loaded = get_engine(path)
+    assert loaded is get_engine(path)
+    assert loaded.version == version
+    assert isinstance(loaded.components_, np.memmap)
+    assert not loaded.components_.flags.writeable
+    texts = ["treebank parsing", "attention translation"]
+    np.testing.assert_allclose(loaded.transform(texts), engine.transform(texts))
+    with pytest.raises(FileExistsError):
+        engine.save(path)
+
+
+def test_save_loses_race_for_path(corpus: List[str], tmp_path: Any, monkeypatch: Any) -> None:
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(corpus)
+
+    def taken(src: str, dst: str) -> None:
+        raise OSError("directory not empty")
+
+    monkeypatch.setattr(topic_engine.os, "rename", taken)
+    with pytest.raises(FileExistsError):
+        engine.save(str(tmp_path / "model"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_topics_without_weight_are_omitted(corpus: List[str]) -> None:
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(corpus)
+    response = engine.topics(np.array([[0.0, 1.0], [0.0, 2.0]]), ["a", "b"])
+    assert [topic.keywords for topic in response.topics] == [engine.keywords(1)]
+    assert response.topics[0].paper_ids == ["b", "a"]
+
+
+def test_infer_topics_with_stored_model(corpus: List[str], tmp_path: Any) -> None:
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(corpus)
+    path = str(tmp_path / "model")
+    engine.save(path)
+    response = infer_topics(["a", "b"], ["treebank parsing syntax", "attention translation"], path)
+    assert len(response.topics) == 2
+    assert {topic.name for topic in response.topics} == {
+        ", ".join(engine.keywords(topic)[:3]) for topic in range(2)
+    }
+
+
+def test_paper_digest_ignores_title() -> None:
+    paper = PaperRecord("1", "A title", "An abstract", "abc")
+    assert paper_digest(paper) == paper_digest(PaperRecord("1", "Other", "An abstract", "abc"))
+    assert paper_digest(paper) != paper_digest(PaperRecord("1", "A title", "Changed", "abc"))
+    assert paper_digest(paper) != paper_digest(PaperRecord("1", "A title", "An abstract", "def"))
+
+
+def test_partial_fit_skips_unchanged_papers(corpus: List[str]) -> None:
+    ids = [str(i) for i in range(len(corpus))]
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(corpus, ids, ["d"] * len(corpus))
+    version = engine.fingerprint()
+    assert len(engine.partial_fit(ids, corpus, ["d"] * len(corpus))) == 0
+    assert engine.fingerprint() == version
+    assert engine.parent is None
+
+
+def test_partial_fit_updates_vocabulary(corpus: List[str]) -> None:
+    ids = [str(i) for i in range(len(corpus))]
+    engine = TopicEngine(n_topics=2)
+    dominant = engine.fit_transform(corpus, ids, ["d"] * len(corpus)).argmax(axis=1)
+    version = engine.fingerprint()
+    processed = engine.partial_fit(
+        ["0", "1", "new", "new"],
+        ["speech recognition", corpus[1], "acoustic speech", "acoustic speech recognition"],
+        ["changed", "d", "x", "y"],
+    )
+    # paper 1 is unchanged and the last version of "new" wins
+    assert processed.tolist() == [0, 3]
+    assert engine.parent == version
+    assert engine.n_docs_ == len(corpus) + 1
+    assert list(engine.terms_) == sorted(engine.terms_)
+    df = dict(zip(engine.terms_, engine.df_))
+    assert df["speech"] == 2 and df["acoustic"] == 1 and df["neural"] == 1
+    assert engine.papers_.tolist() == sorted(ids + ["new"])
+    assert engine.presence_.shape == (len(corpus) + 1, len(engine.terms_))
+    weights = engine.transform(["treebank parsing", "attention translation"])
+    assert weights[0].argmax() == dominant[3]
+    assert weights[1].argmax() == dominant[1]
+
+
+def test_partial_fit_of_stored_model(corpus: List[str], tmp_path: Any) -> None:
+    ids = [str(i) for i in range(len(corpus))]
+    engine = TopicEngine(n_topics=2, max_features=8)
+    engine.fit_transform(corpus, ids, ["d"] * len(corpus))
+    path = str(tmp_path / "model")
+    version = engine.save(path)
+    loaded = TopicEngine.load(path)
+    assert loaded._presence is None
+    assert loaded.presence_.shape == engine.presence_.shape
+    # the stored int32 indices are used in place
+    assert loaded.presence_.indices.dtype == np.int32
+    assert not loaded.presence_.indices.flags.owndata
+    assert len(loaded.partial_fit(["new"], ["speech acoustic recognition"], ["x"])) == 1
+    assert loaded.parent == version
+    assert len(loaded.terms_) == 8
+    assert loaded.df_.sum() == loaded.presence_.sum()
+    updated = loaded.save(str(tmp_path / "updated"))
+    assert TopicEngine.load(str(tmp_path / "updated")).parent == version != updated
+
+
+def test_load_presence_with_int64_indices(corpus: List[str], tmp_path: Any) -> None:
+    engine = TopicEngine(n_topics=2)
+    engine.fit_transform(corpus, [str(i) for i in range(len(corpus))], ["d"] * len(corpus))
+    path = str(tmp_path / "model")
+    engine.save(path)
+    for name in ("presence_indptr", "presence_indices"):
+        file = os.path.join(path, f"{name}.npy")
+        np.save(file, np.load(file).astype(np.int64))
+    loaded = TopicEngine.load(path)
+    assert (loaded.presence_ != engine.presence_).nnz == 0
+
+
+def test_partial_fit_needs_statistics(corpus: List[str], tmp_path: Any) -> None:
+    engine = TopicEngine(n_topics=2)
+    with pytest.raises(ValueError):
+        engine.partial_fit(["1"], ["parsing"], ["x"])
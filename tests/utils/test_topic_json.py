@@ -0,0 +1,38 @@
+"""Unittests for the JSON encoding of topic responses"""
+import json
+from typing import Any
+
+from nlp_land_prediction_endpoint.models.model_topic import TopicResponseModel
+from nlp_land_prediction_endpoint.utils import topic_json
+from nlp_land_prediction_endpoint.utils.topic_json import (
+    PaperIdsPage,
+    TopicJSONResponse,
+    encode_topics,
+    paper_ids_page,
+)
+
+
+def test_encode_matches_model() -> None:
+    topics = TopicResponseModel(**TopicResponseModel.Config.schema_extra["example"])
+    assert json.loads(encode_topics(topics)) == json.loads(topics.json(exclude_none=True))
+    assert TopicJSONResponse(encode_topics(topics)).body == encode_topics(topics)
+    assert TopicJSONResponse({"a": 1}).body == b'{"a":1}'
+
+
+def test_encode_page_of_paper_ids() -> None:
+    topics = TopicResponseModel(**TopicResponseModel.Config.schema_extra["example"])
+    (topic,) = json.loads(encode_topics(topics, PaperIdsPage(1, 5)))["topics"]
+    assert topic["paper_ids"] == ["5136bc054aed4daf9e2a1238"]
+    assert topic["paper_count"] == 2
+    (topic,) = json.loads(encode_topics(topics, PaperIdsPage(limit=0)))["topics"]
+    assert topic["paper_ids"] == []
+
+
+def test_page_is_capped(monkeypatch: Any) -> None:
+    monkeypatch.setattr(topic_json, "MAX_PAPER_IDS", 0)
+    assert paper_ids_page(0, None) == PaperIdsPage(0, None)
+    monkeypatch.setattr(topic_json, "MAX_PAPER_IDS", 2)
+    assert paper_ids_page(3, None) == PaperIdsPage(3, 2)
+    assert paper_ids_page(0, 5) == PaperIdsPage(0, 2)
+    assert paper_ids_page(0, 1) == PaperIdsPage(0, 1)
+    assert paper_ids_page(0, 0) == PaperIdsPage(0, 0)
@@ -0,0 +1,53 @@
+"""Unittests for the topic trend index"""
+import numpy as np
+import pytest
+
+from nlp_land_prediction_endpoint.enums.enum_trend import Granularity
+from nlp_land_prediction_endpoint.utils.trend_index import (
+    TrendIndex,
+    month_label,
+    parse_month,
+    parse_period,
+)
+
+
+def test_parse_periods() -> None:
+    assert month_label(parse_month("2021-03-14T10:00:00")) == "2021-03"
+    assert month_label(parse_period("2021")) == "2021-01"
+    assert month_label(parse_period("2021", end=True)) == "2021-12"
+    for value in ["2021-13", "March 2021", ""]:
+        with pytest.raises(ValueError):
+            parse_period(value)
+
+
+def test_buckets_follow_papers() -> None:
+    index = TrendIndex()
+    index.reset(2)
+    dates = ["2020-11-02", "2021-02-01", "2020-11-30", "unknown"]
+    weights = np.array([[1.0, 0.0], [0.0, 2.0], [0.5, 0.5], [1.0, 1.0]])
+    index.add(np.arange(4), [{"datePublished": date} for date in dates], weights)
+    trend = index.trend()
+    assert trend.periods == ["2020-11", "2020-12", "2021-01", "2021-02"]
+    assert trend.papers.tolist() == [2, 0, 0, 1]
+    np.testing.assert_allclose(trend.weights[0], [1.5, 0.5])
+
+    index.remove(np.array([0]), weights[:1])
+    index.add(np.array([0]), [{"datePublished": "2019-05-01"}], np.array([[0.0, 1.0]]))
+    years = index.trend(granularity=Granularity.YEAR)
+    assert years.periods == ["2019", "2020", "2021"]
+    assert years.papers.tolist() == [1, 1, 1]
+    np.testing.assert_allclose(years.weights, [[0.0, 1.0], [0.5, 0.5], [0.0, 2.0]])
+
+    ranged = index.trend(parse_period("2020-12"), parse_period("2021", end=True))
+    assert ranged.periods == ["2020-12", "2021-01", "2021-02"]
+    assert index.trend(parse_period("2030")).periods == []
+
+
+def test_papers_without_date_add_no_buckets() -> None:
+    index = TrendIndex()
+    index.reset(2)
+    papers = [{"datePublished": None}, {"title": "undated"}]
+    index.add(np.arange(2), papers, np.ones((2, 2)))
+    trend = index.trend()
+    assert trend.periods == []
+    assert trend.papers.tolist() == []
@@ -1,32 +1,44 @@
+import asyncio
+import json
 import os
 from typing import Any
 
+import httpx
 import pytest
-import requests
-from requests.models import Response
 
-from nlp_land_prediction_endpoint.utils.version_getter import get_backend_version
+from nlp_land_prediction_endpoint.utils.http_client import backend_client
+from nlp_land_prediction_endpoint.utils.version_getter import (
+    BackendVersion,
+    backend_version,
+    get_backend_version,
+)
 
 
 @pytest.fixture
 def mock_version_request(monkeypatch: Any) -> None:
-    """Simulates request.get by overwriting the function
+    """Simulates the version request by overwriting the shared client
 
     Arguments:
         monkeypatch: a monkeypatch object
     """
 
-    def mock_get(*args, **kwargs):
-        # type: (*str, **int) -> Response
-        response = Response()
-        response.status_code = 200
-        response._content = b'{"__v": 0}'
-        return response
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        return httpx.Response(200, json={"__v": 0})
 
-    monkeypatch.setattr(requests, "get", mock_get)
+    monkeypatch.setattr(backend_client, "request", mock_request)
 
 
-def test_missing_backend_version(monkeypatch: Any, mock_version_request: Any) -> None:
+@pytest.fixture
+def envs(monkeypatch: Any) -> dict:
+    """Replace the environment with a configuration without backend version
+
+    Arguments:
+        monkeypatch: a monkeypatch object
+
+    Returns:
+        dict: the replaced environment
+    """
     envs = {
         "AUTH_BACKEND_VERSION": None,
         "AUTH_BACKEND_URL": "http://127.0.0.1/api/{version}",
@@ -37,4 +49,136 @@ def test_missing_backend_version(monkeypatch: Any, mock_version_request: Any) ->
         "JWT_SIGN_ALG": "HS256",
     }
     monkeypatch.setattr(os, "environ", envs)
-    get_backend_version()
+    return envs
+
+
+def test_missing_backend_version(
+    envs: dict, tmp_path: Any, monkeypatch: Any, mock_version_request: Any
+) -> None:
+    monkeypatch.setattr(backend_version, "path", str(tmp_path / "version.json"))
+    monkeypatch.setattr(backend_version, "template", None)
+    asyncio.run(get_backend_version())
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/v0"
+
+
+def test_stored_version_skips_network(envs: dict, tmp_path: Any, monkeypatch: Any) -> None:
+    calls = []
+
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        calls.append(args)
+        return httpx.Response(200, json={"__v": 2})
+
+    monkeypatch.setattr(backend_client, "request", mock_request)
+    path = str(tmp_path / "version.json")
+    asyncio.run(BackendVersion(path).resolve())
+    assert len(calls) == 1
+    envs.update(AUTH_BACKEND_VERSION=None, AUTH_BACKEND_URL="http://127.0.0.1/api/{version}")
+    sibling = BackendVersion(path)
+    asyncio.run(sibling.resolve())
+    assert len(calls) == 1
+    assert sibling.stored
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/v2"
+
+
+def test_discovery_timeout_and_refresh(envs: dict, tmp_path: Any, monkeypatch: Any) -> None:
+    answers = [None, {"__v": 3}]
+
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        answer = answers.pop(0)
+        if answer is None:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json=answer)
+
+    monkeypatch.setattr(backend_client, "request", mock_request)
+    version = BackendVersion(str(tmp_path / "version.json"), timeout=0.01)
+    asyncio.run(version.resolve())
+    assert version.version is None
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/{version}"
+    asyncio.run(version.refresh())
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/v3"
+    with open(version.path) as fp:
+        assert json.load(fp) == {"url": "http://127.0.0.1/api/{version}", "version": "v3"}
+
+
+def test_configured_version(envs: dict) -> None:
+    envs["AUTH_BACKEND_VERSION"] = "v5"
+    version = BackendVersion()
+    asyncio.run(version.start())
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/v5"
+    assert version.template is None
+    asyncio.run(version.refresh())
+    assert version._tasks == []
+
+
+def test_url_without_version(envs: dict) -> None:
+    envs["AUTH_BACKEND_URL"] = "http://127.0.0.1/api"
+    version = BackendVersion()
+    asyncio.run(version.resolve())
+    assert version.template is None
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api"
+
+
+def test_invalid_stored_and_discovered_versions(
+    envs: dict, tmp_path: Any, monkeypatch: Any
+) -> None:
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        return httpx.Response(200, json=["not", "a", "version"])
+
+    monkeypatch.setattr(backend_client, "request", mock_request)
+    path = tmp_path / "version.json"
+    path.write_text("[]")
+    version = BackendVersion(str(path))
+    asyncio.run(version.resolve())
+    assert version.version is None
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/{version}"
+
+
+def test_refresh_follows_stored_version(envs: dict, tmp_path: Any, monkeypatch: Any) -> None:
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        raise httpx.ConnectError("backend is down")
+
+    monkeypatch.setattr(backend_client, "request", mock_request)
+    version = BackendVersion(str(tmp_path / "missing" / "version.json"))
+    asyncio.run(version.resolve())
+    version._write("v1")
+    assert not os.path.exists(version.path)
+    version.path = str(tmp_path / "version.json")
+    with open(version.path, "w") as fp:
+        json.dump({"url": "http://127.0.0.1/api/{version}", "version": "v4"}, fp)
+    asyncio.run(version.refresh())
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/v4"
+
+
+def test_retries_with_backoff_until_resolved(envs: dict, tmp_path: Any, monkeypatch: Any) -> None:
+    answers = [None, None, None, {"__v": 6}]
+    calls = []
+
+    async def mock_request(*args, **kwargs):
+        # type: (*str, **dict) -> httpx.Response
+        calls.append(asyncio.get_event_loop().time())
+        answer = answers.pop(0) if answers else {"__v": 6}
+        if answer is None:
+            raise httpx.ConnectError("backend is down")
+        return httpx.Response(200, json=answer)
+
+    monkeypatch.setattr(backend_client, "request", mock_request)
+    version = BackendVersion(str(tmp_path / "version.json"), refresh_seconds=10, retry_seconds=0.02)
+
+    async def run() -> None:
+        await version.start()
+        try:
+            while version.version is None:
+                await asyncio.sleep(0.01)
+        finally:
+            await version.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    assert envs["AUTH_BACKEND_URL"] == "http://127.0.0.1/api/v6"
+    assert len(calls) == 4
+    pauses = [later - earlier for earlier, later in zip(calls[1:], calls[2:])]
+    assert pauses[0] > 0.015 and pauses[1] > 0.035
+    assert version._tasks == []
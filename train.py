@@ -0,0 +1,75 @@
+"""Fits a topic model on a corpus and registers it as a new model version.
+
+With --update, the newest (or the active) version of the model is updated with the papers of
+the corpus instead; only new papers and papers whose abstractText or preProcessingGitHash
+changed are processed. The new version records the updated one as its parent, so the update
+can be rolled back with POST /api/v0/models/{name}/rollback.
+"""
+import argparse
+import json
+
+from nlp_land_prediction_endpoint.models.model_paper import PaperModel
+from nlp_land_prediction_endpoint.utils.model_registry import registry
+from nlp_land_prediction_endpoint.utils.topic_engine import (
+    TopicEngine,
+    paper_digest,
+    paper_text,
+)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Fit a topic model on a corpus of papers.")
+
+    parser.add_argument("corpus", type=str, help="JSON list or NDJSON file of papers.")
+    parser.add_argument("name", type=str, help="Name of the model in TOPIC_MODEL_DIR.")
+    parser.add_argument("--topics", type=int, default=None, help="Number of topics.")
+    parser.add_argument("--max-features", type=int, default=None, help="Vocabulary size.")
+    parser.add_argument(
+        "--update", action="store_true", help="Update the model instead of fitting a new one."
+    )
+    parser.add_argument(
+        "--base", type=str, default=None, help="Version to update (default: active or newest)."
+    )
+    parser.add_argument(
+        "--activate", action="store_true", help="Make the new version the active model."
+    )
+
+    args = parser.parse_args()
+
+    with open(args.corpus) as fp:
+        content = fp.read()
+    if content.lstrip().startswith("["):
+        records = json.loads(content)
+    else:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+    papers = [PaperModel(**record) for record in records]
+    ids = [paper.id for paper in papers]
+    texts = [paper_text(paper) for paper in papers]
+    digests = [paper_digest(paper) for paper in papers]
+
+    if args.update:
+        registry.refresh()
+        active = registry.active
+        versions = registry.list_models().get(args.name)
+        if args.base:
+            base = args.base
+        elif active is not None and active.name == args.name:
+            base = active.version
+        elif versions:
+            base = versions[-1]
+        else:
+            parser.error(f"there is no model {args.name} to update")
+        engine = TopicEngine.load(registry.path(args.name, base))
+        processed = engine.partial_fit(ids, texts, digests)
+        print(f"{len(processed)} of {len(papers)} papers are new or changed")
+        if not len(processed):
+            raise SystemExit(0)
+    else:
+        params = {"n_topics": args.topics, "max_features": args.max_features}
+        engine = TopicEngine(**{key: value for key, value in params.items() if value is not None})
+        engine.fit_transform(texts, ids, digests)
+    version = registry.register(args.name, engine)
+    print(f"Registered {args.name}/{version} with {len(engine.terms_)} terms")
+    if args.activate:
+        registry.activate(args.name, version)
+        print(f"Activated {args.name}/{version}")